@@ -0,0 +1,49 @@
+"""Keep-alive HTTP sessions shared by the AI providers of a worker process."""
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = 8
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+def get_session(url):
+    """Return the shared session for the host of ``url``."""
+    parts = urlsplit(url)
+    key = ((parts.scheme or 'https').lower(), (parts.netloc or '').lower())
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions[key] = session
+    return session
+
+
+def get_rate_limiter(env):
+    """Return the shared ``planetio.rate.limiter`` when planetio is installed."""
+    try:
+        if 'planetio.rate.limiter' in env:
+            return env['planetio.rate.limiter'].sudo()
+    except Exception:
+        pass
+    return None
+
+
+def retry_after_seconds(response):
+    """Return the ``Retry-After`` delay (in seconds) of a response, if any."""
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return max(0.0, float(headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
@@ -3,8 +3,7 @@ import random
 import time
 from typing import Any, Dict, List, Optional
 
-import requests
-
+from .http_session import get_rate_limiter, get_session, retry_after_seconds
 from .provider_base import ProviderBase
 
 
@@ -52,7 +51,8 @@ class ClaudeProvider(ProviderBase):
                 )
                 if not transient or attempt == max_attempts:
                     raise
-                time.sleep(backoff + random.uniform(0, 0.5))
+                delay = backoff + random.uniform(0, 0.5)
+                time.sleep(max(delay, getattr(exc, 'retry_after', None) or 0.0))
                 backoff *= 2
 
     def _prepare_payload(
@@ -100,17 +100,25 @@ class ClaudeProvider(ProviderBase):
             'anthropic-version': self.API_VERSION,
             'content-type': 'application/json',
         }
-        response = requests.post(
+        limiter = get_rate_limiter(self.env)
+        if limiter is not None:
+            limiter.acquire(self.API_URL)
+        response = get_session(self.API_URL).post(
             self.API_URL,
             headers=headers,
             data=json.dumps(payload),
             timeout=90,
         )
+        retry_after = retry_after_seconds(response)
+        if limiter is not None:
+            retry_after = limiter.observe(self.API_URL, response)
         if response.status_code >= 400:
-            raise RuntimeError(
+            error = RuntimeError(
                 'AI request error (Claude %s): %s'
                 % (response.status_code, response.text)
             )
+            error.retry_after = retry_after
+            raise error
         return response.json()
 
     def _extract_text(self, data: Dict[str, Any]) -> str:
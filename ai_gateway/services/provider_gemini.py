@@ -1,9 +1,31 @@
 import time
 import random
 import json
-import requests
+import threading
 import google.generativeai as genai
 
+from .http_session import get_rate_limiter, get_session, retry_after_seconds
+
+
+# genai.configure() sets process-wide state: run it once per API key and keep
+# the GenerativeModel instances instead of rebuilding them on every request.
+_client_lock = threading.Lock()
+_client_state = {'api_key': None, 'models': {}}
+
+
+def _get_client_model(api_key, model_name):
+    with _client_lock:
+        if _client_state['api_key'] != api_key:
+            genai.configure(api_key=api_key)
+            _client_state['api_key'] = api_key
+            _client_state['models'] = {}
+        if not hasattr(genai, "GenerativeModel"):
+            return None
+        model = _client_state['models'].get(model_name)
+        if model is None:
+            model = _client_state['models'][model_name] = genai.GenerativeModel(model_name)
+        return model
+
 
 class GeminiProvider(object):
     # Prefer current, generally-available models
@@ -35,10 +57,9 @@ class GeminiProvider(object):
 
         self._client_ok = False
         try:
-            genai.configure(api_key=self.api_key)
             # If the installed client is modern enough, use it; else fall back to REST
-            if hasattr(genai, "GenerativeModel"):
-                self._model = genai.GenerativeModel(self.model_name)
+            self._model = _get_client_model(self.api_key, self.model_name)
+            if self._model is not None:
                 self._use_generate_text = False
                 self._client_ok = True
             else:
@@ -51,8 +72,7 @@ class GeminiProvider(object):
     # optional: call during __init__ after computing self.model_name, to auto-heal bad IDs
     def _maybe_select_available_model(self):
         try:
-            import requests
-            resp = requests.get(
+            resp = get_session(self.REST_BASE).get(
                 f"{self.REST_BASE}/models",
                 params={"key": self.api_key},
                 timeout=5,
@@ -91,9 +111,22 @@ class GeminiProvider(object):
                 transient = any(x in msg for x in ["429", "500", "502", "503", "504", "deadline", "timeout"])
                 if not transient or attempt == max_attempts:
                     raise
-                time.sleep(backoff + random.uniform(0, 0.5))
+                delay = backoff + random.uniform(0, 0.5)
+                time.sleep(max(delay, getattr(e, "retry_after", None) or 0.0))
                 backoff *= 2
 
+    def _sdk_generate(self, parts, **kwargs):
+        # the SDK talks to the same host as the REST fallback: share its bucket
+        limiter = get_rate_limiter(self.env)
+        if limiter is not None:
+            limiter.acquire(self.REST_BASE)
+        try:
+            return self._model.generate_content(parts, **kwargs)
+        except Exception as e:
+            if limiter is not None and "429" in str(e):
+                limiter.penalize(self.REST_BASE, getattr(e, "retry_after", None))
+            raise
+
     # ---------------- REST fallback ----------------
 
     def _rest_model_candidates(self):
@@ -148,10 +181,16 @@ class GeminiProvider(object):
 
         headers = {"Content-Type": "application/json"}
         last_error = None
+        limiter = get_rate_limiter(self.env)
 
         for candidate in self._rest_model_candidates():
             url = f"{self.REST_BASE}/models/{candidate}:generateContent?key={self.api_key}"
-            resp = requests.post(url, headers=headers, data=json.dumps(payload), timeout=60)
+            if limiter is not None:
+                limiter.acquire(url)
+            resp = get_session(url).post(url, headers=headers, data=json.dumps(payload), timeout=60)
+            retry_after = retry_after_seconds(resp)
+            if limiter is not None:
+                retry_after = limiter.observe(url, resp)
             if resp.status_code == 404:
                 last_error = RuntimeError(
                     f"Model '{candidate}' non trovato (REST 404). "
@@ -160,7 +199,9 @@ class GeminiProvider(object):
                 )
                 continue
             if resp.status_code >= 400:
-                raise RuntimeError(f"AI request error (REST {resp.status_code}): {resp.text}")
+                error = RuntimeError(f"AI request error (REST {resp.status_code}): {resp.text}")
+                error.retry_after = retry_after
+                raise error
 
             data = resp.json()
             # estrai testo primario
@@ -196,7 +237,7 @@ class GeminiProvider(object):
                 for key in ("generation_config", "safety_settings", "tools", "tool_config"):
                     if key in kwargs and kwargs[key] is not None:
                         gen_kwargs[key] = kwargs[key]
-                resp = self._retry(self._model.generate_content, parts, **gen_kwargs)
+                resp = self._retry(self._sdk_generate, parts, **gen_kwargs)
                 text = getattr(resp, "text", "") or ""
                 meta = getattr(resp, "to_dict", lambda: {})()
                 if text:
@@ -1,6 +1,6 @@
 {
     'name': 'Planetio',
-    'version': '14.0.1.0.7',
+    'version': '14.0.1.0.11',
     'author': 'Alessandro Vasi / Roberto Zanardo / Encodata S.r.l.',
     'summary': 'Modulo per la compilazione della due-diligence sulla normativa della deforestazione',
     'depends': ['base', 'mail', 'web', 'hs_codes', 'web_progress', 'stock', 'product'],
@@ -9,12 +9,15 @@
         'views/eudr_views.xml',
         'views/eudr_lot_views.xml',
         'views/template_views.xml',
+        'views/eudr_deforestation_job_views.xml',
         'wizards/import_wizard.xml',
         'wizards/deforestation_geometry_wizard.xml',
+        'wizards/offline_alert_import_wizard.xml',
         'views/res_config_settings_view.xml',
         'data/eudr_stages.xml',
         'data/seed_template.xml',
         'data/sequence.xml',
+        'data/deforestation_cron.xml',
         'report/eudr_declaration_report.xml',
         "views/res_company_views.xml",
     ],
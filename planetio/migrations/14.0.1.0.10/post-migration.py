@@ -0,0 +1,13 @@
+from odoo import SUPERUSER_ID, api
+
+BATCH = 500
+
+
+def migrate(cr, version):
+    """Compute the stored deforestation rollups of existing declarations."""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    Declaration = env['eudr.declaration'].with_context(active_test=False)
+    ids = Declaration.search([]).ids
+    for start in range(0, len(ids), BATCH):
+        Declaration.browse(ids[start:start + BATCH])._refresh_deforestation_rollups()
+        Declaration.invalidate_cache()
@@ -0,0 +1,13 @@
+def migrate(cr, version):
+    """Link existing declaration lines to the lot plot they were created from."""
+    cr.execute("""
+        UPDATE eudr_declaration_line l
+           SET plot_id = p.id
+          FROM eudr_declaration d
+          JOIN eudr_lot_plot_rel r ON r.lot_id = d.lot_id
+          JOIN eudr_plot p ON p.id = r.plot_id
+         WHERE l.declaration_id = d.id
+           AND l.plot_id IS NULL
+           AND l.name = p.name
+           AND l.geometry = p.geometry
+    """)
@@ -0,0 +1,45 @@
+import json
+
+from odoo.addons.planetio.models.eudr_deforestation import (
+    compress_deforestation_payload,
+    slim_deforestation_status,
+)
+
+BATCH = 500
+
+
+def migrate(cr, version):
+    """Move full provider responses out of defor_details_json.
+
+    The summary stays in defor_details_json, the stripped raw response is
+    stored compressed in defor_raw_payload.
+    """
+    last_id = 0
+    while True:
+        cr.execute(
+            """
+            SELECT id, defor_details_json FROM eudr_declaration_line
+             WHERE id > %s AND defor_details_json IS NOT NULL AND defor_raw_payload IS NULL
+             ORDER BY id LIMIT %s
+            """,
+            (last_id, BATCH),
+        )
+        rows = cr.fetchall()
+        if not rows:
+            break
+        for line_id, raw in rows:
+            last_id = line_id
+            try:
+                status = json.loads(raw)
+            except Exception:
+                continue
+            if not isinstance(status, dict):
+                continue
+            cr.execute(
+                "UPDATE eudr_declaration_line SET defor_details_json = %s, defor_raw_payload = %s WHERE id = %s",
+                (
+                    json.dumps(slim_deforestation_status(status), ensure_ascii=False),
+                    compress_deforestation_payload(status),
+                    line_id,
+                ),
+            )
@@ -0,0 +1,36 @@
+from odoo import SUPERUSER_ID, api
+
+from odoo.addons.planetio.models.eudr_deforestation import (
+    decompress_deforestation_payload,
+    deforestation_series_rows,
+)
+
+BATCH = 500
+
+
+def migrate(cr, version):
+    """Fill the alert series table from the stored raw provider responses."""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    Series = env['eudr.declaration.line.alert.series']
+    last_id = 0
+    while True:
+        cr.execute(
+            """
+            SELECT id, defor_raw_payload FROM eudr_declaration_line
+             WHERE id > %s AND defor_raw_payload IS NOT NULL
+             ORDER BY id LIMIT %s
+            """,
+            (last_id, BATCH),
+        )
+        rows = cr.fetchall()
+        if not rows:
+            break
+        series = {}
+        for line_id, raw in rows:
+            last_id = line_id
+            if isinstance(raw, memoryview):
+                raw = raw.tobytes()
+            status = decompress_deforestation_payload(raw)
+            if isinstance(status, dict):
+                series[line_id] = deforestation_series_rows(status)
+        Series._replace_lines(series)
@@ -1,6 +1,9 @@
 from . import ir_attachment
 from . import eudr_models
 from . import eudr_deforestation
+from . import eudr_deforestation_job
+from . import eudr_alert_series
+from . import eudr_analysis_result
 from . import res_config_settings
 from . import excel_import_template
 from . import excel_import_service
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models, tools, _
+from odoo.exceptions import UserError
+
+EUDR_CUTOFF_DATE = '2020-12-31'
+
+# Rollup level -> (SQL key expression, joins needed on top of the series table)
+_ROLLUP_KEYS = {
+    'line': ('s.line_id', ''),
+    'declaration': ('s.declaration_id', ''),
+    'lot': ('d.lot_id', 'JOIN eudr_declaration d ON d.id = s.declaration_id'),
+    'supplier': ('d.supplier_id', 'JOIN eudr_declaration d ON d.id = s.declaration_id'),
+    'country': (
+        "COALESCE(c.code, NULLIF(UPPER(TRIM(l.country)), ''))",
+        'JOIN eudr_declaration_line l ON l.id = s.line_id '
+        'LEFT JOIN res_country c ON c.id = l.country_id',
+    ),
+}
+
+
+class EUDRDeclarationLineAlertSeries(models.Model):
+    """Per-day alert counts of each analyzed line.
+
+    One narrow row per line, day and confidence level, rewritten whenever an
+    analysis result is applied. Trends over declarations, lots, suppliers or
+    countries are aggregated in SQL from this table instead of decoding the
+    JSON details of every line.
+    """
+    _name = 'eudr.declaration.line.alert.series'
+    _description = 'EUDR Declaration Line Alert Series'
+    _log_access = False
+    _order = 'alert_date desc'
+
+    line_id = fields.Many2one('eudr.declaration.line', required=True, ondelete='cascade', index=True)
+    declaration_id = fields.Many2one('eudr.declaration', ondelete='cascade', index=True)
+    alert_date = fields.Date(required=True)
+    confidence = fields.Char()
+    alert_count = fields.Integer()
+    area_ha = fields.Float(digits=(16, 4))
+
+    def init(self):
+        tools.create_index(self._cr, 'eudr_declaration_line_alert_series_decl_date_idx',
+                           self._table, ['declaration_id', 'alert_date'])
+
+    @api.model
+    def _replace_lines(self, series_by_line):
+        """Replace the series of the given lines.
+
+        :param dict series_by_line: line id -> list of
+            ``(date, confidence, alert_count, area_ha)`` tuples
+        """
+        line_ids = [line_id for line_id in series_by_line if line_id]
+        if not line_ids:
+            return
+        cr = self.env.cr
+        cr.execute("DELETE FROM eudr_declaration_line_alert_series WHERE line_id IN %s", (tuple(line_ids),))
+        cr.execute("SELECT id, declaration_id FROM eudr_declaration_line WHERE id IN %s", (tuple(line_ids),))
+        declarations = dict(cr.fetchall())
+        values = [
+            cr.mogrify('(%s,%s,%s,%s,%s,%s)', (line_id, declarations.get(line_id), day, confidence, count, area))
+            .decode()
+            for line_id in line_ids
+            for day, confidence, count, area in series_by_line[line_id]
+        ]
+        for start in range(0, len(values), 5000):
+            cr.execute(
+                "INSERT INTO eudr_declaration_line_alert_series "
+                "(line_id, declaration_id, alert_date, confidence, alert_count, area_ha) VALUES "
+                + ','.join(values[start:start + 5000])
+            )
+        self.invalidate_cache()
+
+    def _rollup_sql(self, group_by):
+        if group_by not in _ROLLUP_KEYS:
+            raise UserError(_("Livello di aggregazione non supportato: %s") % group_by)
+        return _ROLLUP_KEYS[group_by]
+
+    @api.model
+    def get_monthly_trend(self, group_by='declaration', declaration_ids=None, date_from=None):
+        """Alerts per month for each ``group_by`` key.
+
+        Returns dicts with ``key``, ``month`` (first day, ISO), ``alert_count``
+        and ``area_ha``, ordered by key and month.
+        """
+        key_expr, joins = self._rollup_sql(group_by)
+        where, params = ['TRUE'], []
+        if declaration_ids:
+            where.append('s.declaration_id IN %s')
+            params.append(tuple(declaration_ids))
+        if date_from:
+            where.append('s.alert_date >= %s')
+            params.append(date_from)
+        self.env.cr.execute("""
+            SELECT {key} AS key,
+                   date_trunc('month', s.alert_date)::date::text AS month,
+                   SUM(s.alert_count) AS alert_count,
+                   SUM(s.area_ha) AS area_ha
+              FROM eudr_declaration_line_alert_series s {joins}
+             WHERE {where}
+          GROUP BY 1, 2
+          ORDER BY 1, 2
+        """.format(key=key_expr, joins=joins, where=' AND '.join(where)), params)
+        return self.env.cr.dictfetchall()
+
+    @api.model
+    def get_first_seen(self, group_by='declaration', declaration_ids=None, cutoff=EUDR_CUTOFF_DATE):
+        """First and last alert dates after ``cutoff`` for each ``group_by`` key.
+
+        Returns dicts with ``key``, ``first_seen``, ``last_seen``,
+        ``alert_count``, ``area_ha`` and ``line_count`` (lines with alerts).
+        """
+        key_expr, joins = self._rollup_sql(group_by)
+        where, params = ['s.alert_date > %s'], [cutoff]
+        if declaration_ids:
+            where.append('s.declaration_id IN %s')
+            params.append(tuple(declaration_ids))
+        self.env.cr.execute("""
+            SELECT {key} AS key,
+                   MIN(s.alert_date)::text AS first_seen,
+                   MAX(s.alert_date)::text AS last_seen,
+                   SUM(s.alert_count) AS alert_count,
+                   SUM(s.area_ha) AS area_ha,
+                   COUNT(DISTINCT s.line_id) AS line_count
+              FROM eudr_declaration_line_alert_series s {joins}
+             WHERE {where}
+          GROUP BY 1
+          ORDER BY 1
+        """.format(key=key_expr, joins=joins, where=' AND '.join(where)), params)
+        return self.env.cr.dictfetchall()
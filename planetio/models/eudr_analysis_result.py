@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class DeforestationAnalysisResult(models.Model):
+    """Provider results addressed by what was analyzed.
+
+    The key is the normalized geometry fingerprint plus the provider, the
+    length of the alert window and (for Plant4, whose analyses depend on it)
+    the commodity. The window slides forward every day, so a result stored
+    under the same length still covers the current window within the
+    freshness period, like :func:`is_deforestation_result_stale` accepts it.
+    Lines sharing a plot across declarations, lots or shipments reuse one
+    analysis instead of sending the same geometry to the provider again.
+    Reuse is off unless ``planetio.deforestation_result_reuse`` is set.
+    """
+    _name = 'deforestation.analysis.result'
+    _description = 'Deforestation Analysis Result'
+    _order = 'analyzed_at desc, id desc'
+    _log_access = False
+
+    key = fields.Char(required=True, index=True, readonly=True)
+    geometry_hash = fields.Char(index=True, readonly=True)
+    provider = fields.Char(readonly=True)
+    date_from = fields.Char(string='Window Start', readonly=True)
+    commodity = fields.Char(readonly=True)
+    payload = fields.Binary(readonly=True, attachment=False, prefetch=False,
+                            help="zlib-compressed JSON of the provider result, without geometries.")
+    analyzed_at = fields.Datetime(readonly=True, index=True)
+    hit_count = fields.Integer(readonly=True, default=0)
+    line_ids = fields.One2many('eudr.declaration.line', 'defor_result_id', string='Lines', readonly=True)
+
+    _sql_constraints = [
+        ('key_unique', 'unique(key)', 'Analysis result key must be unique.'),
+    ]
+
+    # --------- Config ---------
+    def is_enabled(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        raw = (ICP.get_param('planetio.deforestation_result_reuse') or '').strip().lower()
+        return raw in ('1', 'true', 'y', 'yes')
+
+    def _max_age(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            days = int(ICP.get_param('planetio.deforestation_freshness_days') or 30)
+        except Exception:
+            days = 30
+        return timedelta(days=max(0, days))
+
+    # --------- Keys ---------
+    @api.model
+    def make_key(self, geometry_hash, provider, window_days=None, commodity=None):
+        if not geometry_hash:
+            return None
+        window = '%sd' % window_days if window_days else ''
+        token = json.dumps([geometry_hash, provider or '', window, commodity or ''],
+                           separators=(',', ':'))
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    # --------- Public API ---------
+    def lookup(self, keys):
+        """Return ``{key: (result_id, status)}`` for the fresh results among ``keys``."""
+        from .eudr_deforestation import decompress_deforestation_payload
+
+        keys = [key for key in set(keys) if key]
+        max_age = self._max_age()
+        if not keys or not max_age:
+            return {}
+        self.env.cr.execute(
+            """
+            SELECT id, key, payload FROM deforestation_analysis_result
+             WHERE key IN %s AND analyzed_at >= %s
+            """,
+            (tuple(keys), fields.Datetime.now() - max_age),
+        )
+        found = {}
+        for result_id, key, payload in self.env.cr.fetchall():
+            if isinstance(payload, memoryview):
+                payload = payload.tobytes()
+            status = decompress_deforestation_payload(payload)
+            if isinstance(status, dict):
+                found[key] = (result_id, status)
+        if found:
+            self.env.cr.execute(
+                "UPDATE deforestation_analysis_result SET hit_count = hit_count + 1 WHERE id IN %s",
+                (tuple(result_id for result_id, _status in found.values()),),
+            )
+        return found
+
+    def store(self, key, status, geometry_hash=None, provider=None, date_from=None, commodity=None):
+        """Insert or refresh the result stored under ``key``; return its id."""
+        from .eudr_deforestation import compress_deforestation_payload
+
+        if not key or not isinstance(status, dict):
+            return None
+        self.env.cr.execute(
+            """
+            INSERT INTO deforestation_analysis_result
+                   (key, geometry_hash, provider, date_from, commodity, payload, analyzed_at, hit_count)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, 0)
+            ON CONFLICT (key) DO UPDATE
+               SET payload = EXCLUDED.payload, analyzed_at = EXCLUDED.analyzed_at
+            RETURNING id
+            """,
+            (key, geometry_hash, provider, date_from, commodity,
+             compress_deforestation_payload(status), fields.Datetime.now()),
+        )
+        return self.env.cr.fetchone()[0]
+
+    def _gc_expired(self):
+        """Cron entry point: drop results older than the freshness window."""
+        self.env.cr.execute(
+            "DELETE FROM deforestation_analysis_result WHERE analyzed_at < %s",
+            (fields.Datetime.now() - self._max_age(),),
+        )
+        _logger.info("Deforestation results: %s expired entries removed", self.env.cr.rowcount)
+        return True
@@ -1,15 +1,26 @@
 # -*- coding: utf-8 -*-
+import base64
+import copy
+import csv
+import io
 import json
+import logging
 import math
 import re
 import requests
 import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from collections import defaultdict
 
 from odoo import models, fields, api, _, tools
 from odoo.exceptions import UserError
 
+from ..services import http_client
+
+_logger = logging.getLogger(__name__)
+
 
 def _coerce_int(value):
     if value in (None, ""):
@@ -59,6 +70,282 @@ def _coerce_float(value):
     return None
 
 
+_RISK_LEVELS = [('none', 'No alerts'), ('low', 'Low'), ('medium', 'Medium'), ('high', 'High')]
+# Alert risk levels (or confidences, for GFW alerts) mapped to _RISK_LEVELS
+_RISK_TOKENS = {
+    'high': ('high', 'highest', 'very high', 'very_high', 'critical'),
+    'medium': ('medium', 'nominal', 'moderate'),
+    'low': ('low',),
+}
+
+_GEOMETRY_KEYS = frozenset(('original_geom', 'final_geom_used', 'geometry', 'geojson'))
+_SUMMARY_MAX_ALERTS = 50
+
+
+def strip_deforestation_geometries(node):
+    """Return a copy of a provider payload without geometry copies."""
+    if isinstance(node, dict):
+        return {
+            key: strip_deforestation_geometries(value)
+            for key, value in node.items()
+            if key not in _GEOMETRY_KEYS
+        }
+    if isinstance(node, list):
+        return [strip_deforestation_geometries(value) for value in node]
+    return node
+
+
+def slim_deforestation_status(status, max_alerts=_SUMMARY_MAX_ALERTS):
+    """Return the small, stable summary stored in ``defor_details_json``.
+
+    Only ``message``, ``metrics``, ``meta`` and the first ``max_alerts``
+    alerts are kept; raw provider responses go to the compressed payload.
+    """
+    if not isinstance(status, dict):
+        return status
+    alerts = status.get('alerts') if isinstance(status.get('alerts'), list) else []
+    summary = {
+        'message': status.get('message'),
+        'metrics': status.get('metrics') or {},
+        'meta': status.get('meta') if isinstance(status.get('meta'), dict) else {},
+        'alerts': alerts[:max_alerts],
+    }
+    if len(alerts) > max_alerts:
+        summary['alerts_truncated'] = len(alerts)
+    return strip_deforestation_geometries(summary)
+
+
+def deforestation_freshness_limits(env):
+    """Return ``(provider_code, limit, window_days)`` for staleness checks.
+
+    ``limit`` is the oldest acceptable analysis datetime (None when results
+    never expire) and ``window_days`` the length of the current GFW window
+    (None for providers without one).
+    """
+    ICP = env['ir.config_parameter'].sudo()
+    provider_code = (ICP.get_param('planetio.deforestation_provider') or 'gfw').strip() or 'gfw'
+    try:
+        freshness = int(ICP.get_param('planetio.deforestation_freshness_days') or 30)
+    except Exception:
+        freshness = 30
+    limit = fields.Datetime.now() - timedelta(days=freshness) if freshness > 0 else None
+    window_days = None
+    if provider_code in ('gfw', 'offline') and 'deforestation.provider.gfw' in env:
+        window_from = fields.Date.from_string(env['deforestation.provider.gfw']._compute_date_from())
+        window_days = (date.today() - window_from).days
+    return provider_code, limit, window_days
+
+
+def is_deforestation_result_stale(record, geometry_hash, provider_code, limit=None, window_days=None):
+    """Tell whether the analysis stored on ``record`` cannot be reused.
+
+    ``record`` carries the ``defor_provider``, ``defor_analyzed_at``,
+    ``defor_date_from`` and ``defor_geometry_hash`` tracking fields (lines and
+    plots); the other arguments come from :func:`deforestation_freshness_limits`.
+    """
+    if not record.defor_analyzed_at or record.defor_provider != provider_code:
+        return True
+    if limit and record.defor_analyzed_at < limit:
+        return True
+    if window_days and record.defor_date_from:
+        analyzed_window = (record.defor_analyzed_at.date() - record.defor_date_from).days
+        if analyzed_window < window_days:
+            return True
+    return record.defor_geometry_hash != geometry_hash
+
+
+def compress_deforestation_payload(payload):
+    """Serialize ``payload`` to zlib-compressed JSON, base64 encoded for Binary fields."""
+    raw = json.dumps(strip_deforestation_geometries(payload), ensure_ascii=False, default=str)
+    return base64.b64encode(zlib.compress(raw.encode('utf-8'), 6))
+
+
+def decompress_deforestation_payload(value):
+    if not value:
+        return None
+    try:
+        return json.loads(zlib.decompress(base64.b64decode(value)).decode('utf-8'))
+    except Exception:
+        return None
+
+
+def deforestation_series_rows(status):
+    """Return the per-day alert series of a provider result.
+
+    Rows are ``(date, confidence, alert_count, area_ha)`` tuples. The grouped
+    GFW answer (one row per day and confidence) is preferred; otherwise the
+    ``details.time_series`` entries are used with an ``n/a`` confidence.
+    """
+    if not isinstance(status, dict):
+        return []
+    details = status.get('details') if isinstance(status.get('details'), dict) else {}
+    responses = details.get('responses') if isinstance(details.get('responses'), dict) else {}
+    grouped = responses.get('grouped') if isinstance(responses.get('grouped'), dict) else {}
+    source = grouped.get('data') or details.get('time_series') or []
+
+    totals = {}
+    for entry in source:
+        if not isinstance(entry, dict):
+            continue
+        day = str(entry.get('alert_date') or entry.get('date') or '')[:10]
+        if len(day) != 10:
+            continue
+        confidence = tools.ustr(entry.get('confidence') or 'n/a')
+        count = _coerce_float(entry.get('alert_count', entry.get('count'))) or 0.0
+        area = _coerce_float(entry.get('area_ha', entry.get('area'))) or 0.0
+        bucket = totals.setdefault((day, confidence), [0.0, 0.0])
+        bucket[0] += count
+        bucket[1] += area
+    return [
+        (day, confidence, int(round(count)), area)
+        for (day, confidence), (count, area) in sorted(totals.items())
+    ]
+
+
+_DEFORESTATION_STATUS_LABELS = {'ok': 'OK', 'fail': 'ALERT', 'error': 'ERRORE'}
+
+# first key of the advisory locks taken on analyzed lines (second key: line id)
+DEFORESTATION_LOCK_NAMESPACE = 20240501
+
+# providers whose queries take an alert window, see ``deforestation_date_from``
+DELTA_RESCAN_PROVIDERS = ('gfw', 'offline')
+
+
+def series_bucket_start(day, bucket):
+    """First day of the ``week`` or ``month`` series bucket holding ``day``."""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def merge_deforestation_delta(previous, delta, delta_from, window_from=None):
+    """Merge the result of a delta rescan into the previous full result.
+
+    ``delta`` only covers the alerts since ``delta_from``: series days and
+    alerts from that date on are taken from it, so that alerts fetched again
+    by the rescan overlap are counted once. Older ones are kept from
+    ``previous`` unless they fell out of the window starting at
+    ``window_from``. The stored series is capped (``LIMIT 365`` days), so the
+    totals are the previous ones minus the series rows replaced by the rescan
+    or out of the window, plus the totals of the delta; the 30/90 day figures
+    come from the merged series. The message is left to the caller.
+
+    With week or month series ``delta_from`` must be the first day of a
+    bucket (see :func:`series_bucket_start`): a previous bucket straddling
+    it would be kept whole while the delta counts its later days again.
+    """
+    delta_from = str(delta_from)[:10]
+    window_from = str(window_from)[:10] if window_from else ''
+
+    def _kept(day):
+        return len(day) == 10 and window_from <= day < delta_from
+
+    series = {}
+    previous_rows = deforestation_series_rows(previous)
+    dropped_count, dropped_area = 0, 0.0
+    for day, confidence, count, area in previous_rows:
+        if _kept(day):
+            series[(day, confidence)] = [count, area]
+        else:
+            dropped_count += count
+            dropped_area += area
+    delta_count, delta_area = 0, 0.0
+    for day, confidence, count, area in deforestation_series_rows(delta):
+        if day >= window_from:
+            bucket = series.setdefault((day, confidence), [0, 0.0])
+            bucket[0] += count
+            bucket[1] += area
+            delta_count += count
+            delta_area += area
+
+    previous_metrics = previous.get('metrics') or {}
+    delta_metrics = delta.get('metrics') or {}
+    if delta_metrics.get('alert_count') is not None and window_from <= delta_from:
+        delta_count = delta_metrics['alert_count']
+        if delta_metrics.get('area_ha_total') is not None:
+            delta_area = delta_metrics['area_ha_total']
+    previous_count = previous_metrics.get('alert_count')
+    if previous_count is None:
+        previous_count = sum(row[2] for row in previous_rows)
+    previous_area = previous_metrics.get('area_ha_total')
+    if previous_area is None:
+        previous_area = sum(row[3] for row in previous_rows)
+
+    def _recent(days):
+        cutoff = (date.today() - timedelta(days=days)).isoformat()
+        rows = [values for (day, _conf), values in series.items() if day >= cutoff]
+        return sum(r[0] for r in rows), float(sum(r[1] for r in rows))
+
+    days = sorted({day for day, _conf in series})
+    first_alert = str(previous_metrics.get('first_alert_date') or '')[:10]
+    if not _kept(first_alert):
+        first_alert = days[0] if days else None
+    count_30d, area_30d = _recent(30)
+    count_90d, area_90d = _recent(90)
+    metrics = dict(previous_metrics)
+    metrics.update({
+        'alert_count': max(0, int(previous_count) - dropped_count + int(delta_count)),
+        'area_ha_total': max(0.0, float(previous_area) - dropped_area + float(delta_area)),
+        'first_alert_date': first_alert,
+        'last_alert_date': days[-1] if days else None,
+        'alert_count_30d': count_30d,
+        'area_ha_30d': area_30d,
+        'alert_count_90d': count_90d,
+        'area_ha_90d': area_90d,
+    })
+
+    alerts = [
+        alert for alert in previous.get('alerts') or []
+        if isinstance(alert, dict) and _kept(str(alert.get('date') or '')[:10])
+    ]
+    seen = {alert.get('alert_id') for alert in alerts if alert.get('alert_id')}
+    for alert in delta.get('alerts') or []:
+        if not isinstance(alert, dict):
+            continue
+        alert_id = alert.get('alert_id')
+        if alert_id and (alert_id in seen or (
+                not delta_metrics.get('alert_count') and str(alert_id).startswith('period:'))):
+            continue
+        seen.add(alert_id)
+        alerts.append(alert)
+
+    delta_meta = delta.get('meta') if isinstance(delta.get('meta'), dict) else {}
+    meta = dict(previous.get('meta') or {})
+    meta.pop('result_id', None)
+    meta.pop('analyzed_at', None)
+    if window_from:
+        meta['date_from'] = window_from
+    meta['rescan'] = {
+        'date_from': delta_from,
+        'alert_count': int(delta_metrics.get('alert_count') or 0),
+        'queries': delta_meta.get('queries'),
+    }
+
+    per_day = {}
+    for (day, _conf), (count, area) in series.items():
+        entry = per_day.setdefault(day, {'date': day, 'alert_count': 0, 'area_ha': 0.0})
+        entry['alert_count'] += count
+        entry['area_ha'] += area
+    grouped = [
+        {'alert_date': day, 'confidence': confidence, 'alert_count': count, 'area_ha': area}
+        for (day, confidence), (count, area) in sorted(series.items(), reverse=True)
+    ]
+    return {
+        'message': previous.get('message'),
+        'alerts': alerts,
+        'metrics': metrics,
+        'meta': meta,
+        'details': {
+            'metrics': metrics,
+            'alerts': alerts,
+            'time_series': sorted(per_day.values(), key=lambda e: e['date'], reverse=True),
+            'responses': {'grouped': {'data': grouped}},
+        },
+    }
+
+
 def parse_deforestation_external_properties(raw_props):
     if not raw_props:
         return None
@@ -286,6 +573,105 @@ def parse_deforestation_external_properties(raw_props):
     }
 
 
+class _DeforestationWriteBuffer:
+    """Collect line values and alert rows and write them in bulk.
+
+    Status fields shared by many lines (alert count, status, window) are
+    grouped by identical values into one ``write`` per group. The fields that
+    differ on every line (details, payload, message, hash) go out in one
+    ``UPDATE ... FROM (VALUES ...)`` per set of columns. Alerts of all
+    buffered lines are replaced with one ``unlink`` and one multi-row
+    ``create``.
+    """
+
+    PER_LINE_FIELDS = (
+        'defor_details_json',
+        'defor_raw_payload',
+        'defor_geometry_hash',
+        'defor_area_ha',
+        'external_message',
+        'external_message_short',
+    )
+
+    def __init__(self, env):
+        self.env = env
+        self.line_vals = {}
+        self.alerts = {}
+        self.series = {}
+        self.declaration_ids = set()
+
+    def __len__(self):
+        return len(set(self.line_vals) | set(self.alerts) | set(self.series))
+
+    def write(self, line, vals):
+        self.line_vals.setdefault(line.id, {}).update(vals)
+        declaration = getattr(line, 'declaration_id', None)
+        if declaration:
+            self.declaration_ids.add(declaration.id)
+
+    def replace_alerts(self, line, vals_list):
+        self.alerts[line.id] = list(vals_list)
+
+    def replace_series(self, line, rows):
+        self.series[line.id] = list(rows)
+
+    def _bulk_update(self, Line, rows):
+        """Write per-line values with one UPDATE per set of columns."""
+        groups = {}
+        for line_id, vals in rows.items():
+            groups.setdefault(tuple(sorted(vals)), []).append((line_id, vals))
+        for names, items in groups.items():
+            Line.flush(list(names))
+            fields_ = [Line._fields[name] for name in names]
+            row_sql = '(%%s, %s)' % ', '.join('%%s::%s' % field.column_type[1] for field in fields_)
+            params = []
+            for line_id, vals in items:
+                params.append(line_id)
+                params.extend(field.convert_to_column(vals[field.name], Line) for field in fields_)
+            assignments = ', '.join('"%s" = v."%s"' % (name, name) for name in names)
+            columns = ', '.join('"%s"' % name for name in names)
+            query = (
+                'UPDATE "%s" AS t SET %s, "write_uid" = %%s, '
+                '"write_date" = (now() at time zone \'UTC\') '
+                'FROM (VALUES %s) AS v(id, %s) WHERE t.id = v.id'
+            ) % (Line._table, assignments, ', '.join([row_sql] * len(items)), columns)
+            self.env.cr.execute(query, [self.env.uid] + params)
+            Line.invalidate_cache(list(names) + ['write_uid', 'write_date'], [line_id for line_id, _vals in items])
+
+    def flush(self):
+        Line = self.env['eudr.declaration.line']
+        groups = {}
+        per_line = {}
+        for line_id, vals in self.line_vals.items():
+            shared = {}
+            for name, value in vals.items():
+                if name in self.PER_LINE_FIELDS:
+                    per_line.setdefault(line_id, {})[name] = value
+                else:
+                    shared[name] = value
+            if shared:
+                key = json.dumps(shared, sort_keys=True, default=str)
+                groups.setdefault(key, (shared, []))[1].append(line_id)
+        for vals, ids in groups.values():
+            Line.browse(ids).write(vals)
+        if per_line:
+            self._bulk_update(Line, per_line)
+        if self.alerts:
+            Alert = self.env['eudr.declaration.line.alert']
+            Alert.search([('line_id', 'in', list(self.alerts))]).unlink()
+            rows = [vals for line_rows in self.alerts.values() for vals in line_rows]
+            if rows:
+                Alert.create(rows)
+        if self.series and 'eudr.declaration.line.alert.series' in self.env:
+            self.env['eudr.declaration.line.alert.series']._replace_lines(self.series)
+        if self.declaration_ids and 'eudr.declaration' in self.env:
+            self.env['eudr.declaration'].browse(list(self.declaration_ids))._refresh_deforestation_rollups()
+        self.line_vals.clear()
+        self.alerts.clear()
+        self.series.clear()
+        self.declaration_ids.clear()
+
+
 class EUDRDeclarationLineAlert(models.Model):
     _name = "eudr.declaration.line.alert"
     _description = "EUDR Declaration Line Deforestation Alert"
@@ -339,6 +725,18 @@ class EUDRDeclarationLineDeforestation(models.Model):
     defor_alerts = fields.Integer(string="Deforestation Alerts", readonly=True)
     defor_area_ha = fields.Float(string="Deforestation Area (ha)", readonly=True)
     defor_details_json = fields.Text(string="Deforestation Details (JSON)", readonly=True)
+    defor_raw_payload = fields.Binary(
+        string="Deforestation Raw Payload", readonly=True, attachment=False, prefetch=False, copy=False,
+        help="zlib-compressed JSON of the full provider response, without geometries.",
+    )
+    defor_geometry_hash = fields.Char(string="Analyzed Geometry Hash", readonly=True, copy=False)
+    defor_date_from = fields.Date(string="Analysis Window Start", readonly=True, copy=False)
+    defor_analyzed_at = fields.Datetime(string="Analyzed At", readonly=True, copy=False, index=True,
+                                        help="When the alerts were last fetched; delta rescans start from here.")
+    defor_result_id = fields.Many2one(
+        "deforestation.analysis.result", string="Shared Analysis Result",
+        readonly=True, copy=False, ondelete="set null",
+    )
     alert_ids = fields.One2many(
         "eudr.declaration.line.alert",
         "line_id",
@@ -457,38 +855,61 @@ class EUDRDeclarationLineDeforestation(models.Model):
             geom_req = bbox
             step = 'latest/bbox'
 
-        url_latest = 'https://data-api.globalforestwatch.org/dataset/gfw_integrated_alerts/latest/query/json'
-        sql = "SELECT COUNT(*) AS cnt FROM results WHERE gfw_integrated_alerts__date >= '%s'" % date_from
+        provider = self.env['deforestation.provider.gfw']
+        base_url = provider._prepare_dataset_base('gfw_integrated_alerts')
+        short_from = (date.today() - timedelta(days=min(90, days_back))).isoformat()
+        chain = {
+            'latest': ('latest', base_url + '/latest/query/json', date_from),
+            'latest_90d': ('latest', base_url + '/latest/query/json', short_from),
+            'version': ('version', base_url + '/v20250909/query/json', date_from),
+        }
         headers = {'x-api-key': api_key, 'Content-Type': 'application/json', 'Origin': origin}
 
-        # Try 1: geometry (possibly expanded to bbox)
-        body = {'sql': sql, 'geometry': geom_req}
-        r = requests.post(url_latest, headers=headers, json=body, timeout=60)
-
-        # Fallbacks for 500
-        if r.status_code >= 500 and bbox and geom_req is not bbox:
-            r = requests.post(url_latest, headers=headers, json={'sql': sql, 'geometry': bbox}, timeout=60)
-            step = 'latest/bbox'
+        # Steps whose circuit is open are skipped.
+        health = provider._get_endpoint_health()
+        limiter = provider._get_rate_limiter()
+        planned = health.plan('gfw_integrated_alerts', ['latest', 'latest_90d', 'version'])
+        if not planned:
+            raise UserError(_(
+                "Servizio GFW temporaneamente non disponibile "
+                "(circuito aperto dopo errori ripetuti), riprovare più tardi."
+            ))
+
+        r = None
+        conn_error = None
+        use_bbox = geom_req is bbox
+        probe = planned[0] if health.is_open('gfw_integrated_alerts', planned[0]) else None
+        try:
+            for key in planned:
+                endpoint, url, step_from = chain[key]
+                sql = "SELECT COUNT(*) AS cnt FROM results WHERE gfw_integrated_alerts__date >= '%s'" % step_from
+                try:
+                    r = http_client.post(url, headers=headers, json={'sql': sql, 'geometry': bbox if use_bbox else geom_req},
+                                         timeout=60, limiter=limiter)
+                    # A 500 on the original geometry is often a geometry issue: retry on the bbox
+                    if key == 'latest' and r.status_code >= 500 and bbox and not use_bbox:
+                        use_bbox = True
+                        r = http_client.post(url, headers=headers, json={'sql': sql, 'geometry': bbox}, timeout=60,
+                                             limiter=limiter)
+                except requests.exceptions.RequestException as ex:
+                    health.record_failure('gfw_integrated_alerts', key)
+                    r, conn_error = None, ex
+                    continue
+                step = '%s/%s%s' % (endpoint, 'bbox' if use_bbox else 'original', '/90d' if key == 'latest_90d' else '')
+                if r.status_code >= 500:
+                    health.record_failure('gfw_integrated_alerts', key)
+                    continue
+                if r.status_code < 400:
+                    health.record_success('gfw_integrated_alerts', key)
+                break
+        finally:
+            if probe:
+                health.release('gfw_integrated_alerts', probe)
 
-        if r.status_code >= 500:
-            short_from = (date.today() - timedelta(days=min(90, days_back))).isoformat()
-            sql_short = "SELECT COUNT(*) AS cnt FROM results WHERE gfw_integrated_alerts__date >= '%s'" % short_from
-            if step.endswith('bbox'):
-                r = requests.post(url_latest, headers=headers, json={'sql': sql_short, 'geometry': bbox}, timeout=60)
-                step = 'latest/bbox/90d'
-            else:
-                r = requests.post(url_latest, headers=headers, json={'sql': sql_short, 'geometry': geom_req}, timeout=60)
-                step = 'latest/original/90d'
-
-        if r.status_code >= 500:
-            url_ver = 'https://data-api.globalforestwatch.org/dataset/gfw_integrated_alerts/v20250909/query/json'
-            if step.endswith('bbox'):
-                r = requests.post(url_ver, headers=headers, json={'sql': sql, 'geometry': bbox}, timeout=60)
-                step = 'version/bbox'
-            else:
-                r = requests.post(url_ver, headers=headers, json={'sql': sql, 'geometry': geom_req}, timeout=60)
-                step = 'version/original'
+        if r is None:
+            raise UserError(_("Connessione a GFW non riuscita: %s") % tools.ustr(conn_error))
 
+        provider._note_api_key_response(api_key, r.status_code)
         if r.status_code >= 400:
             snippet = (r.text or '')[:300]
             raise UserError(_("Data API HTTP %(code)s: step=%(s)s; body=%(b)s") % {'code': r.status_code, 's': step, 'b': snippet})
@@ -519,6 +940,32 @@ class EUDRDeclarationLineDeforestation(models.Model):
             return self.env['deforestation.service'].with_context(deforestation_providers_override=[provider_code])
         return None
 
+    def _deforestation_geometry_hash(self):
+        from ..utils.geo import geometry_fingerprint
+
+        self.ensure_one()
+        return geometry_fingerprint(self._line_geometry() or None) or False
+
+    def _filter_deforestation_stale(self):
+        """Return the lines whose stored analysis cannot be reused.
+
+        A line is re-analyzed when it was never analyzed (or failed), when the
+        configured provider changed, when its geometry no longer matches the
+        analyzed fingerprint, when the GFW window got longer, or when the
+        result is older than ``planetio.deforestation_freshness_days``.
+        """
+        provider_code, limit, window_days = deforestation_freshness_limits(self.env)
+        return self.filtered(lambda line: is_deforestation_result_stale(
+            line, line._deforestation_geometry_hash(), provider_code, limit, window_days,
+        ))
+
+    def _is_deforestation_incremental(self):
+        if 'deforestation_incremental' in self.env.context:
+            return bool(self.env.context['deforestation_incremental'])
+        ICP = self.env['ir.config_parameter'].sudo()
+        value = (ICP.get_param('planetio.deforestation_incremental') or '').strip().lower()
+        return value in ('1', 'true', 'yes', 'on')
+
     # ---------- Public: invoked by button on line ----------
     def retrieve_deforestation_status(self):
         """Return the latest deforestation status payload for the line.
@@ -543,10 +990,239 @@ class EUDRDeclarationLineDeforestation(models.Model):
             return svc.analyze_geojson(self._line_geometry() or {})
         return self._gfw_analyze_fallback()
 
-    def _apply_deforestation_status(self, status):
+    def _deforestation_snapshot(self):
+        """Return a detached copy of the line data read by the providers.
+
+        Snapshots can be handed to worker threads, which must not touch the
+        records of the caller's environment.
+        """
+        self.ensure_one()
+        hs_code = self.declaration_id.hs_code_id if 'hs_code_id' in self.declaration_id._fields else None
+        return self.env['deforestation.service']._GeometryLineProxy(
+            self._line_geometry() or {},
+            display_name=self.display_name,
+            line_id=self.id,
+            hs_code=hs_code.code if hs_code else None,
+            commodity=hs_code.commodity if hs_code else None,
+        )
+
+    def _deforestation_result_keys(self):
+        """Return ``{line_id: (key, info)}`` for the lines whose result can be shared.
+
+        The key combines the geometry fingerprint with the configured provider,
+        the length of the alert window (GFW and offline) and the commodity
+        (Plant4). Lines with external properties or without geometry get no key.
+        """
+        Results = self.env['deforestation.analysis.result']
+        provider_code, _limit, window_days = deforestation_freshness_limits(self.env)
+        date_from = None
+        if window_days:
+            date_from = self.env['deforestation.provider.gfw']._compute_date_from()
+        keys = {}
+        for line in self:
+            if parse_deforestation_external_properties(getattr(line, 'external_properties_json', None)):
+                continue
+            geometry_hash = line._deforestation_geometry_hash()
+            if not geometry_hash:
+                continue
+            commodity = None
+            if provider_code == 'plant4' and 'hs_code_id' in line.declaration_id._fields:
+                commodity = line.declaration_id.hs_code_id.commodity or None
+            key = Results.make_key(geometry_hash, provider_code, window_days, commodity)
+            keys[line.id] = (key, {
+                'geometry_hash': geometry_hash,
+                'provider': provider_code,
+                'date_from': date_from,
+                'commodity': commodity,
+            })
+        return keys
+
+    def _is_deforestation_plot_inherit(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        value = (ICP.get_param('planetio.deforestation_inherit_plot') or '').strip().lower()
+        return value in ('1', 'true', 'yes', 'on')
+
+    def _inherited_plot_statuses(self):
+        """Return ``{line_id: status}`` for the lines whose plot holds a fresh result.
+
+        The plot result is reused only when it was produced by the configured
+        provider, over the current window and freshness period, for the very
+        geometry of the line.
+        """
+        if 'plot_id' not in self._fields or not self._is_deforestation_plot_inherit():
+            return {}
+        provider_code, limit, window_days = deforestation_freshness_limits(self.env)
+        statuses = {}
+        for line in self.filtered('plot_id'):
+            plot = line.plot_id
+            if parse_deforestation_external_properties(getattr(line, 'external_properties_json', None)):
+                continue
+            if is_deforestation_result_stale(plot, line._deforestation_geometry_hash(),
+                                             provider_code, limit, window_days):
+                continue
+            status = plot.get_deforestation_raw_payload()
+            if not isinstance(status, dict):
+                continue
+            meta = status.get('meta') if isinstance(status.get('meta'), dict) else {}
+            meta.update({
+                'plot_id': plot.id,
+                'analyzed_at': fields.Datetime.to_string(plot.defor_analyzed_at),
+            })
+            status['meta'] = meta
+            statuses[line.id] = status
+        return statuses
+
+    def _iter_shared_deforestation_statuses(self, msg):
+        """Yield ``(line, status, error)`` for every line in ``self``.
+
+        Lines created from a plot take over the plot's fresh result when
+        ``planetio.deforestation_inherit_plot`` is set (see
+        :meth:`_inherited_plot_statuses`). When
+        ``deforestation.analysis.result`` reuse is enabled, a geometry is
+        sent to the provider once per provider and window: fresh stored results
+        are attached directly and, among the lines of ``self`` sharing a
+        geometry, only the first one is analyzed. The analyzed lines go
+        through :meth:`_iter_deforestation_statuses`.
+        """
+        Results = self.env['deforestation.analysis.result'] if 'deforestation.analysis.result' in self.env else None
+        if Results is not None and not Results.is_enabled():
+            Results = None
+        inherited = self._inherited_plot_statuses() if self else {}
+        if Results is None and not inherited:
+            yield from self._iter_deforestation_statuses(msg)
+            return
+
+        keys = self._deforestation_result_keys() if Results is not None else {}
+        found = Results.lookup([key for key, _info in keys.values()]) if keys else {}
+        analyzed_ids, seen = [], set()
+        for line in self:
+            key = keys.get(line.id, (None, None))[0]
+            if line.id in inherited:
+                continue
+            if key is None:
+                analyzed_ids.append(line.id)
+            elif key not in found and key not in seen:
+                seen.add(key)
+                analyzed_ids.append(line.id)
+        analyzed = self.browse(analyzed_ids)._iter_deforestation_statuses(msg)
+        unshared = {}
+
+        def _attach(status, result_id):
+            status = copy.deepcopy(status)
+            meta = status.get('meta') if isinstance(status.get('meta'), dict) else {}
+            meta['result_id'] = result_id
+            status['meta'] = meta
+            return status
+
+        leaders = set(analyzed_ids)
+        for line in self:
+            key, info = keys.get(line.id, (None, None))
+            if line.id in inherited:
+                yield line, inherited[line.id], None
+            elif line.id in leaders:
+                _line, status, error = next(analyzed)
+                shareable = key and error is None and isinstance(status, dict)
+                if shareable and isinstance(status.get('meta'), dict):
+                    # a hedged analysis may have been answered by another provider than the key's
+                    shareable = status['meta'].get('provider', info.get('provider')) == info.get('provider')
+                if shareable:
+                    result_id = Results.store(key, status, **info)
+                    found[key] = (result_id, status)
+                    status = _attach(status, result_id)
+                elif key:
+                    unshared[key] = (status, error)
+                yield line, status, error
+            elif key in found:
+                result_id, status = found[key]
+                yield line, _attach(status, result_id), None
+            else:
+                status, error = unshared.get(key, (None, None))
+                yield line, status, error
+
+    def _iter_deforestation_statuses(self, msg):
+        """Yield ``(line, status, error)`` for every line in ``self``.
+
+        Lines carrying external properties are resolved locally. The others
+        go through the provider batch API when ``planetio.deforestation_batch_mode``
+        is set, or through a bounded thread pool when
+        ``planetio.deforestation_concurrency`` is greater than one. Lines are
+        always yielded in order through ``with_progress`` so that callers keep
+        writing results on the main cursor.
+        """
+        svc = self[:1]._get_deforestation_service() if self else None
+        workers = svc.get_concurrency() if svc is not None and hasattr(svc, 'get_concurrency') else 1
+        batch = svc is not None and hasattr(svc, 'is_batch_enabled') and svc.is_batch_enabled()
+        if not batch and (workers <= 1 or len(self) <= 1):
+            for line in self.with_progress(msg):
+                try:
+                    yield line, line.retrieve_deforestation_status(), None
+                except Exception as e:
+                    yield line, None, e
+            return
+
+        local = {}
+        pending = []
+        for line in self:
+            status = parse_deforestation_external_properties(
+                getattr(line, 'external_properties_json', None)
+            )
+            if status:
+                local[line.id] = (status, None)
+            else:
+                pending.append(line)
+
+        if batch and pending:
+            try:
+                batch_results = svc.analyze_lines_batch([line._deforestation_snapshot() for line in pending])
+            except Exception as e:
+                batch_results = {line.id: e for line in pending}
+            if batch_results is not None:
+                for line in pending:
+                    res = batch_results.get(line.id)
+                    if isinstance(res, Exception):
+                        local[line.id] = (None, res)
+                    elif res is not None:
+                        local[line.id] = (res, None)
+                pending = [line for line in pending if line.id not in local]
+
+        futures = {}
+        executor = None
+        if workers > 1 and len(pending) > 1:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='planetio-defor')
+        try:
+            if executor is not None:
+                for line in pending:
+                    futures[line.id] = executor.submit(
+                        svc._analyze_line_in_worker,
+                        line._deforestation_snapshot(),
+                        svc.env.uid,
+                        dict(svc.env.context),
+                    )
+
+            for line in self.with_progress(msg):
+                if line.id in local:
+                    status, error = local[line.id]
+                    yield line, status, error
+                    continue
+                try:
+                    if line.id in futures:
+                        yield line, futures[line.id].result(), None
+                    else:
+                        yield line, line.retrieve_deforestation_status(), None
+                except Exception as e:
+                    yield line, None, e
+        finally:
+            for future in futures.values():
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def _apply_deforestation_status(self, status, buffer=None):
         """Apply the response from the external service to the line.
 
-        Returns a dict describing the outcome to simplify message building.
+        When ``buffer`` is given, values are collected there instead of
+        being written immediately. Returns a dict describing the outcome to
+        simplify message building.
         """
 
         def _short_message(text):
@@ -573,8 +1249,11 @@ class EUDRDeclarationLineDeforestation(models.Model):
                 vals['external_message_short'] = _short_message(msg)
             if 'defor_details_json' in self._fields:
                 vals['defor_details_json'] = False
+            if 'defor_raw_payload' in self._fields:
+                vals['defor_raw_payload'] = False
+            vals.update(self._deforestation_tracking_vals())
             if vals:
-                self.write(vals)
+                self._write_deforestation_vals(vals, buffer)
             result.update({
                 'status': 'ok',
                 'risk_flag': False,
@@ -594,15 +1273,22 @@ class EUDRDeclarationLineDeforestation(models.Model):
         vals = {}
         if 'defor_provider' in self._fields:
             vals['defor_provider'] = provider
+        if 'defor_result_id' in self._fields:
+            vals['defor_result_id'] = meta.get('result_id') or False
         if 'defor_alerts' in self._fields:
             vals['defor_alerts'] = alert_count
         if 'defor_area_ha' in self._fields and 'area_ha_total' in metrics:
             vals['defor_area_ha'] = metrics.get('area_ha_total') or 0.0
         if 'defor_details_json' in self._fields:
             try:
-                vals['defor_details_json'] = json.dumps(status, ensure_ascii=False)
+                vals['defor_details_json'] = json.dumps(slim_deforestation_status(status), ensure_ascii=False)
             except Exception:
                 vals['defor_details_json'] = tools.ustr(status)
+        if 'defor_raw_payload' in self._fields:
+            try:
+                vals['defor_raw_payload'] = compress_deforestation_payload(status)
+            except Exception:
+                vals['defor_raw_payload'] = False
         if 'external_ok' in self._fields:
             vals['external_ok'] = not risk_flag
         if 'external_status' in self._fields:
@@ -611,9 +1297,13 @@ class EUDRDeclarationLineDeforestation(models.Model):
             vals['external_message'] = message
         if 'external_message_short' in self._fields:
             vals['external_message_short'] = _short_message(message)
+        vals.update(self._deforestation_tracking_vals(meta.get('date_from'), meta.get('analyzed_at')))
         if vals:
-            self.write(vals)
-        self._sync_alert_records_from_status(status)
+            self._write_deforestation_vals(vals, buffer)
+        self._sync_alert_records_from_status(status, buffer=buffer)
+        self._sync_alert_series_from_status(status, buffer=buffer)
+        if buffer is None:
+            self.mapped('declaration_id')._refresh_deforestation_rollups()
         result.update({
             'status': 'fail' if risk_flag else 'ok',
             'alert_count': alert_count,
@@ -622,7 +1312,40 @@ class EUDRDeclarationLineDeforestation(models.Model):
         })
         return result
 
-    def _mark_deforestation_error(self, message):
+    def _deforestation_tracking_vals(self, date_from=None, analyzed_at=None):
+        """Values recording what was analyzed, used by the incremental mode.
+
+        ``analyzed_at`` keeps the original analysis time of a result taken
+        over from elsewhere (e.g. the plot of the line).
+        """
+        if 'defor_analyzed_at' not in self._fields:
+            return {}
+        try:
+            window_from = fields.Date.to_date(date_from) if date_from else False
+        except Exception:
+            window_from = False
+        try:
+            analyzed = fields.Datetime.to_datetime(analyzed_at) if analyzed_at else None
+        except Exception:
+            analyzed = None
+        return {
+            'defor_geometry_hash': self._deforestation_geometry_hash(),
+            'defor_date_from': window_from,
+            'defor_analyzed_at': analyzed or fields.Datetime.now(),
+        }
+
+    def get_deforestation_raw_payload(self):
+        """Return the full provider response stored for the line, if any."""
+        self.ensure_one()
+        return decompress_deforestation_payload(self.defor_raw_payload)
+
+    def _write_deforestation_vals(self, vals, buffer=None):
+        if buffer is not None:
+            buffer.write(self, vals)
+        else:
+            self.write(vals)
+
+    def _mark_deforestation_error(self, message, buffer=None):
         """Persist an error outcome on the line and return a result payload."""
 
         msg = tools.ustr(message)
@@ -631,6 +1354,10 @@ class EUDRDeclarationLineDeforestation(models.Model):
             vals['defor_alerts'] = 0
         if 'defor_details_json' in self._fields:
             vals['defor_details_json'] = False
+        if 'defor_raw_payload' in self._fields:
+            vals['defor_raw_payload'] = False
+        if 'defor_analyzed_at' in self._fields:
+            vals['defor_analyzed_at'] = False
         if 'external_status' in self._fields:
             vals['external_status'] = 'error'
         if 'external_ok' in self._fields:
@@ -640,9 +1367,14 @@ class EUDRDeclarationLineDeforestation(models.Model):
         if 'external_message_short' in self._fields:
             vals['external_message_short'] = msg[:255]
         if vals:
-            self.write(vals)
-        if hasattr(self, 'alert_ids'):
+            self._write_deforestation_vals(vals, buffer)
+        if buffer is not None:
+            buffer.replace_alerts(self, [])
+        elif hasattr(self, 'alert_ids'):
             self.alert_ids.unlink()
+        self._sync_alert_series_from_status(None, buffer=buffer)
+        if buffer is None:
+            self.mapped('declaration_id')._refresh_deforestation_rollups()
         return {
             'status': 'error',
             'alert_count': 0,
@@ -651,13 +1383,37 @@ class EUDRDeclarationLineDeforestation(models.Model):
         }
 
     def action_analyze_deforestation(self):
-        lines = self
-        grouped = defaultdict(lambda: {'items': [], 'alerts': 0, 'errors': 0})
+        grouped = self._run_deforestation_analysis()
+        self._post_deforestation_summary(grouped)
+        declarations = self.mapped('declaration_id')
+        if declarations:
+            declarations._set_stage_from_xmlid('planetio.eudr_stage_validated')
+        return True
+
+    def _run_deforestation_analysis(self):
+        """Analyze the lines and store their results.
 
-        for line in lines.with_progress("Analisi deforestazione..."):
+        Lines already being analyzed by another transaction are counted as
+        ``running`` and left to it. Returns the outcome grouped by declaration
+        id, as consumed by :meth:`_post_deforestation_summary`.
+        """
+        grouped = defaultdict(lambda: {'items': [], 'alerts': 0, 'errors': 0, 'skipped': 0, 'running': 0})
+        buffer = _DeforestationWriteBuffer(self.env)
+        flush_size = self._deforestation_write_batch_size()
+        claimed, busy = self._claim_deforestation_lines()
+        for line in busy:
+            grouped[line.declaration_id.id]['running'] += 1
+        lines = claimed
+        if claimed._is_deforestation_incremental():
+            lines = claimed._filter_deforestation_stale()
+            for line in claimed - lines:
+                grouped[line.declaration_id.id]['skipped'] += 1
+
+        for line, status, error in lines._iter_shared_deforestation_statuses("Analisi deforestazione..."):
             try:
-                status = line.retrieve_deforestation_status()
-                result = line._apply_deforestation_status(status)
+                if error is not None:
+                    raise error
+                result = line._apply_deforestation_status(status, buffer=buffer)
 
                 msg = result.get('message') or tools.ustr(status)
                 status_code = result.get('status') or 'ok'
@@ -667,7 +1423,8 @@ class EUDRDeclarationLineDeforestation(models.Model):
                 if status_code == 'error':
                     record['errors'] += 1
 
-                record['items'].append({'line': line, 'status': status_code, 'msg': msg})
+                record['items'].append({'line': line, 'status': status_code, 'msg': msg,
+                                        'alert_count': int(result.get('alert_count') or 0)})
 
             except Exception as e:
                 last = ''.join(traceback.format_exception_only(type(e), e)).strip()
@@ -675,41 +1432,288 @@ class EUDRDeclarationLineDeforestation(models.Model):
                     'name': (getattr(line, 'display_name', None) or line.id),
                     'err': tools.ustr(last or e),
                 }
-                result = line._mark_deforestation_error(msg)
+                result = line._mark_deforestation_error(msg, buffer=buffer)
                 record = grouped[line.declaration_id.id]
                 record['errors'] += 1
                 record['items'].append({'line': line, 'status': result.get('status', 'error'), 'msg': msg})
+            if len(buffer) >= flush_size:
+                buffer.flush()
+        buffer.flush()
+        return grouped
+
+    def _claim_deforestation_lines(self):
+        """Lock the lines for the current transaction; return ``(claimed, busy)``.
+
+        Transaction-level advisory locks keep two analyses (users, jobs, the
+        monitoring cron) from querying the providers for the same line and
+        rewriting each other's alerts. ``busy`` lines are being analyzed by
+        another transaction, which will store their result.
+        """
+        if not self.ids:
+            return self, self.browse()
+        self.env.cr.execute(
+            "SELECT id FROM unnest(%s) AS id WHERE pg_try_advisory_xact_lock(%s, id)",
+            (list(self.ids), DEFORESTATION_LOCK_NAMESPACE),
+        )
+        claimed_ids = {row[0] for row in self.env.cr.fetchall()}
+        claimed = self.filtered(lambda line: line.id in claimed_ids)
+        return claimed, self - claimed
+
+    def _deforestation_write_batch_size(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            size = int(ICP.get_param('planetio.deforestation_write_batch') or 200)
+        except Exception:
+            size = 200
+        return max(1, size)
+
+    # ---------- Delta rescans ----------
+    def _deforestation_rescan_params(self):
+        """Return ``(overlap_days, interval_hours, batch_size)`` of the monitoring rescans."""
+        ICP = self.env['ir.config_parameter'].sudo()
+
+        def _get_int(key, default):
+            try:
+                return max(0, int(ICP.get_param(key) or default))
+            except Exception:
+                return default
+
+        return (
+            _get_int('planetio.deforestation_rescan_overlap_days', 7),
+            _get_int('planetio.deforestation_rescan_interval_hours', 20),
+            max(1, _get_int('planetio.deforestation_rescan_batch', 5000)),
+        )
+
+    def _deforestation_rescan_from(self, provider_code, overlap_days, window_from, bucket='day'):
+        """Start of the delta window of the line, or None when it needs a full analysis.
+
+        Only lines whose stored analysis comes from the configured windowed
+        provider (GFW or offline) for the same geometry can be rescanned. The
+        window reaches ``overlap_days`` before the last scan, because alerts
+        are published some days after their date, and starts on the first
+        day of its series ``bucket`` so that no stored bucket straddles it.
+        """
+        self.ensure_one()
+        if provider_code not in DELTA_RESCAN_PROVIDERS or self.defor_provider != provider_code:
+            return None
+        if not self.defor_analyzed_at or self.external_status not in ('ok', 'fail'):
+            return None
+        if getattr(self, 'external_properties_json', None):
+            return None
+        if self.defor_geometry_hash != self._deforestation_geometry_hash():
+            return None
+        delta_from = series_bucket_start(self.defor_analyzed_at.date() - timedelta(days=overlap_days), bucket)
+        if window_from and delta_from <= window_from:
+            return None
+        return delta_from
+
+    @api.model
+    def _cron_rescan_deforestation(self):
+        """Cron entry point: bring the alerts of the least recently scanned lines up to date."""
+        _overlap, interval_hours, batch_size = self._deforestation_rescan_params()
+        lines = self.search([
+            ('defor_analyzed_at', '!=', False),
+            ('defor_analyzed_at', '<', fields.Datetime.now() - timedelta(hours=interval_hours)),
+        ], order='defor_analyzed_at asc', limit=batch_size)
+        if lines:
+            _logger.info("Deforestation rescan of %s lines: %s", len(lines), lines._run_deforestation_rescan())
+        return True
+
+    def _run_deforestation_rescan(self):
+        """Fetch only the alerts since the last scan of each line and merge them.
+
+        Lines are grouped by delta window start and sent to the provider with
+        the ``deforestation_date_from`` context key; lines that cannot be
+        rescanned get a full analysis, lines locked by another analysis are
+        left to it. A failed rescan keeps the stored result. Returns counters
+        for logging.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        provider_code = (ICP.get_param('planetio.deforestation_provider') or 'gfw').strip() or 'gfw'
+        bucket = (ICP.get_param('planetio.gfw_series_bucket') or 'day').strip().lower()
+        overlap_days, _interval, _batch = self._deforestation_rescan_params()
+        window_from = None
+        if provider_code in DELTA_RESCAN_PROVIDERS and 'deforestation.provider.gfw' in self.env:
+            window_from = fields.Date.to_date(self.env['deforestation.provider.gfw']._compute_date_from())
+
+        claimed, busy = self._claim_deforestation_lines()
+        windows = defaultdict(list)
+        full = self.browse()
+        for line in claimed:
+            delta_from = line._deforestation_rescan_from(provider_code, overlap_days, window_from, bucket)
+            if delta_from:
+                windows[delta_from].append(line.id)
+            else:
+                full |= line
+
+        counters = {'rescanned': 0, 'new_alerts': 0, 'errors': 0, 'full': 0, 'busy': len(busy)}
+        buffer = _DeforestationWriteBuffer(self.env)
+        flush_size = self._deforestation_write_batch_size()
+        for delta_from, line_ids in sorted(windows.items()):
+            lines = self.browse(line_ids).with_context(deforestation_date_from=delta_from.isoformat())
+            for line, status, error in lines._iter_deforestation_statuses(_("Monitoraggio deforestazione...")):
+                if error is not None or not isinstance(status, dict):
+                    counters['errors'] += 1
+                    continue
+                try:
+                    result = line._merge_deforestation_delta(status, delta_from, window_from, buffer=buffer)
+                except Exception:
+                    counters['errors'] += 1
+                    continue
+                if result is None:
+                    full |= line
+                    continue
+                counters['rescanned'] += 1
+                counters['new_alerts'] += result.get('new_alerts', 0)
+                if len(buffer) >= flush_size:
+                    buffer.flush()
+        buffer.flush()
+
+        if full:
+            counters['full'] = len(full)
+            full._run_deforestation_analysis()
+        return counters
+
+    def _merge_deforestation_delta(self, status, delta_from, window_from=None, buffer=None):
+        """Merge a delta ``status`` into the stored result of the line.
+
+        When the rescan found nothing only the scan time moves forward. Returns
+        the :meth:`_apply_deforestation_status` outcome with ``new_alerts``,
+        or None when there is no stored result to merge into.
+        """
+        self.ensure_one()
+        meta = status.get('meta') if isinstance(status.get('meta'), dict) else {}
+        if meta.get('provider', self.defor_provider) != self.defor_provider:
+            # answered by a hedge provider, which returns a full analysis
+            return dict(self._apply_deforestation_status(status, buffer=buffer), new_alerts=0)
+
+        new_alerts = int((status.get('metrics') or {}).get('alert_count') or 0)
+        if not new_alerts and not deforestation_series_rows(status):
+            self._write_deforestation_vals({'defor_analyzed_at': fields.Datetime.now()}, buffer)
+            return {'status': self.external_status, 'alert_count': self.defor_alerts, 'new_alerts': 0}
+
+        previous = self.get_deforestation_raw_payload()
+        if not isinstance(previous, dict):
+            return None
+        merged = merge_deforestation_delta(previous, status, delta_from, window_from)
+        provider_model = 'deforestation.provider.%s' % self.defor_provider
+        if provider_model in self.env:
+            merged['message'] = self.env[provider_model]._build_message(
+                merged['metrics'], merged['meta'].get('date_from') or delta_from,
+            )
+        known = self.defor_alerts or 0
+        result = self._apply_deforestation_status(merged, buffer=buffer)
+        result['new_alerts'] = max(0, result.get('alert_count', 0) - known)
+        return result
 
+    def _deforestation_summary_size(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            size = int(ICP.get_param('planetio.deforestation_summary_lines') or 20)
+        except Exception:
+            size = 20
+        return max(0, size)
+
+    @api.model
+    def _deforestation_item_html(self, item):
+        line = item['line']
+        anchor = "/web#id=%s&model=%s&view_type=form" % (line.id, line._name)
+        prefix = _DEFORESTATION_STATUS_LABELS.get(item.get('status') or 'ok', 'OK')
+        line_name = tools.html_escape(getattr(line, 'display_name', str(line.id)))
+        msg_txt = tools.html_escape(item['msg'])
+        return '<li>[%s] <a href="%s">%s</a>: %s</li>' % (prefix, anchor, line_name, msg_txt)
+
+    @api.model
+    def _deforestation_report_csv(self, items):
+        """Return the per-line outcome of a run as UTF-8 CSV bytes."""
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['line_id', 'line', 'status', 'alerts', 'area_ha', 'provider', 'analyzed_at', 'message'])
+        for item in items:
+            line = item['line']
+            writer.writerow([
+                line.id,
+                getattr(line, 'display_name', '') or '',
+                _DEFORESTATION_STATUS_LABELS.get(item.get('status') or 'ok', 'OK'),
+                item.get('alert_count', getattr(line, 'defor_alerts', 0) or 0),
+                getattr(line, 'defor_area_ha', 0.0) or 0.0,
+                getattr(line, 'defor_provider', '') or '',
+                getattr(line, 'defor_analyzed_at', '') or '',
+                tools.ustr(item.get('msg') or ''),
+            ])
+        return out.getvalue().encode('utf-8-sig')
+
+    @api.model
+    def _post_deforestation_summary(self, grouped):
+        """Post one chatter note per declaration.
+
+        Small runs list every line. Beyond ``planetio.deforestation_summary_lines``
+        lines the note only holds the counts and the riskiest lines, and the
+        full per-line outcome is attached as a CSV file.
+        """
         Declaration = self.env['eudr.declaration']
+        limit = self._deforestation_summary_size()
         for decl_id, data in grouped.items():
             decl = Declaration.browse(decl_id)
-            lis = []
-            for it in data['items']:
-                line = it['line']
-                anchor = "/web#id=%s&model=%s&view_type=form" % (line.id, line._name)
-                status_code = it.get('status') or 'ok'
-                prefix = "ALERT" if status_code == 'fail' else ("ERRORE" if status_code == 'error' else "OK")
-                line_name = tools.html_escape(getattr(line, 'display_name', str(line.id)))
-                msg_txt = tools.html_escape(it['msg'])
-                lis.append('<li>[%s] <a href="%s">%s</a>: %s</li>' % (prefix, anchor, line_name, msg_txt))
+            items = data['items']
             total = len(decl.line_ids)
-            done = len(data['items'])
+            done = len(items)
             summary_parts = [_("%(done)s/%(total)s lines analyzed") % {'done': done, 'total': total}]
             if data['alerts']:
                 summary_parts.append(_("%(count)s alert(s) detected") % {'count': data['alerts']})
             if data['errors']:
                 summary_parts.append(_("%(count)s error(s) detected") % {'count': data['errors']})
+            if data['skipped']:
+                summary_parts.append(_("%(count)s unchanged line(s) skipped") % {'count': data['skipped']})
+            if data.get('running'):
+                summary_parts.append(_("%(count)s line(s) already being analyzed by another user or job")
+                                     % {'count': data['running']})
             summary = ', '.join(summary_parts)
-            body = "<p>%s</p><ul>%s</ul>" % (tools.html_escape(summary), ''.join(lis))
-            decl.message_post(body=body, message_type='comment', subtype_xmlid='mail.mt_note')
 
-        declarations = lines.mapped('declaration_id')
-        if declarations:
-            declarations._set_stage_from_xmlid('planetio.eudr_stage_validated')
-        return True
+            if done <= limit:
+                body = "<p>%s</p><ul>%s</ul>" % (
+                    tools.html_escape(summary), ''.join(self._deforestation_item_html(it) for it in items))
+                decl.message_post(body=body, message_type='comment', subtype_xmlid='mail.mt_note')
+                continue
+
+            by_status = defaultdict(int)
+            for it in items:
+                by_status[it.get('status') or 'ok'] += 1
+            counts = ', '.join(
+                '%s: %s' % (_DEFORESTATION_STATUS_LABELS[code], by_status[code])
+                for code in ('fail', 'error', 'ok') if by_status.get(code)
+            )
+
+            def _risk(it):
+                line = it['line']
+                return (it.get('alert_count', getattr(line, 'defor_alerts', 0)) or 0,
+                        getattr(line, 'defor_area_ha', 0.0) or 0.0)
+
+            risky = sorted((it for it in items if it.get('status') == 'fail'), key=_risk, reverse=True)[:limit]
+            filename = 'Deforestation_Analysis_%s_%s.csv' % (
+                decl_id, fields.Datetime.now().strftime('%Y%m%d_%H%M%S'))
+            attachment = self.env['ir.attachment'].create({
+                'name': filename,
+                'res_model': decl._name,
+                'res_id': decl.id,
+                'mimetype': 'text/csv',
+                'type': 'binary',
+                'eudr_document_visible': False,
+                'datas': base64.b64encode(self._deforestation_report_csv(items)),
+            })
+            parts = ["<p>%s</p>" % tools.html_escape(summary), "<p>%s</p>" % tools.html_escape(counts)]
+            if risky:
+                parts.append("<p>%s</p><ul>%s</ul>" % (
+                    tools.html_escape(_("Riskiest lines:")),
+                    ''.join(self._deforestation_item_html(it) for it in risky),
+                ))
+            parts.append("<p>%s</p>" % tools.html_escape(
+                _("The outcome of every line is in the attached file %s.") % filename))
+            decl.message_post(body=''.join(parts), message_type='comment', subtype_xmlid='mail.mt_note',
+                              attachment_ids=attachment.ids)
 
     # ---------- Alerts helpers ----------
-    def _sync_alert_records_from_status(self, status):
+    def _sync_alert_records_from_status(self, status, buffer=None):
         if not isinstance(status, dict):
             return
 
@@ -717,23 +1721,30 @@ class EUDRDeclarationLineDeforestation(models.Model):
         if alerts_payload is None:
             return
 
-        self.alert_ids.unlink()
-        if not alerts_payload:
-            return
-
         provider = None
         if isinstance(status.get('meta'), dict):
             provider = status['meta'].get('provider')
 
-        Alert = self.env['eudr.declaration.line.alert']
         create_vals = []
         for alert in alerts_payload:
             vals = self._prepare_alert_vals(alert, provider)
             if vals:
                 create_vals.append(vals)
 
+        if buffer is not None:
+            buffer.replace_alerts(self, create_vals)
+            return
+        self.alert_ids.unlink()
         if create_vals:
-            Alert.create(create_vals)
+            self.env['eudr.declaration.line.alert'].create(create_vals)
+
+    def _sync_alert_series_from_status(self, status, buffer=None):
+        """Store the per-day alert series of ``status`` in the series table."""
+        rows = deforestation_series_rows(status)
+        if buffer is not None:
+            buffer.replace_series(self, rows)
+        elif 'eudr.declaration.line.alert.series' in self.env:
+            self.env['eudr.declaration.line.alert.series']._replace_lines({self.id: rows})
 
     def _extract_alerts_from_payload(self, payload):
         def _search(node):
@@ -1179,12 +2190,115 @@ class EUDRDeclarationLineDeforestation(models.Model):
 class EUDRDeclarationDeforestation(models.Model):
     _inherit = "eudr.declaration"
 
+    deforestation_job_ids = fields.One2many(
+        'eudr.deforestation.job', 'declaration_id', string="Deforestation Jobs", readonly=True,
+    )
+    deforestation_job_count = fields.Integer(compute='_compute_deforestation_job_count')
+
+    # Rollups of the line results, refreshed by _refresh_deforestation_rollups()
+    defor_lines_analyzed = fields.Integer(string="Lines Analyzed", readonly=True, copy=False)
+    defor_lines_with_alerts = fields.Integer(string="Lines with Alerts", readonly=True, copy=False)
+    defor_alert_area_ha = fields.Float(string="Alert Area (ha)", readonly=True, copy=False)
+    defor_max_risk = fields.Selection(
+        _RISK_LEVELS, string="Deforestation Risk", readonly=True, copy=False, index=True,
+    )
+    defor_last_analysis = fields.Datetime(string="Last Deforestation Analysis", readonly=True, copy=False)
+
+    def _compute_deforestation_job_count(self):
+        for decl in self:
+            decl.deforestation_job_count = len(decl.deforestation_job_ids)
+
+    def _refresh_deforestation_rollups(self):
+        """Recompute the stored rollups with grouped queries over lines and alerts."""
+        decl_ids = [decl_id for decl_id in self.ids if decl_id]
+        if not decl_ids:
+            return
+        Line = self.env['eudr.declaration.line'].sudo()
+        analyzed = {
+            group['declaration_id'][0]: group
+            for group in Line.read_group(
+                [('declaration_id', 'in', decl_ids), ('defor_analyzed_at', '!=', False)],
+                ['declaration_id', 'defor_area_ha:sum', 'defor_analyzed_at:max'],
+                ['declaration_id'], lazy=False,
+            )
+        }
+        flagged = {
+            group['declaration_id'][0]: group['__count']
+            for group in Line.read_group(
+                [('declaration_id', 'in', decl_ids), ('defor_analyzed_at', '!=', False),
+                 '|', ('defor_alerts', '>', 0), ('external_status', '=', 'fail')],
+                ['declaration_id'], ['declaration_id'], lazy=False,
+            )
+        }
+        self.env['eudr.declaration.line.alert'].flush(['risk_level', 'confidence', 'declaration_id'])
+        self.env.cr.execute("""
+            SELECT declaration_id, MAX(CASE
+                       WHEN LOWER(COALESCE(risk_level, confidence, '')) IN %s THEN 3
+                       WHEN LOWER(COALESCE(risk_level, confidence, '')) IN %s THEN 2
+                       WHEN LOWER(COALESCE(risk_level, confidence, '')) IN %s THEN 1
+                       ELSE 0 END)
+              FROM eudr_declaration_line_alert
+             WHERE declaration_id IN %s
+          GROUP BY declaration_id
+        """, (_RISK_TOKENS['high'], _RISK_TOKENS['medium'], _RISK_TOKENS['low'], tuple(decl_ids)))
+        alert_rank = dict(self.env.cr.fetchall())
+
+        for decl in self.browse(decl_ids):
+            group = analyzed.get(decl.id) or {}
+            lines_with_alerts = flagged.get(decl.id, 0)
+            rank = alert_rank.get(decl.id) or 0
+            if lines_with_alerts and rank < 2:
+                # flagged lines whose alerts carry no usable level
+                rank = 2
+            if not group:
+                risk = False
+            else:
+                risk = _RISK_LEVELS[rank][0]
+            vals = {
+                'defor_lines_analyzed': group.get('__count', 0),
+                'defor_lines_with_alerts': lines_with_alerts,
+                'defor_alert_area_ha': group.get('defor_area_ha') or 0.0,
+                'defor_max_risk': risk,
+                'defor_last_analysis': group.get('defor_analyzed_at') or False,
+            }
+            if any(decl[name] != value for name, value in vals.items()):
+                decl.sudo().write(vals)
+
+    def _deforestation_job_min_lines(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            return int(ICP.get_param('planetio.deforestation_job_min_lines') or 500)
+        except Exception:
+            return 500
+
     def action_analyze_deforestation(self):
-        for decl in self.web_progress_iter(self, msg="Message"):
+        # Large declarations are handed to a background job (0 disables it)
+        min_lines = self._deforestation_job_min_lines()
+        background = self.filtered(lambda d: min_lines > 0 and len(d.line_ids) >= min_lines)
+        for decl in self.web_progress_iter(self - background, msg="Message"):
             lines = decl.mapped('line_ids')
             if lines:
                 lines.action_analyze_deforestation()
-        return True
+        if not background:
+            return True
+        self.env['eudr.deforestation.job'].enqueue(background)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Deforestation analysis"),
+                'message': _("The analysis of %s declaration(s) runs in background; "
+                             "a summary will be posted in the chatter when it is complete.") % len(background),
+                'sticky': False,
+            },
+        }
+
+    def action_view_deforestation_jobs(self):
+        self.ensure_one()
+        action = self.env.ref('planetio.action_eudr_deforestation_job').read()[0]
+        action['domain'] = [('declaration_id', '=', self.id)]
+        action['context'] = {'default_declaration_id': self.id}
+        return action
 
     def action_create_deforestation_geojson(self):
         from ..services.eudr_adapter_odoo import (
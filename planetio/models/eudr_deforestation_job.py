@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+import logging
+import traceback
+
+from odoo import api, fields, models, _, tools
+
+_logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+# first key of the session advisory lock held while a job runs (second key: job id)
+JOB_LOCK_NAMESPACE = 20240502
+
+
+class EUDRDeforestationJob(models.Model):
+    """Background deforestation analysis of a whole declaration.
+
+    Lines are processed by id in chunks of ``chunk_size``. Each chunk runs in
+    its own transaction and moves the ``last_line_id`` checkpoint forward, so
+    a job interrupted by a worker restart resumes where it stopped. Besides
+    the counters the job only records which lines it analyzed: the chatter
+    summary, posted once when the last chunk is done, reads their outcome
+    from the lines themselves.
+    """
+    _name = 'eudr.deforestation.job'
+    _description = 'EUDR Deforestation Analysis Job'
+    _order = 'id desc'
+
+    declaration_id = fields.Many2one(
+        'eudr.declaration', string='Declaration', required=True, ondelete='cascade', index=True,
+    )
+    user_id = fields.Many2one('res.users', string='Requested by', default=lambda self: self.env.user)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], default='queued', required=True, index=True)
+    chunk_size = fields.Integer(default=100)
+    line_count = fields.Integer(string='Lines', readonly=True)
+    processed_count = fields.Integer(string='Analyzed', readonly=True)
+    skipped_count = fields.Integer(string='Skipped', readonly=True)
+    alert_count = fields.Integer(string='Alerts', readonly=True)
+    error_count = fields.Integer(string='Errors', readonly=True)
+    last_line_id = fields.Integer(string='Checkpoint', readonly=True,
+                                  help="Id of the last line processed; the job resumes after it.")
+    attempts = fields.Integer(readonly=True)
+    progress = fields.Float(compute='_compute_progress')
+    started_at = fields.Datetime(readonly=True)
+    finished_at = fields.Datetime(readonly=True)
+    last_error = fields.Text(readonly=True)
+    analyzed_line_ids = fields.Many2many(
+        'eudr.declaration.line', 'eudr_deforestation_job_line_rel', 'job_id', 'line_id',
+        string='Analyzed Lines', readonly=True, copy=False,
+        help="Lines analyzed by this job; lines skipped or left to another "
+             "running analysis are not recorded.",
+    )
+
+    @api.depends('line_count', 'processed_count', 'skipped_count')
+    def _compute_progress(self):
+        for job in self:
+            done = job.processed_count + job.skipped_count
+            job.progress = 100.0 * done / job.line_count if job.line_count else 0.0
+
+    def name_get(self):
+        return [(job.id, '%s #%s' % (job.declaration_id.display_name or '', job.id)) for job in self]
+
+    # ---------- Config ----------
+    @api.model
+    def _get_chunk_size(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            size = int(ICP.get_param('planetio.deforestation_job_chunk_size') or 100)
+        except Exception:
+            size = 100
+        return max(1, min(5000, size))
+
+    # ---------- Public API ----------
+    @api.model
+    def enqueue(self, declarations):
+        """Return the active job of each declaration, creating it if needed."""
+        jobs = self.browse()
+        for decl in declarations:
+            job = self.search([
+                ('declaration_id', '=', decl.id),
+                ('state', 'in', ('queued', 'running')),
+            ], limit=1)
+            if not job:
+                job = self.create({
+                    'declaration_id': decl.id,
+                    'chunk_size': self._get_chunk_size(),
+                    'line_count': len(decl.line_ids),
+                })
+            jobs |= job
+        return jobs
+
+    def action_cancel(self):
+        self.filtered(lambda j: j.state in ('queued', 'running')).write({'state': 'cancelled'})
+        return True
+
+    def action_requeue(self):
+        self.filtered(lambda j: j.state in ('failed', 'cancelled')).write({
+            'state': 'queued',
+            'attempts': 0,
+            'last_error': False,
+        })
+        return True
+
+    def action_run_now(self):
+        for job in self.filtered(lambda j: j.state in ('queued', 'running')):
+            job._run()
+        return True
+
+    @api.model
+    def _cron_process_jobs(self):
+        for job in self.search([('state', 'in', ('queued', 'running'))], order='id'):
+            job._run()
+
+    # ---------- Processing ----------
+    def _commit(self):
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    def _next_chunk(self):
+        self.ensure_one()
+        return self.env['eudr.declaration.line'].search([
+            ('declaration_id', '=', self.declaration_id.id),
+            ('id', '>', self.last_line_id),
+        ], order='id', limit=self.chunk_size or self._get_chunk_size())
+
+    def _process_chunk(self):
+        """Analyze the next chunk; return False when there is nothing left."""
+        self.ensure_one()
+        lines = self._next_chunk()
+        if not lines:
+            return False
+        grouped = lines._run_deforestation_analysis()
+        data = grouped.get(self.declaration_id.id) or {}
+        analyzed = [item['line'].id for item in data.get('items') or []]
+        self.write({
+            'last_line_id': max(lines.ids),
+            'analyzed_line_ids': [(4, line_id) for line_id in analyzed],
+            'processed_count': self.processed_count + len(data.get('items') or []),
+            'skipped_count': self.skipped_count + int(data.get('skipped') or 0) + int(data.get('running') or 0),
+            'alert_count': self.alert_count + int(data.get('alerts') or 0),
+            'error_count': self.error_count + int(data.get('errors') or 0),
+        })
+        return True
+
+    def _analyzed_lines(self):
+        """Lines analyzed by this job, i.e. neither skipped nor busy."""
+        self.ensure_one()
+        return self.analyzed_line_ids.sorted('id')
+
+    def _finish(self):
+        self.ensure_one()
+        Line = self.env['eudr.declaration.line']
+        items = [
+            {'line': line, 'status': line.external_status or 'ok', 'msg': line.external_message or '',
+             'alert_count': line.defor_alerts or 0}
+            for line in self._analyzed_lines()
+        ]
+        Line._post_deforestation_summary({self.declaration_id.id: {
+            'items': items,
+            'alerts': self.alert_count,
+            'errors': self.error_count,
+            'skipped': self.skipped_count,
+        }})
+        self.declaration_id._set_stage_from_xmlid('planetio.eudr_stage_validated')
+        self.write({'state': 'done', 'finished_at': fields.Datetime.now()})
+
+    def _try_lock(self):
+        """Take the job's session advisory lock; False when another request or
+        cron worker is running it. Unlike a row lock it survives the commit
+        after each chunk, and it is dropped with the connection if the
+        worker dies."""
+        self.env.cr.execute("SELECT pg_try_advisory_lock(%s, %s)", (JOB_LOCK_NAMESPACE, self.id))
+        return bool(self.env.cr.fetchone()[0])
+
+    def _unlock(self):
+        self.env.cr.execute("SELECT pg_advisory_unlock(%s, %s)", (JOB_LOCK_NAMESPACE, self.id))
+
+    def _run(self):
+        self.ensure_one()
+        if not self._try_lock():
+            _logger.info("Deforestation job %s is already being processed", self.id)
+            return False
+        try:
+            self.invalidate_cache()
+            if self.state not in ('queued', 'running'):
+                return False
+            return self._run_locked()
+        finally:
+            self._unlock()
+
+    def _run_locked(self):
+        vals = {'state': 'running'}
+        if not self.started_at:
+            vals['started_at'] = fields.Datetime.now()
+        self.write(vals)
+        self._commit()
+
+        while True:
+            try:
+                if not self._process_chunk():
+                    self._finish()
+                    self._commit()
+                    return True
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception("Deforestation job %s failed after line %s", self.id, self.last_line_id)
+                self.invalidate_cache()
+                attempts = self.attempts + 1
+                self.write({
+                    'attempts': attempts,
+                    'state': 'failed' if attempts >= MAX_ATTEMPTS else 'running',
+                    'last_error': tools.ustr(''.join(traceback.format_exception_only(type(e), e)).strip()),
+                })
+                self._commit()
+                return False
+            self._commit()
+            self.web_progress_percent(self.progress, _("Analisi deforestazione %s") % self.declaration_id.display_name)
+            self.invalidate_cache(['state'])
+            if self.state == 'cancelled':
+                return False
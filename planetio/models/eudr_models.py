@@ -676,6 +676,7 @@ class EUDRDeclaration(models.Model):
         for plot in lot.plot_ids:
             line_vals_list.append({
                 'declaration_id': self.id,
+                'plot_id': plot.id,
                 'name': plot.name,
                 'farmer_name': plot.producer_id.name,
                 'farmer_id_code': plot.producer_id.farmer_id_code or '',
@@ -764,6 +765,7 @@ class EUDRDeclarationLine(models.Model):
     geo_type_raw = fields.Char()
     geo_type = fields.Selection([("point","Point"),("polygon","Polygon")])
     geometry = fields.Text()  # GeoJSON string
+    plot_id = fields.Many2one('eudr.plot', string="Plot", ondelete='set null', index=True)
 
     external_uid = fields.Char(index=True)
     external_status = fields.Selection([
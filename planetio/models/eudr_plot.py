@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError
 import json
 
+from .eudr_deforestation import (
+    compress_deforestation_payload,
+    decompress_deforestation_payload,
+    deforestation_freshness_limits,
+    is_deforestation_result_stale,
+)
+
 
 class EUDRPlot(models.Model):
     _name = "eudr.plot"
@@ -82,6 +89,24 @@ class EUDRPlot(models.Model):
         string="Lots"
     )
 
+    # Deforestation screening (see action_analyze_deforestation)
+    defor_status = fields.Selection([
+        ('ok', 'No Alerts'),
+        ('fail', 'Alerts'),
+        ('error', 'Error'),
+    ], string="Deforestation Status", readonly=True, copy=False)
+    defor_provider = fields.Char(string="Deforestation Provider", readonly=True, copy=False)
+    defor_alerts = fields.Integer(string="Deforestation Alerts", readonly=True, copy=False)
+    defor_area_ha = fields.Float(string="Deforestation Area (ha)", readonly=True, copy=False)
+    defor_message = fields.Char(string="Deforestation Message", readonly=True, copy=False)
+    defor_raw_payload = fields.Binary(
+        string="Deforestation Raw Payload", readonly=True, attachment=False, prefetch=False, copy=False,
+        help="zlib-compressed JSON of the full provider response, without geometries.",
+    )
+    defor_geometry_hash = fields.Char(string="Analyzed Geometry Hash", readonly=True, copy=False)
+    defor_date_from = fields.Date(string="Analysis Window Start", readonly=True, copy=False)
+    defor_analyzed_at = fields.Datetime(string="Analyzed At", readonly=True, copy=False)
+
     active = fields.Boolean(default=True)
     notes = fields.Text(string="Notes")
     company_id = fields.Many2one(
@@ -183,3 +208,152 @@ class EUDRPlot(models.Model):
             'view_mode': 'tree,form',
             'context': {'default_plot_ids': [(4, self.id)]},
         }
+
+    # ---------- Deforestation ----------
+    def _plot_geometry(self):
+        self.ensure_one()
+        try:
+            geom = json.loads(self.geometry) if self.geometry else None
+        except Exception:
+            return None
+        return geom if isinstance(geom, dict) and geom.get('type') else None
+
+    def _deforestation_geometry_hash(self):
+        from ..utils.geo import geometry_fingerprint
+
+        self.ensure_one()
+        return geometry_fingerprint(self._plot_geometry()) or False
+
+    def _deforestation_commodity(self):
+        self.ensure_one()
+        hs_codes = self.lot_ids.mapped('hs_code_id')[:1]
+        return (hs_codes.code, hs_codes.commodity) if hs_codes else (None, None)
+
+    def _deforestation_snapshot(self):
+        """Line-like object handed to the deforestation providers."""
+        self.ensure_one()
+        hs_code, commodity = self._deforestation_commodity()
+        return self.env['deforestation.service']._GeometryLineProxy(
+            self._plot_geometry() or {},
+            display_name=self.display_name,
+            line_id=self.id,
+            hs_code=hs_code,
+            commodity=commodity,
+        )
+
+    def get_deforestation_raw_payload(self):
+        """Return the full provider response stored for the plot, if any."""
+        self.ensure_one()
+        return decompress_deforestation_payload(self.defor_raw_payload)
+
+    def _apply_deforestation_status(self, status):
+        self.ensure_one()
+        if not isinstance(status, dict):
+            status = {'message': tools.ustr(status), 'metrics': {}, 'meta': {}}
+        metrics = status.get('metrics') or {}
+        meta = status.get('meta') if isinstance(status.get('meta'), dict) else {}
+        alert_count = int(metrics.get('alert_count') or 0)
+        risk_flag = bool(alert_count) or bool(meta.get('risk_flag'))
+        try:
+            date_from = fields.Date.to_date(meta.get('date_from')) if meta.get('date_from') else False
+        except Exception:
+            date_from = False
+        self.write({
+            'defor_status': 'fail' if risk_flag else 'ok',
+            'defor_provider': meta.get('provider', 'gfw'),
+            'defor_alerts': alert_count,
+            'defor_area_ha': metrics.get('area_ha_total') or 0.0,
+            'defor_message': tools.ustr(status.get('message') or '')[:255],
+            'defor_raw_payload': compress_deforestation_payload(status),
+            'defor_geometry_hash': self._deforestation_geometry_hash(),
+            'defor_date_from': date_from,
+            'defor_analyzed_at': fields.Datetime.now(),
+        })
+        return 'fail' if risk_flag else 'ok'
+
+    def _mark_deforestation_error(self, message):
+        self.write({
+            'defor_status': 'error',
+            'defor_alerts': 0,
+            'defor_area_ha': 0.0,
+            'defor_message': tools.ustr(message)[:255],
+            'defor_raw_payload': False,
+            'defor_analyzed_at': False,
+        })
+        return 'error'
+
+    def action_analyze_deforestation(self):
+        """Screen the plots with the configured deforestation provider.
+
+        Results are kept on the plot so that declaration lines created from it
+        can take them over (``planetio.deforestation_inherit_plot``). Plots
+        sharing a geometry are analyzed once through
+        ``deforestation.analysis.result``; in incremental mode plots with a
+        fresh result are skipped. The remaining plots go through
+        ``deforestation.service.analyze_snapshots``, i.e. the provider batch
+        API or the worker pool, like declaration lines.
+        """
+        if 'deforestation.service' not in self.env:
+            raise UserError(_("Servizio di analisi deforestazione non disponibile."))
+        Line = self.env['eudr.declaration.line']
+        provider_code, limit, window_days = deforestation_freshness_limits(self.env)
+        svc = self.env['deforestation.service'].with_context(deforestation_providers_override=[provider_code])
+
+        plots = self
+        if Line._is_deforestation_incremental():
+            plots = self.filtered(lambda plot: is_deforestation_result_stale(
+                plot, plot._deforestation_geometry_hash(), provider_code, limit, window_days,
+            ))
+
+        Results = self.env['deforestation.analysis.result']
+        date_from = self.env['deforestation.provider.gfw']._compute_date_from() if window_days else None
+        keys = {}
+        if Results.is_enabled():
+            for plot in plots:
+                commodity = plot._deforestation_commodity()[1] if provider_code == 'plant4' else None
+                geometry_hash = plot._deforestation_geometry_hash()
+                keys[plot.id] = (Results.make_key(geometry_hash, provider_code, window_days, commodity),
+                                 [geometry_hash, provider_code, date_from, commodity])
+        found = Results.lookup([key for key, _info in keys.values()]) if keys else {}
+
+        counts = {'ok': 0, 'fail': 0, 'error': 0, 'skipped': len(self) - len(plots)}
+        # plots sharing a key are analyzed once, through their first plot
+        leaders, snapshots = {}, []
+        for plot in plots:
+            if not plot._plot_geometry():
+                continue
+            key = keys.get(plot.id, (None, None))[0]
+            if key in found or (key and key in leaders):
+                continue
+            if key:
+                leaders[key] = plot.id
+            snapshots.append(plot._deforestation_snapshot())
+        results = svc.analyze_snapshots(snapshots) if snapshots else {}
+
+        for plot in plots.with_progress(_("Analisi deforestazione particelle...")):
+            if not plot._plot_geometry():
+                counts[plot._mark_deforestation_error(_("Geometria mancante o non valida."))] += 1
+                continue
+            key, info = keys.get(plot.id, (None, None))
+            if key in found:
+                status = found[key][1]
+            else:
+                status = results.get(leaders.get(key, plot.id) if key else plot.id)
+                if isinstance(status, Exception) or status is None:
+                    counts[plot._mark_deforestation_error(status or _("Analisi non eseguita."))] += 1
+                    continue
+                if key and isinstance(status, dict):
+                    found[key] = (Results.store(key, status, *info), status)
+            counts[plot._apply_deforestation_status(status)] += 1
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Deforestation analysis"),
+                'message': _("%(ok)s plot(s) without alerts, %(fail)s with alerts, "
+                             "%(error)s failed, %(skipped)s still fresh.") % counts,
+                'sticky': False,
+                'type': 'warning' if counts['fail'] or counts['error'] else 'info',
+            },
+        }
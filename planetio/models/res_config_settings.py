@@ -35,11 +35,27 @@ class ResConfigSettings(models.TransientModel):
         help="Se 'buffer': le geometrie sotto soglia vengono espanse.\n"
              "Se 'strict': le geometrie sotto soglia vengono rifiutate."
     )
+    gfw_query_mode = fields.Selection(
+        selection=[('multi', 'Separate queries'),
+                   ('single', 'Single grouped query'),
+                   ('fanout', 'Several alert datasets')],
+        string="GFW - Query mode",
+        config_parameter='planetio.gfw_query_mode',
+        default='multi',
+        help="'Several alert datasets' queries the datasets below in parallel and merges their alerts, "
+             "counting once the same pixel reported on the same date by more than one system.",
+    )
+    gfw_fanout_datasets = fields.Char(
+        string="GFW - Alert datasets",
+        config_parameter='planetio.gfw_fanout_datasets',
+        help="Comma separated GFW dataset ids, e.g. umd_glad_landsat_alerts,umd_glad_sentinel2_alerts,wur_radd_alerts.",
+    )
 
     deforestation_provider = fields.Selection(
         selection=[
             ('gfw', 'Global Forest Watch'),
             ('plant4', 'Plant-for-the-Planet Farm Analysis'),
+            ('offline', 'Offline alert extracts'),
         ],
         string="Deforestation Provider",
         config_parameter='planetio.deforestation_provider',
@@ -47,6 +63,70 @@ class ResConfigSettings(models.TransientModel):
         help="Select the service used to run deforestation analysis on EUDR declarations.",
     )
 
+    deforestation_concurrency = fields.Integer(
+        string="Deforestation Concurrency",
+        config_parameter='planetio.deforestation_concurrency',
+        default=1,
+        help="Number of lines analyzed in parallel by the deforestation providers. "
+             "1 keeps the sequential behaviour.",
+    )
+    deforestation_hedge_providers = fields.Char(
+        string="Hedge Providers",
+        config_parameter='planetio.deforestation_hedge_providers',
+        help="Comma separated provider codes (e.g. plant4) started in parallel when the main provider "
+             "is slower than usual. Leave empty to disable hedged requests.",
+    )
+    deforestation_hedge_percentile = fields.Integer(
+        string="Hedge Percentile",
+        config_parameter='planetio.deforestation_hedge_percentile',
+        default=95,
+        help="The next provider starts once the main one exceeds this percentile of its recent response times.",
+    )
+    deforestation_incremental = fields.Boolean(
+        string="Incremental Deforestation Analysis",
+        config_parameter='planetio.deforestation_incremental',
+        help="Only analyze lines that are new, whose geometry changed or whose result is stale.",
+    )
+    deforestation_inherit_plot = fields.Boolean(
+        string="Reuse Plot Deforestation Results",
+        config_parameter='planetio.deforestation_inherit_plot',
+        help="Lines created from a plot take over the plot's fresh analysis instead of querying the provider.",
+    )
+    deforestation_freshness_days = fields.Integer(
+        string="Deforestation Result Freshness (days)",
+        config_parameter='planetio.deforestation_freshness_days',
+        default=30,
+        help="Results older than this are analyzed again in incremental mode and are no longer "
+             "shared between lines with the same geometry. 0 never expires them.",
+    )
+    deforestation_rescan_overlap_days = fields.Integer(
+        string="Rescan Overlap (days)",
+        config_parameter='planetio.deforestation_rescan_overlap_days',
+        default=7,
+        help="The monitoring rescan asks the provider for the alerts since the last scan minus these days, "
+             "to catch alerts published late.",
+    )
+    deforestation_summary_lines = fields.Integer(
+        string="Deforestation Summary Lines",
+        config_parameter='planetio.deforestation_summary_lines',
+        default=20,
+        help="Analyses of more lines post only the counts and the riskiest lines in the chatter; "
+             "the outcome of every line is attached as a CSV file.",
+    )
+    geometry_simplify_tolerance_m = fields.Float(
+        string="Geometry Simplification Tolerance (m)",
+        config_parameter='planetio.geometry_simplify_tolerance_m',
+        default=2.0,
+        help="Douglas-Peucker tolerance applied to detailed plots before they are sent to the provider. "
+             "0 sends the geometries unchanged.",
+    )
+    geometry_simplify_min_vertices = fields.Integer(
+        string="Geometry Simplification Threshold",
+        config_parameter='planetio.geometry_simplify_min_vertices',
+        default=200,
+        help="Only geometries with at least this many vertices are simplified.",
+    )
+
     plant4_api_key = fields.Char(
         string="Plant-for-the-Planet API Key",
         config_parameter='deforestation.plant4.api_key',
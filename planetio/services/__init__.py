@@ -1,2 +1,3 @@
 from . import api
+from . import rate_limiter
 from .deforestation_service import DeforestationService
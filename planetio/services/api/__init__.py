@@ -2,4 +2,5 @@
 from . import deforestation_provider_base
 from . import gfw_deforestation
 from . import plant4_deforestation
-#from . import gfw_key_provider
\ No newline at end of file
+from . import offline_deforestation
+from . import gfw_key_provider
\ No newline at end of file
@@ -11,3 +11,9 @@ class DeforestationProviderBase(models.AbstractModel):
     # deve restituire: {'message': str, 'flag': bool|None, 'score': float|None, 'raw': dict}
     def analyze_line(self, line):
         raise NotImplementedError()
+
+    # limiter condiviso tra i worker da passare a http_client.request(limiter=...)
+    def _get_rate_limiter(self):
+        if 'planetio.rate.limiter' in self.env:
+            return self.env['planetio.rate.limiter'].sudo()
+        return None
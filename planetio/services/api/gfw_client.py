@@ -1,8 +1,9 @@
 import json
 import math
-import requests
 from typing import Dict, Any, List, Optional
 
+from .. import http_client
+
 BASE = "https://data-api.globalforestwatch.org"
 VERIFY_SSL = True  # set False only for local debugging
 
@@ -12,7 +13,7 @@ class GFWError(Exception):
 def get_access_token(email: str, password: str) -> str:
     headers = {"Accept": "application/json", "Content-Type": "application/x-www-form-urlencoded"}
     data = {"username": email, "password": password}
-    resp = requests.post(f"{BASE}/auth/token", headers=headers, data=data, timeout=30, verify=VERIFY_SSL)
+    resp = http_client.post(f"{BASE}/auth/token", headers=headers, data=data, timeout=30, verify=VERIFY_SSL)
     if not resp.ok:
         raise GFWError(f"Auth failed: {resp.status_code} {resp.text[:300]}")
     token = (resp.json().get("data") or {}).get("access_token")
@@ -21,7 +22,7 @@ def get_access_token(email: str, password: str) -> str:
     return token
 
 def list_api_keys(access_token: str) -> List[dict]:
-    resp = requests.get(f"{BASE}/auth/apikeys",
+    resp = http_client.get(f"{BASE}/auth/apikeys",
                         headers={"Authorization": f"Bearer {access_token}"},
                         timeout=30, verify=VERIFY_SSL)
     if not resp.ok:
@@ -33,7 +34,7 @@ def create_or_get_api_key(access_token: str, alias: str, email: str, organizatio
     payload = {"alias": alias, "email": email, "organization": organization}
     if domains is not None:
         payload["domains"] = domains
-    r = requests.post(f"{BASE}/auth/apikey", headers=headers, json=payload, timeout=30, verify=VERIFY_SSL)
+    r = http_client.post(f"{BASE}/auth/apikey", headers=headers, json=payload, timeout=30, verify=VERIFY_SSL)
     if r.status_code in (200, 201):
         return r.json()["data"][0]["api_key"]
     if r.status_code != 409:
@@ -47,7 +48,7 @@ def create_or_get_api_key(access_token: str, alias: str, email: str, organizatio
                 import time as _t
                 payload["alias"] = f"{alias}-{int(_t.time())}"
                 payload["domains"] = domains or ["localhost"]
-                r2 = requests.post(f"{BASE}/auth/apikey", headers=headers, json=payload, timeout=30, verify=VERIFY_SSL)
+                r2 = http_client.post(f"{BASE}/auth/apikey", headers=headers, json=payload, timeout=30, verify=VERIFY_SSL)
                 if not r2.ok:
                     raise GFWError(f"Create apikey (with domains) failed: {r2.status_code} {r2.text[:300]}")
                 return r2.json()["data"][0]["api_key"]
@@ -55,7 +56,7 @@ def create_or_get_api_key(access_token: str, alias: str, email: str, organizatio
 
     # alias not found → create a fresh one
     payload["domains"] = domains or ["localhost"]
-    r3 = requests.post(f"{BASE}/auth/apikey", headers=headers, json=payload, timeout=30, verify=VERIFY_SSL)
+    r3 = http_client.post(f"{BASE}/auth/apikey", headers=headers, json=payload, timeout=30, verify=VERIFY_SSL)
     if not r3.ok:
         raise GFWError(f"Create apikey (fallback) failed: {r3.status_code} {r3.text[:300]}")
     return r3.json()["data"][0]["api_key"]
@@ -63,12 +64,22 @@ def create_or_get_api_key(access_token: str, alias: str, email: str, organizatio
 def _test_geometry() -> Dict[str, Any]:
     return square_bbox(lat=0.5, lon=0.5, half_km=5.0)
 
-def validate_api_key(api_key: str) -> bool:
+def check_api_key(api_key: str) -> Optional[bool]:
+    """Probe the Data API with ``api_key``.
+
+    Returns True when the key works, False when the API rejects it (401/403)
+    and None when the answer says nothing about the key (outage, timeout).
+    """
     try:
         _ = query_integrated_alerts(api_key, _test_geometry(), date_from="2025-01-01", limit=1)
         return True
+    except GFWError as exc:
+        return False if getattr(exc, "status_code", None) in (401, 403) else None
     except Exception:
-        return False
+        return None
+
+def validate_api_key(api_key: str) -> bool:
+    return bool(check_api_key(api_key))
 
 def square_bbox(lat: float, lon: float, half_km: float = 5.0) -> Dict[str, Any]:
     dlat = half_km / 111.0
@@ -92,7 +103,9 @@ def query_integrated_alerts(api_key: str, geometry_geojson: dict, date_from="202
         "Content-Type": "application/json",
         "Origin": "http://localhost",
     }
-    resp = requests.post(url, headers=headers, json={"sql": sql, "geometry": geometry_geojson}, timeout=60, verify=VERIFY_SSL)
+    resp = http_client.post(url, headers=headers, json={"sql": sql, "geometry": geometry_geojson}, timeout=60, verify=VERIFY_SSL)
     if not resp.ok:
-        raise GFWError(f"Query failed: {resp.status_code} {resp.text[:300]}")
+        error = GFWError(f"Query failed: {resp.status_code} {resp.text[:300]}")
+        error.status_code = resp.status_code
+        raise error
     return resp.json().get("data", []) or []
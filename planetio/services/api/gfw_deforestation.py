@@ -1,13 +1,237 @@
 # -*- coding: utf-8 -*-
+import hashlib
 import json
+import logging
 import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime, timedelta
 
 import requests
 
-from odoo import models, _, tools
+from odoo import fields, models, _, tools
 from odoo.exceptions import UserError
 
+from .. import http_client
+from . import gfw_key_provider
+from ...utils.geo import (
+    geometry_bbox, geometry_fingerprint, point_in_geometry, simplify_for_submission, union_geometries,
+)
+from .gfw_endpoint_health import DEFAULT_COOLDOWN, DEFAULT_FAILURE_THRESHOLD, gfw_endpoint_health
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://data-api.globalforestwatch.org'
+# alert systems merged by the ``fanout`` query mode
+DEFAULT_FANOUT_DATASETS = ('umd_glad_landsat_alerts', 'umd_glad_sentinel2_alerts', 'wur_radd_alerts')
+CONFIDENCE_RANK = {'low': 0, 'nominal': 1, 'high': 2, 'highest': 3}
+
+# HTTP requests of the ``fanout`` mode, shared by every line of the process.
+# The threads only send requests: they never open a cursor.
+FANOUT_POOL_SIZE = 8
+_fanout_pool = None
+_fanout_pool_lock = threading.Lock()
+
+
+def fanout_pool():
+    global _fanout_pool
+    if _fanout_pool is None:
+        with _fanout_pool_lock:
+            if _fanout_pool is None:
+                _fanout_pool = ThreadPoolExecutor(max_workers=FANOUT_POOL_SIZE, thread_name_prefix='gfw-fanout')
+    return _fanout_pool
+
+
+def post_sql_query(url, headers, sql, geometry, limiter=None):
+    payload = {'sql': sql}
+    if geometry:
+        payload['geometry'] = geometry
+    return http_client.post(url, headers=headers, json=payload, timeout=90, limiter=limiter)
+
+
+class _CachedResponse:
+    """Replay a cached Data API answer with the ``requests`` response API."""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text or ''
+        self.ok = 200 <= status_code < 400
+        self.from_cache = True
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class GFWQueryCache(models.Model):
+    _name = 'deforestation.gfw.query.cache'
+    _description = 'GFW Data API Query Cache'
+    _order = 'last_hit_at desc, id desc'
+
+    key = fields.Char(required=True, index=True, readonly=True)
+    geometry_hash = fields.Char(index=True, readonly=True)
+    dataset = fields.Char(index=True, readonly=True)
+    endpoint = fields.Char(readonly=True)
+    date_from = fields.Char(readonly=True)
+    sql = fields.Text(readonly=True)
+    status_code = fields.Integer(readonly=True)
+    response_json = fields.Text(readonly=True)
+    hit_count = fields.Integer(readonly=True, default=0)
+    last_hit_at = fields.Datetime(readonly=True)
+    expires_at = fields.Datetime(index=True, readonly=True)
+
+    _sql_constraints = [
+        ('key_unique', 'unique(key)', 'Cache key must be unique.'),
+    ]
+
+    # In-process counters, reset on restart. Persistent per-entry hits are
+    # kept in ``hit_count``.
+    _stats_lock = threading.Lock()
+    _stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    # --------- Config ---------
+    def _get_int_param(self, key, default):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            return int(ICP.get_param(key) or default)
+        except Exception:
+            return default
+
+    def is_enabled(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        raw = (ICP.get_param('planetio.gfw_cache_enabled') or 'True').strip().lower()
+        return raw in ('1', 'true', 'y', 'yes')
+
+    def _ttl(self):
+        return timedelta(hours=max(0, self._get_int_param('planetio.gfw_cache_ttl_hours', 24)))
+
+    def _max_entries(self):
+        return max(0, self._get_int_param('planetio.gfw_cache_max_entries', 5000))
+
+    # --------- Keys ---------
+    @staticmethod
+    def _split_url(url):
+        """Return ``(dataset, endpoint)`` from a ``/dataset/<id>/<version>/query`` URL."""
+        parts = (url or '').split('/dataset/', 1)
+        tokens = parts[1].split('/') if len(parts) == 2 else []
+        dataset = tokens[0] if tokens else ''
+        endpoint = tokens[1] if len(tokens) > 1 else ''
+        return dataset, endpoint
+
+    def _make_key(self, url, sql, geometry, date_from):
+        dataset, endpoint = self._split_url(url)
+        geometry_hash = geometry_fingerprint(geometry) if geometry else ''
+        token = json.dumps([geometry_hash, dataset, endpoint, date_from or '', sql or ''],
+                           separators=(',', ':'))
+        return hashlib.sha256(token.encode('utf-8')).hexdigest(), geometry_hash, dataset, endpoint
+
+    @classmethod
+    def _bump(cls, counter, amount=1):
+        with cls._stats_lock:
+            cls._stats[counter] += amount
+
+    # --------- Public API ---------
+    def lookup(self, url, sql, geometry, date_from):
+        """Return a :class:`_CachedResponse` for a fresh entry, or ``None``."""
+        key = self._make_key(url, sql, geometry, date_from)[0]
+        now = fields.Datetime.now()
+        self.env.cr.execute(
+            """
+            SELECT id, status_code, response_json
+              FROM deforestation_gfw_query_cache
+             WHERE key = %s AND (expires_at IS NULL OR expires_at > %s)
+            """,
+            (key, now),
+        )
+        row = self.env.cr.fetchone()
+        if not row:
+            self._bump('misses')
+            return None
+        # Best-effort hit accounting: never wait on a row another worker holds.
+        self.env.cr.execute(
+            """
+            UPDATE deforestation_gfw_query_cache
+               SET hit_count = hit_count + 1, last_hit_at = %s
+             WHERE id IN (SELECT id FROM deforestation_gfw_query_cache
+                           WHERE id = %s FOR UPDATE SKIP LOCKED)
+            """,
+            (now, row[0]),
+        )
+        self._bump('hits')
+        return _CachedResponse(row[1] or 200, row[2])
+
+    def store(self, url, sql, geometry, date_from, response):
+        """Persist a successful Data API response."""
+        ttl = self._ttl()
+        if not ttl:
+            return
+        key, geometry_hash, dataset, endpoint = self._make_key(url, sql, geometry, date_from)
+        now = fields.Datetime.now()
+        self.env.cr.execute(
+            """
+            INSERT INTO deforestation_gfw_query_cache
+                   (key, geometry_hash, dataset, endpoint, date_from, sql, status_code,
+                    response_json, hit_count, last_hit_at, expires_at,
+                    create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (key) DO UPDATE
+               SET status_code = EXCLUDED.status_code,
+                   response_json = EXCLUDED.response_json,
+                   expires_at = EXCLUDED.expires_at,
+                   write_date = EXCLUDED.write_date
+            """,
+            (key, geometry_hash, dataset, endpoint, date_from, sql, response.status_code,
+             response.text, now, now + ttl, self.env.uid, now, self.env.uid, now),
+        )
+        self._bump('stores')
+        self._evict_overflow()
+
+    def _evict_overflow(self, slack=0.1):
+        """Drop the least recently used entries above the size limit.
+
+        ``slack`` lets the table grow a little over the limit so that
+        eviction runs in batches rather than on every insert.
+        """
+        max_entries = self._max_entries()
+        if not max_entries:
+            return 0
+        self.env.cr.execute("SELECT COUNT(*) FROM deforestation_gfw_query_cache")
+        count = self.env.cr.fetchone()[0]
+        if count <= max_entries * (1.0 + slack):
+            return 0
+        self.env.cr.execute(
+            """
+            DELETE FROM deforestation_gfw_query_cache
+             WHERE id IN (SELECT id FROM deforestation_gfw_query_cache
+                           ORDER BY COALESCE(last_hit_at, create_date) ASC
+                           LIMIT %s)
+            """,
+            (count - max_entries,),
+        )
+        evicted = self.env.cr.rowcount
+        self._bump('evictions', evicted)
+        return evicted
+
+    def get_stats(self):
+        """Return in-process hit/miss counters and table-wide totals."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] / lookups) if lookups else 0.0
+        self.env.cr.execute("SELECT COUNT(*), COALESCE(SUM(hit_count), 0) FROM deforestation_gfw_query_cache")
+        stats['entries'], stats['total_hits'] = self.env.cr.fetchone()
+        return stats
+
+    def _gc_expired(self):
+        """Cron entry point: drop expired entries and enforce the size limit."""
+        self.env.cr.execute(
+            "DELETE FROM deforestation_gfw_query_cache WHERE expires_at <= %s",
+            (fields.Datetime.now(),),
+        )
+        expired = self.env.cr.rowcount
+        evicted = self._evict_overflow(slack=0.0)
+        _logger.info("GFW query cache: %s expired and %s overflow entries removed", expired, evicted)
+        return True
+
 
 class DeforestationProviderGFW(models.AbstractModel):
     _name = 'deforestation.provider.gfw'
@@ -16,14 +240,44 @@ class DeforestationProviderGFW(models.AbstractModel):
 
     # --------- Config / prerequisites ---------
     def _get_api_key(self):
+        """Return the stored key, revalidated once per validation TTL.
+
+        The check is only done when GFW credentials are configured, since a
+        rejected key can't be replaced otherwise.
+        """
         icp = self.env['ir.config_parameter'].sudo()
         key = (icp.get_param('planetio.gfw_api_key') or '').strip()
+        if icp.get_param('planetio.gfw_email') and icp.get_param('planetio.gfw_password'):
+            try:
+                key = (gfw_key_provider.get_valid_gfw_api_key(self.env) or '').strip()
+            except Exception:
+                _logger.warning("GFW API key validation failed, using the stored key", exc_info=True)
         return key or None
 
     def check_prerequisites(self):
         if not self._get_api_key():
             raise UserError(_("GFW API Key mancante. Imposta 'GFW API Key' nelle Impostazioni."))
 
+    def _note_api_key_response(self, api_key, status_code):
+        if api_key:
+            gfw_key_provider.note_gfw_api_key_response(self.env, api_key, status_code)
+
+    def _refresh_api_key(self, rejected_key):
+        """Replace a key rejected (401/403) by a real query.
+
+        Returns the new key, or None when no GFW credentials are configured
+        or the refresh failed.
+        """
+        gfw_key_provider.invalidate_gfw_api_key(self.env, rejected_key)
+        icp = self.env['ir.config_parameter'].sudo()
+        if not (icp.get_param('planetio.gfw_email') and icp.get_param('planetio.gfw_password')):
+            return None
+        try:
+            return gfw_key_provider.refresh_gfw_api_key(self.env, rejected_key)
+        except Exception:
+            _logger.warning("GFW API key refresh failed", exc_info=True)
+            return None
+
     # --------- Geometry helpers ---------
     def _geometry_center(self, geom):
         if not geom or not isinstance(geom, dict):
@@ -116,11 +370,36 @@ class DeforestationProviderGFW(models.AbstractModel):
             'Origin': origin,
         }
 
-    def _post_query(self, url, headers, sql, geometry):
-        payload = {'sql': sql}
-        if geometry:
-            payload['geometry'] = geometry
-        return requests.post(url, headers=headers, json=payload, timeout=90)
+    def _get_query_cache(self):
+        if 'deforestation.gfw.query.cache' not in self.env:
+            return None
+        if self.env.context.get('gfw_cache_bypass'):
+            return None
+        cache = self.env['deforestation.gfw.query.cache'].sudo()
+        return cache if cache.is_enabled() else None
+
+    def _http_post_query(self, url, headers, sql, geometry):
+        return post_sql_query(url, headers, sql, geometry, limiter=self._get_rate_limiter())
+
+    def _post_query(self, url, headers, sql, geometry, date_from=None):
+        cache = self._get_query_cache()
+        if cache is not None:
+            cached = cache.lookup(url, sql, geometry, date_from)
+            if cached is not None:
+                return cached
+        response = self._http_post_query(url, headers, sql, geometry)
+        api_key = headers.get('x-api-key')
+        self._note_api_key_response(api_key, response.status_code)
+        if response.status_code in (401, 403) and api_key:
+            new_key = self._refresh_api_key(api_key)
+            if new_key and new_key != api_key:
+                # headers are shared with the remaining fallback steps
+                headers['x-api-key'] = new_key
+                response = self._http_post_query(url, headers, sql, geometry)
+                self._note_api_key_response(new_key, response.status_code)
+        if cache is not None and 200 <= response.status_code < 300:
+            cache.store(url, sql, geometry, date_from, response)
+        return response
 
     def _safe_json(self, response):
         try:
@@ -161,73 +440,101 @@ class DeforestationProviderGFW(models.AbstractModel):
             return None
 
     # --------- Dataset querying ---------
+    def _get_base_url(self):
+        """GFW Data API root; ``planetio.gfw_base_url`` points it to a mock server for benchmarks."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return (ICP.get_param('planetio.gfw_base_url') or DEFAULT_BASE_URL).strip().rstrip('/') or DEFAULT_BASE_URL
+
     def _prepare_dataset_base(self, dataset_id):
-        return f'https://data-api.globalforestwatch.org/dataset/{dataset_id}'
+        return f'{self._get_base_url()}/dataset/{dataset_id}'
+
+    def _get_endpoint_health(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            threshold = int(ICP.get_param('planetio.gfw_circuit_failures') or DEFAULT_FAILURE_THRESHOLD)
+        except Exception:
+            threshold = DEFAULT_FAILURE_THRESHOLD
+        try:
+            cooldown = float(ICP.get_param('planetio.gfw_circuit_cooldown') or DEFAULT_COOLDOWN)
+        except Exception:
+            cooldown = DEFAULT_COOLDOWN
+        gfw_endpoint_health.configure(failure_threshold=threshold, cooldown=cooldown)
+        return gfw_endpoint_health
 
     def _gfw_execute_sql(self, headers, geometry, sql_template, date_from, allow_short=True):
-        base_url = self._prepare_dataset_base('gfw_integrated_alerts')
-        sql_long = sql_template.replace('{date_from}', date_from)
+        dataset_id = 'gfw_integrated_alerts'
+        base_url = self._prepare_dataset_base(dataset_id)
         latest_url = f'{base_url}/latest/query/json'
         version_url = f'{base_url}/v20250909/query/json'
+        short_from = (date.today() - timedelta(days=90)).isoformat()
+        chain = {
+            'latest': (latest_url, date_from, 'latest', None),
+            'latest_90d': (latest_url, short_from, 'latest', '90d'),
+            'version': (version_url, date_from, 'v20250909', 'version'),
+        }
+        steps = ['latest', 'latest_90d', 'version'] if allow_short else ['latest', 'version']
 
-        try:
-            response = self._post_query(latest_url, headers, sql_long, geometry)
-        except requests.exceptions.RequestException as ex:
-            raise UserError(_("Connessione a GFW non riuscita: %s") % tools.ustr(ex))
-
-        if response.status_code < 500:
-            if response.status_code >= 400:
-                snippet = (response.text or '')[:300]
-                raise UserError(_("Provider gfw: Richiesta rifiutata da GFW: %s") % tools.ustr(snippet or response.status_code))
-            return self._safe_json(response), {
-                'endpoint': 'latest',
-                'date_from': date_from,
-                'sql': sql_long,
-                'status_code': response.status_code,
-            }
-
-        if allow_short:
-            short_from = (date.today() - timedelta(days=90)).isoformat()
-            sql_short = sql_template.replace('{date_from}', short_from)
-            try:
-                short_resp = self._post_query(latest_url, headers, sql_short, geometry)
-            except requests.exceptions.RequestException as ex:
-                raise UserError(_("Connessione a GFW non riuscita: %s") % tools.ustr(ex))
-            if short_resp.status_code < 500:
-                if short_resp.status_code >= 400:
-                    snippet = (short_resp.text or '')[:300]
-                    raise UserError(_("Provider gfw: Richiesta rifiutata da GFW: %s") % tools.ustr(snippet or short_resp.status_code))
-                return self._safe_json(short_resp), {
-                    'endpoint': 'latest',
-                    'date_from': short_from,
-                    'sql': sql_short,
-                    'status_code': short_resp.status_code,
-                    'fallback': '90d',
-                }
+        health = self._get_endpoint_health()
+        planned = health.plan(dataset_id, steps)
+        if not planned:
+            raise UserError(_(
+                "Provider gfw: servizio GFW temporaneamente non disponibile "
+                "(circuito aperto dopo errori ripetuti), riprovare più tardi."
+            ))
+        # an open step handed out by plan() is our probe: give it back however the call ends
+        probe = planned[0] if health.is_open(dataset_id, planned[0]) else None
 
+        response = None
+        conn_error = None
         try:
-            version_resp = self._post_query(version_url, headers, sql_long, geometry)
-        except requests.exceptions.RequestException as ex:
-            raise UserError(_("Connessione a GFW non riuscita: %s") % tools.ustr(ex))
-
-        if version_resp.status_code >= 400:
-            snippet = (version_resp.text or '')[:300]
-            raise UserError(_("Provider gfw: Richiesta rifiutata da GFW: %s") % tools.ustr(snippet or version_resp.status_code))
+            for step in planned:
+                url, step_from, endpoint, fallback = chain[step]
+                sql = sql_template.replace('{date_from}', step_from)
+                try:
+                    response = self._post_query(url, headers, sql, geometry, date_from=step_from)
+                except requests.exceptions.RequestException as ex:
+                    health.record_failure(dataset_id, step)
+                    conn_error = ex
+                    response = None
+                    continue
+                from_cache = getattr(response, 'from_cache', False)
+                if response.status_code >= 500:
+                    if not from_cache:
+                        health.record_failure(dataset_id, step)
+                    continue
+                if response.status_code >= 400:
+                    # 401/403/429... say nothing about the endpoint's health
+                    snippet = (response.text or '')[:300]
+                    raise UserError(_("Provider gfw: Richiesta rifiutata da GFW: %s") % tools.ustr(snippet or response.status_code))
+                if not from_cache:
+                    health.record_success(dataset_id, step)
+                info = {
+                    'endpoint': endpoint,
+                    'date_from': step_from,
+                    'sql': sql,
+                    'status_code': response.status_code,
+                }
+                if fallback:
+                    info['fallback'] = fallback
+                if len(planned) < len(steps):
+                    info['skipped'] = [s for s in steps if s not in planned]
+                return self._safe_json(response), info
+        finally:
+            if probe:
+                health.release(dataset_id, probe)
 
-        return self._safe_json(version_resp), {
-            'endpoint': 'v20250909',
-            'date_from': date_from,
-            'sql': sql_long,
-            'status_code': version_resp.status_code,
-            'fallback': 'version',
-        }
+        if response is None and conn_error is not None:
+            raise UserError(_("Connessione a GFW non riuscita: %s") % tools.ustr(conn_error))
+        snippet = (response.text or '')[:300] if response is not None else ''
+        raise UserError(_("Provider gfw: Richiesta rifiutata da GFW: %s") % tools.ustr(
+            snippet or (response.status_code if response is not None else '')))
 
     def _gfw_execute_sql_on_dataset(self, headers, geometry, dataset_id, sql_template, date_from):
         base_url = self._prepare_dataset_base(dataset_id)
         latest_url = f'{base_url}/latest/query/json'
         sql = sql_template.replace('{date_from}', date_from)
         try:
-            resp = self._post_query(latest_url, headers, sql, geometry)
+            resp = self._post_query(latest_url, headers, sql, geometry, date_from=date_from)
         except requests.exceptions.RequestException as ex:
             raise UserError(_("Connessione a GFW non riuscita: %s") % tools.ustr(ex))
         if resp.status_code >= 400:
@@ -278,6 +585,129 @@ class DeforestationProviderGFW(models.AbstractModel):
             debug_errors.append(f"breakdown_best_effort_error: {tools.ustr(ex)}")
         return agg_data, agg_info, ser_data, ser_info, brk_data, brk_info
 
+    # --------- Single grouped query ---------
+    _CONFIDENCE_LEVELS = ('nominal', 'high', 'highest')
+    _BUCKET_EXPRESSIONS = {
+        'day': '{df}',
+        'week': "date_trunc('week', {df})",
+        'month': "date_trunc('month', {df})",
+    }
+
+    def _get_query_mode(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        mode = (ICP.get_param('planetio.gfw_query_mode') or 'multi').strip().lower()
+        return mode if mode in ('multi', 'single', 'fanout') else 'multi'
+
+    def _build_grouped_sql(self, dataset_id='gfw_integrated_alerts', bucket='day', min_confidence=None):
+        """Return one SQL template grouping alerts by date bucket and confidence.
+
+        Every figure the multi-query mode reads from separate statements
+        (aggregate, time series, breakdown) can be derived from these rows.
+        No LIMIT is applied: the bucket size bounds the row count instead.
+        """
+        df = self._date_field_for_dataset(dataset_id)
+        conf = f'{dataset_id}__confidence'
+        bucket_expr = self._BUCKET_EXPRESSIONS.get(bucket, '{df}').format(df=df)
+        where = [f"{df} >= '{{date_from}}'"]
+        if min_confidence in self._CONFIDENCE_LEVELS[1:]:
+            allowed = self._CONFIDENCE_LEVELS[self._CONFIDENCE_LEVELS.index(min_confidence):]
+            where.append(f"{conf} IN ({', '.join(repr(level) for level in allowed)})")
+        return (
+            f"SELECT {bucket_expr} AS alert_date, {conf} AS confidence, "
+            f"COUNT(*) AS alert_count, SUM(area__ha) AS area_ha, "
+            f"MIN({df}) AS first_alert_date, MAX({df}) AS last_alert_date "
+            f"FROM results WHERE {' AND '.join(where)} "
+            f"GROUP BY {bucket_expr}, {conf} ORDER BY alert_date DESC"
+        )
+
+    def _summarize_grouped_rows(self, rows):
+        """Derive aggregate, series and breakdown payloads from grouped rows.
+
+        Returns three ``{'data': [...]}`` dicts shaped like the answers of
+        the aggregate, time-series and breakdown queries, plus the alert
+        count per confidence level.
+        """
+        rank = {level: idx for idx, level in enumerate(self._CONFIDENCE_LEVELS)}
+        buckets = {}
+        by_confidence = {}
+        total_count = 0.0
+        total_area = 0.0
+        first_dates = []
+        last_dates = []
+        for row in rows or []:
+            bucket = self._extract_text(row, ['alert_date', 'date'])
+            if not bucket:
+                continue
+            bucket = bucket[:10]
+            count = self._extract_number(row, ['alert_count', 'count', 'cnt']) or 0.0
+            area = self._extract_number(row, ['area_ha', 'area']) or 0.0
+            confidence = self._extract_text(row, ['confidence']) or 'n/a'
+            first = self._extract_text(row, ['first_alert_date']) or bucket
+            last = self._extract_text(row, ['last_alert_date']) or bucket
+            total_count += count
+            total_area += area
+            first_dates.append(first[:10])
+            last_dates.append(last[:10])
+            by_confidence[confidence] = by_confidence.get(confidence, 0.0) + count
+
+            entry = buckets.setdefault(bucket, {
+                'alert_date': bucket, 'alert_count': 0.0, 'area_ha': 0.0,
+                'confidence': confidence, 'last_alert_date': last[:10],
+            })
+            entry['alert_count'] += count
+            entry['area_ha'] += area
+            entry['last_alert_date'] = max(entry['last_alert_date'], last[:10])
+            if rank.get(confidence, -1) > rank.get(entry['confidence'], -1):
+                entry['confidence'] = confidence
+
+        series = sorted(buckets.values(), key=lambda e: e['alert_date'], reverse=True)
+        aggregate = {
+            'alert_count': total_count,
+            'area_ha_total': total_area,
+            'first_alert_date': min(first_dates) if first_dates else None,
+            'last_alert_date': max(last_dates) if last_dates else None,
+        }
+        return (
+            {'data': [aggregate]},
+            {'data': [{k: e[k] for k in ('alert_date', 'alert_count', 'area_ha')} for e in series]},
+            {'data': [dict(e) for e in series]},
+            by_confidence,
+        )
+
+    def _run_grouped_best_effort(self, headers, geom_to_use, start_date, debug_errors, allow_short=True):
+        """Single-request replacement for :meth:`_run_integrated_all_best_effort`.
+
+        With week or month buckets the bucket at the edge of the 30/90 day
+        windows straddles the cutoff, so the recent figures come from a
+        second, per-day query limited to the last 90 days. ``recent_entries``
+        is None with day buckets or when that query failed.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        bucket = (ICP.get_param('planetio.gfw_series_bucket') or 'day').strip().lower()
+        if bucket not in self._BUCKET_EXPRESSIONS:
+            bucket = 'day'
+        min_confidence = (ICP.get_param('planetio.gfw_min_confidence') or '').strip().lower() or None
+        sql = self._build_grouped_sql(bucket=bucket, min_confidence=min_confidence)
+        grouped_data, grouped_info = self._gfw_execute_sql(headers, geom_to_use, sql, start_date, allow_short=allow_short)
+        grouped_info = dict(grouped_info, bucket=bucket, min_confidence=min_confidence)
+        agg_data, ser_data, brk_data, by_confidence = self._summarize_grouped_rows(grouped_data.get('data'))
+
+        recent_entries = None
+        if bucket != 'day':
+            recent_from = max(grouped_info.get('date_from') or start_date,
+                              (date.today() - timedelta(days=90)).isoformat())
+            day_sql = self._build_grouped_sql(bucket='day', min_confidence=min_confidence)
+            try:
+                recent_data, _recent_info = self._gfw_execute_sql(
+                    headers, geom_to_use, day_sql, recent_from, allow_short=False)
+                recent_entries = [
+                    {'date': e['alert_date'], 'alert_count': e['alert_count'], 'area_ha': e['area_ha']}
+                    for e in self._summarize_grouped_rows(recent_data.get('data'))[1]['data']
+                ]
+            except Exception as ex:
+                debug_errors.append(f"recent_days_error: {tools.ustr(ex)}")
+        return grouped_data, grouped_info, agg_data, ser_data, brk_data, by_confidence, recent_entries
+
     def _date_field_for_dataset(self, dataset_id):
         return {
             'gfw_integrated_alerts': 'gfw_integrated_alerts__date',
@@ -331,6 +761,8 @@ class DeforestationProviderGFW(models.AbstractModel):
 
     # --------- Date window ---------
     def _compute_date_from(self):
+        """Start of the alert window; a delta rescan narrows it through the
+        ``deforestation_date_from`` context key (ISO date)."""
         ICP = self.env['ir.config_parameter'].sudo()
         raw_years = ICP.get_param('planetio.gfw_alert_years')
         try:
@@ -346,7 +778,63 @@ class DeforestationProviderGFW(models.AbstractModel):
             years_back = max(1, int(math.ceil(days_val / 365.0)))
         years_back = max(1, min(5, years_back))
         days_back = years_back * 365
-        return (date.today() - timedelta(days=days_back)).isoformat()
+        window_from = (date.today() - timedelta(days=days_back)).isoformat()
+        delta_from = self.env.context.get('deforestation_date_from')
+        if delta_from and str(delta_from)[:10] > window_from:
+            return str(delta_from)[:10]
+        return window_from
+
+    # --------- Result building ---------
+    def _sum_recent(self, series_entries, days):
+        cutoff = date.today() - timedelta(days=days)
+        total_count = 0.0
+        total_area = 0.0
+        for e in series_entries:
+            d = self._parse_iso_date(e.get('date'))
+            if d and d >= cutoff:
+                total_count += e.get('alert_count') or 0.0
+                total_area += e.get('area_ha') or 0.0
+        return total_count, total_area
+
+    def _build_metrics(self, alert_count, area_total, first_alert, last_alert, series_entries,
+                       recent_entries=None, with_recent=True):
+        """``recent_entries`` are per-day rows for the 30/90 day figures when
+        ``series_entries`` are coarser buckets; ``with_recent=False`` leaves
+        those figures out."""
+        metrics = {
+            'alert_count': int(round(alert_count)),
+            'area_ha_total': float(area_total),
+            'first_alert_date': first_alert,
+            'last_alert_date': last_alert,
+        }
+        if not with_recent:
+            return metrics
+        recent = series_entries if recent_entries is None else recent_entries
+        recent_30_count, recent_30_area = self._sum_recent(recent, 30)
+        recent_90_count, recent_90_area = self._sum_recent(recent, 90)
+        metrics.update({
+            'alert_count_30d': int(round(recent_30_count)),
+            'area_ha_30d': float(recent_30_area),
+            'alert_count_90d': int(round(recent_90_count)),
+            'area_ha_90d': float(recent_90_area),
+        })
+        return metrics
+
+    def _build_message(self, metrics, date_from):
+        msg_parts = []
+        if metrics['alert_count']:
+            msg_parts.append(_("GFW Data API: %(n)s allerta/e rilevate dal %(d)s") % {
+                'n': metrics['alert_count'], 'd': date_from
+            })
+        else:
+            msg_parts.append(_("GFW Data API: nessuna allerta rilevata dal %(d)s") % {
+                'd': date_from
+            })
+        if metrics['area_ha_total']:
+            msg_parts.append(_("Area interessata: %(area).2f ha") % {'area': metrics['area_ha_total']})
+        if metrics['last_alert_date']:
+            msg_parts.append(_("Ultima allerta: %s") % metrics['last_alert_date'])
+        return "; ".join(msg_parts)
 
     # --------- Main ---------
     def analyze_line(self, line):
@@ -371,14 +859,30 @@ class DeforestationProviderGFW(models.AbstractModel):
             raise UserError(_("Manca geometria (GeoJSON o lat/lon) sulla riga %s") %
                             (getattr(line, 'display_name', None) or line.id))
 
-        final_geom_used, geometry_mode = self._ensure_min_area_geometry(geom, min_area_ha_req)
+        submit_geom, simplification = simplify_for_submission(self.env, geom)
+        final_geom_used, geometry_mode = self._ensure_min_area_geometry(submit_geom, min_area_ha_req)
 
         date_from = self._compute_date_from()
         headers = self._prepare_headers(origin, api_key)
         debug_errors = []
 
-        agg_data, agg_info, ser_data, ser_info, brk_data, brk_info = self._run_integrated_all_best_effort(
-            headers, final_geom_used, date_from, debug_errors, allow_short_for_agg=True)
+        query_mode = self._get_query_mode()
+        if query_mode == 'fanout':
+            result = self._analyze_line_fanout(geom, final_geom_used, geometry_mode, headers, date_from,
+                                               max_detail_rows, debug_errors)
+            result['meta']['simplification'] = simplification
+            return result
+        grouped_data = None
+        by_confidence = None
+        recent_entries = None
+        if query_mode == 'single':
+            grouped_data, agg_info, agg_data, ser_data, brk_data, by_confidence, recent_entries = \
+                self._run_grouped_best_effort(headers, final_geom_used, date_from, debug_errors)
+            ser_info = brk_info = {'endpoint': agg_info.get('endpoint'), 'date_from': agg_info.get('date_from'),
+                                   'derived_from': 'grouped'}
+        else:
+            agg_data, agg_info, ser_data, ser_info, brk_data, brk_info = self._run_integrated_all_best_effort(
+                headers, final_geom_used, date_from, debug_errors, allow_short_for_agg=True)
 
         row = (agg_data.get('data') or [{}])[0]
         alert_count = self._extract_number(row, ['alert_count', 'cnt', 'count']) or 0.0
@@ -405,9 +909,10 @@ class DeforestationProviderGFW(models.AbstractModel):
         details_data = {'data': []}
         details_info = {'endpoint': None, 'date_from': agg_info.get('date_from') or date_from, 'dataset': used_dataset}
         try:
-            details_data, details_info = self._run_alert_details_best_effort(
-                headers, final_geom_used, agg_info.get('date_from') or date_from, used_dataset, debug_errors,
-            )
+            if query_mode != 'single':
+                details_data, details_info = self._run_alert_details_best_effort(
+                    headers, final_geom_used, agg_info.get('date_from') or date_from, used_dataset, debug_errors,
+                )
         except Exception as ex:
             debug_errors.append(f"details_error[{used_dataset}]: {tools.ustr(ex)}")
             details_data = {'data': []}
@@ -478,51 +983,11 @@ class DeforestationProviderGFW(models.AbstractModel):
         else:
             breakdown_entries = detail_entries
 
-        def _parse_date_safe(token):
-            try:
-                return self._parse_iso_date(token)
-            except Exception:
-                return None
-
-        def _sum_recent(days):
-            cutoff = date.today() - timedelta(days=days)
-            total_count = 0.0
-            total_area = 0.0
-            for e in series_entries:
-                d = _parse_date_safe(e.get('date'))
-                if d and d >= cutoff:
-                    total_count += e.get('alert_count') or 0.0
-                    total_area += e.get('area_ha') or 0.0
-            return total_count, total_area
-
-        recent_30_count, recent_30_area = _sum_recent(30)
-        recent_90_count, recent_90_area = _sum_recent(90)
-
-        metrics = {
-            'alert_count': int(round(alert_count)),
-            'area_ha_total': float(area_total),
-            'first_alert_date': first_alert,
-            'last_alert_date': last_alert,
-            'alert_count_30d': int(round(recent_30_count)),
-            'area_ha_30d': float(recent_30_area),
-            'alert_count_90d': int(round(recent_90_count)),
-            'area_ha_90d': float(recent_90_area),
-        }
-
-        msg_parts = []
-        if metrics['alert_count']:
-            msg_parts.append(_("GFW Data API: %(n)s allerta/e rilevate dal %(d)s") % {
-                'n': metrics['alert_count'], 'd': (agg_info.get('date_from') or date_from)
-            })
-        else:
-            msg_parts.append(_("GFW Data API: nessuna allerta rilevata dal %(d)s") % {
-                'd': (agg_info.get('date_from') or date_from)
-            })
-        if metrics['area_ha_total']:
-            msg_parts.append(_("Area interessata: %(area).2f ha") % {'area': metrics['area_ha_total']})
-        if metrics['last_alert_date']:
-            msg_parts.append(_("Ultima allerta: %s") % metrics['last_alert_date'])
-        message = "; ".join(msg_parts)
+        bucketed = query_mode == 'single' and agg_info.get('bucket', 'day') != 'day'
+        metrics = self._build_metrics(alert_count, area_total, first_alert, last_alert, series_entries,
+                                      recent_entries=recent_entries if bucketed else None,
+                                      with_recent=not (bucketed and recent_entries is None))
+        message = self._build_message(metrics, agg_info.get('date_from') or date_from)
 
         meta = {
             'provider': 'gfw',
@@ -530,6 +995,7 @@ class DeforestationProviderGFW(models.AbstractModel):
             'dataset_endpoint': agg_info.get('endpoint'),
             'geometry_mode': geometry_mode,
             'used_dataset': used_dataset,
+            'query_mode': query_mode,
             'field_variant': {'count': 'COUNT(*)', 'area': 'area__ha'},
             'queries': {
                 'aggregate': agg_info,
@@ -539,6 +1005,7 @@ class DeforestationProviderGFW(models.AbstractModel):
             },
             'original_geom': geom,
             'final_geom_used': final_geom_used,
+            'simplification': simplification,
             'analysis_area_ha': analysis_area_ha,
             'analysis_center': {'lon': center_lon, 'lat': center_lat},
             'debug': {
@@ -557,6 +1024,10 @@ class DeforestationProviderGFW(models.AbstractModel):
                 'details': details_data,
             },
         }
+        if query_mode == 'single':
+            meta['queries']['grouped'] = agg_info
+            details['responses']['grouped'] = grouped_data
+            details['confidence_breakdown'] = {k: int(round(v)) for k, v in (by_confidence or {}).items()}
 
         return {
             'message': message,
@@ -565,3 +1036,431 @@ class DeforestationProviderGFW(models.AbstractModel):
             'meta': meta,
             'details': details,
         }
+
+    # --------- Clustered batch ---------
+    def _get_batch_params(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            cluster_km = float(ICP.get_param('planetio.gfw_cluster_km') or 5.0)
+        except Exception:
+            cluster_km = 5.0
+        try:
+            max_plots = int(ICP.get_param('planetio.gfw_cluster_max_plots') or 100)
+        except Exception:
+            max_plots = 100
+        try:
+            max_rows = int(ICP.get_param('planetio.gfw_cluster_max_rows') or 50000)
+        except Exception:
+            max_rows = 50000
+        return max(0.1, cluster_km), max(1, max_plots), max(1, max_rows)
+
+    def _cluster_geometries(self, items, cluster_km, max_plots):
+        """Group ``(key, geometry)`` pairs into spatial clusters.
+
+        Plots are bucketed on a grid of ``cluster_km`` cells by the centre of
+        their bounding box; crowded cells are split into chunks of at most
+        ``max_plots`` members.
+        """
+        cells = {}
+        for key, geom in items:
+            bbox = geometry_bbox(geom)
+            if not bbox:
+                cells.setdefault(('nogeo', id(key)), []).append((key, geom))
+                continue
+            lon = (bbox[0] + bbox[2]) / 2.0
+            lat = (bbox[1] + bbox[3]) / 2.0
+            dlat = cluster_km / 111.0
+            dlon = cluster_km / (111.0 * max(0.1, abs(math.cos(math.radians(lat)))))
+            cell = (int(math.floor(lat / dlat)), int(math.floor(lon / dlon)))
+            cells.setdefault(cell, []).append((key, geom))
+
+        clusters = []
+        for members in cells.values():
+            for start in range(0, len(members), max_plots):
+                clusters.append(members[start:start + max_plots])
+        return clusters
+
+    def _merge_multipolygon(self, geometries):
+        """Query geometry of a cluster: the dissolved union of its plots."""
+        return union_geometries(geometries)
+
+    def _build_points_sql(self, dataset_id, max_rows):
+        df = self._date_field_for_dataset(dataset_id)
+        return (
+            f"SELECT latitude, longitude, {df} AS alert_date, "
+            f"{dataset_id}__confidence AS confidence, area__ha AS area_ha "
+            f"FROM results WHERE {df} >= '{{date_from}}' "
+            f"ORDER BY {df} DESC LIMIT {int(max_rows)}"
+        )
+
+    def _build_result_from_points(self, geom, final_geom_used, geometry_mode, rows, query_info,
+                                  cluster_meta, max_detail_rows):
+        """Build an :meth:`analyze_line`-shaped result from attributed alert pixels."""
+        used_dataset = query_info.get('dataset') or 'gfw_integrated_alerts'
+        date_from = query_info.get('date_from')
+        center_lon, center_lat = self._geometry_center(final_geom_used)
+        analysis_area_ha = self._approx_polygon_area_ha(final_geom_used) \
+            if final_geom_used and final_geom_used.get('type') == 'Polygon' else 0.0
+
+        by_date = {}
+        detail_entries = []
+        area_total = 0.0
+        for row in rows:
+            day = (self._extract_text(row, ['alert_date', 'date']) or '')[:10]
+            if not day:
+                continue
+            area = self._extract_number(row, ['area_ha', 'area__ha', 'area']) or 0.0
+            lat = self._extract_number(row, ['latitude', 'lat'])
+            lon = self._extract_number(row, ['longitude', 'lon'])
+            area_total += area
+            bucket = by_date.setdefault(day, {'date': day, 'alert_count': 0.0, 'area_ha': 0.0})
+            bucket['alert_count'] += 1.0
+            bucket['area_ha'] += area
+            detail_entries.append({
+                'date': day,
+                'alert_id': '%s:%.5f:%.5f' % (day, lat, lon),
+                'alert_count': 1.0,
+                'area_ha': area,
+                'confidence': self._extract_text(row, ['confidence']),
+                'latitude': lat,
+                'longitude': lon,
+                'description': row.get('dataset') or used_dataset,
+                'analysis_area_ha': analysis_area_ha,
+                'provider': 'gfw',
+            })
+
+        series_entries = sorted(by_date.values(), key=lambda e: e['date'], reverse=True)
+        days = [e['date'] for e in series_entries]
+        first_alert = min(days) if days else None
+        last_alert = max(days) if days else None
+
+        if len(detail_entries) > max_detail_rows or not detail_entries:
+            detail_entries = [{
+                'date': last_alert or date_from,
+                'alert_id': "period:%s→%s" % (date_from, last_alert or date.today().isoformat()),
+                'alert_count': len(detail_entries),
+                'area_ha': 0.0,
+                'confidence': (detail_entries[0].get('confidence') if detail_entries else None) or 'n/a',
+                'latitude': center_lat,
+                'longitude': center_lon,
+                'description': used_dataset,
+                'analysis_area_ha': analysis_area_ha,
+                'provider': 'gfw',
+            }]
+
+        metrics = self._build_metrics(len(rows), area_total, first_alert, last_alert, series_entries)
+        meta = {
+            'provider': 'gfw',
+            'date_from': date_from,
+            'dataset_endpoint': query_info.get('endpoint'),
+            'geometry_mode': geometry_mode,
+            'used_dataset': used_dataset,
+            'query_mode': 'batch',
+            'queries': {'cluster': query_info},
+            'cluster': cluster_meta,
+            'original_geom': geom,
+            'final_geom_used': final_geom_used,
+            'analysis_area_ha': analysis_area_ha,
+            'analysis_center': {'lon': center_lon, 'lat': center_lat},
+        }
+        return {
+            'message': self._build_message(metrics, date_from),
+            'alerts': detail_entries,
+            'metrics': metrics,
+            'meta': meta,
+            'details': {
+                'metrics': metrics,
+                'alerts': detail_entries,
+                'time_series': series_entries,
+                'responses': {'points': rows},
+            },
+        }
+
+    def _attribute_points(self, members, rows):
+        """Split the alert pixels of a cluster between its plots.
+
+        The cluster is queried with the min-area squares, but a pixel is
+        attributed against each plot's own polygon so that a pixel in the
+        overlap of two squares is not counted for both plots. Point plots
+        have no polygon: a pixel inside several of their squares goes to the
+        nearest point only.
+        """
+        attributed = [[] for _item in members]
+        bboxes = [geometry_bbox(item[5]) for item in members]
+        for row in rows:
+            lat = self._extract_number(row, ['latitude', 'lat'])
+            lon = self._extract_number(row, ['longitude', 'lon'])
+            if lat is None or lon is None:
+                continue
+            nearest = None
+            for idx, item in enumerate(members):
+                bbox = bboxes[idx]
+                if not bbox or not (bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3]):
+                    continue
+                if not point_in_geometry(lon, lat, item[5]):
+                    continue
+                if item[3] != 'point_expanded':
+                    attributed[idx].append(row)
+                    continue
+                center_lon, center_lat = self._geometry_center(item[5])
+                distance = (center_lon - lon) ** 2 + (center_lat - lat) ** 2
+                if nearest is None or distance < nearest[0]:
+                    nearest = (distance, idx)
+            if nearest is not None:
+                attributed[nearest[1]].append(row)
+        return attributed
+
+    def _analyze_members_one_by_one(self, members, results, reason):
+        for line, *_rest in members:
+            try:
+                results[line.id] = self.analyze_line(line)
+                results[line.id]['meta']['cluster_fallback'] = reason
+            except Exception as ex:
+                results[line.id] = ex
+
+    def analyze_lines_batch(self, lines):
+        """Analyze many lines with one Data API request per spatial cluster.
+
+        Neighbouring plots are dissolved into one query geometry, the query
+        returns one row per alert pixel and each pixel is attributed back to
+        the plots containing it. Clusters whose query fails or whose answer
+        hits the row limit are re-run line by line, so that a failure or a
+        truncated answer never reaches the lines of the cluster.
+
+        :return: dict mapping line ids to a result dict or the exception
+            raised for that line.
+        """
+        self.check_prerequisites()
+        ICP = self.env['ir.config_parameter'].sudo()
+        origin = (ICP.get_param('planetio.gfw_api_origin') or 'http://localhost').strip()
+        try:
+            min_area_ha_req = float(ICP.get_param('planetio.gfw_min_area_ha') or 4.0)
+        except Exception:
+            min_area_ha_req = 4.0
+        max_detail_rows = int(ICP.get_param('planetio.gfw_max_detail_rows') or 80)
+        cluster_km, max_plots, max_rows = self._get_batch_params()
+
+        headers = self._prepare_headers(origin, self._get_api_key())
+        date_from = self._compute_date_from()
+        dataset_id = 'gfw_integrated_alerts'
+        sql = self._build_points_sql(dataset_id, max_rows)
+
+        results = {}
+        prepared = []
+        for line in lines:
+            geom = self._extract_geometry(line)
+            if not geom:
+                results[line.id] = UserError(_("Manca geometria (GeoJSON o lat/lon) sulla riga %s") %
+                                             (getattr(line, 'display_name', None) or line.id))
+                continue
+            submit_geom, simplification = simplify_for_submission(self.env, geom)
+            final_geom_used, geometry_mode = self._ensure_min_area_geometry(submit_geom, min_area_ha_req)
+            match_geom = final_geom_used if geometry_mode == 'point_expanded' else submit_geom
+            prepared.append((line, geom, final_geom_used, geometry_mode, simplification, match_geom))
+
+        clusters = self._cluster_geometries([(item, item[2]) for item in prepared], cluster_km, max_plots)
+        for index, cluster in enumerate(clusters):
+            members = [item for item, _geom in cluster]
+            union = self._merge_multipolygon([item[2] for item in members])
+            try:
+                data, info = self._gfw_execute_sql(headers, union, sql, date_from, allow_short=True)
+            except Exception as ex:
+                _logger.warning("GFW cluster query failed, analyzing %s line(s) one by one: %s",
+                                len(members), tools.ustr(ex))
+                self._analyze_members_one_by_one(members, results, 'error')
+                continue
+
+            rows = data.get('data') or []
+            if len(rows) >= max_rows:
+                # the answer was cut at the row limit: use the exact aggregates instead
+                self._analyze_members_one_by_one(members, results, 'max_rows')
+                continue
+
+            info = dict(info, dataset=dataset_id)
+            attributed = self._attribute_points(members, rows)
+            cluster_meta = {'index': index, 'size': len(members), 'rows': len(rows)}
+            for idx, (line, geom, final_geom_used, geometry_mode, simplification, _match) in enumerate(members):
+                results[line.id] = self._build_result_from_points(
+                    geom, final_geom_used, geometry_mode, attributed[idx], info, cluster_meta, max_detail_rows,
+                )
+                results[line.id]['meta']['simplification'] = simplification
+        return results
+
+    # --------- Multi-dataset fan-out ---------
+    def _get_fanout_params(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        raw = ICP.get_param('planetio.gfw_fanout_datasets') or ','.join(DEFAULT_FANOUT_DATASETS)
+        datasets = []
+        for token in raw.split(','):
+            token = token.strip()
+            if token and token not in datasets:
+                datasets.append(token)
+        try:
+            pixel_m = float(ICP.get_param('planetio.gfw_fanout_pixel_m') or 30.0)
+        except Exception:
+            pixel_m = 30.0
+        return datasets or list(DEFAULT_FANOUT_DATASETS), max(1.0, pixel_m)
+
+    def _fanout_post(self, url, headers, sql, geometry):
+        """Send one dataset query from a :func:`fanout_pool` thread: no env access here."""
+        return post_sql_query(url, headers, sql, geometry)
+
+    def _fanout_query_datasets(self, headers, geometry, datasets, date_from, max_rows, debug_errors):
+        """Run the alert points query on every dataset.
+
+        The query cache, the rate limiter and the key refresh use the caller's
+        cursor; only the requests of the datasets missing from the cache run
+        concurrently, on the shared :func:`fanout_pool`.
+
+        :return: ``{dataset_id: (rows, info)}`` for the datasets that answered.
+        """
+        cache = self._get_query_cache()
+        limiter = self._get_rate_limiter()
+        queries, responses, futures = {}, {}, {}
+        for dataset_id in datasets:
+            url = f'{self._prepare_dataset_base(dataset_id)}/latest/query/json'
+            sql = self._build_points_sql(dataset_id, max_rows).replace('{date_from}', date_from)
+            queries[dataset_id] = (url, sql)
+            cached = cache.lookup(url, sql, geometry, date_from) if cache is not None else None
+            if cached is not None:
+                responses[dataset_id] = cached
+                continue
+            if limiter is not None:
+                limiter.acquire(url)
+            futures[fanout_pool().submit(self._fanout_post, url, dict(headers), sql, geometry)] = dataset_id
+
+        for future in as_completed(futures):
+            dataset_id = futures[future]
+            url, sql = queries[dataset_id]
+            try:
+                response = future.result()
+            except requests.exceptions.RequestException as ex:
+                debug_errors.append(f"fanout_error[{dataset_id}]: {tools.ustr(ex)}")
+                continue
+            if limiter is not None:
+                limiter.observe(url, response)
+            api_key = headers.get('x-api-key')
+            self._note_api_key_response(api_key, response.status_code)
+            if response.status_code in (401, 403) and api_key:
+                new_key = self._refresh_api_key(api_key)
+                if new_key and new_key != api_key:
+                    headers['x-api-key'] = new_key
+                    try:
+                        response = self._post_query(url, headers, sql, geometry, date_from=date_from)
+                    except requests.exceptions.RequestException as ex:
+                        debug_errors.append(f"fanout_error[{dataset_id}]: {tools.ustr(ex)}")
+                        continue
+            elif cache is not None and 200 <= response.status_code < 300:
+                cache.store(url, sql, geometry, date_from, response)
+            responses[dataset_id] = response
+
+        answers = {}
+        for dataset_id in datasets:
+            response = responses.get(dataset_id)
+            if response is None:
+                continue
+            if response.status_code >= 400:
+                snippet = (response.text or '')[:300]
+                debug_errors.append(f"fanout_error[{dataset_id}]: {tools.ustr(snippet or response.status_code)}")
+                continue
+            rows = self._safe_json(response).get('data') or []
+            info = {
+                'endpoint': 'latest',
+                'date_from': date_from,
+                'sql': queries[dataset_id][1],
+                'status_code': response.status_code,
+                'dataset': dataset_id,
+            }
+            if len(rows) >= max_rows:
+                info['truncated'] = True
+                debug_errors.append(f"fanout_truncated[{dataset_id}]: {len(rows)} rows")
+            answers[dataset_id] = (rows, info)
+        return answers
+
+    def _merge_dataset_alerts(self, answers, pixel_m):
+        """Merge alert pixels of several datasets, counting once the same pixel on the same date.
+
+        Two pixels of the same date closer than half a ``pixel_m`` pixel on
+        both axes are the same alert. Pixels are indexed on a ``pixel_m``
+        grid and compared with the ones of the neighbouring cells, so a
+        pixel is matched even when a cell border falls between its
+        datasets. Pixels of one dataset are never merged together: a
+        dataset finer than ``pixel_m`` reports neighbouring alerts that are
+        distinct. A merged alert keeps the highest confidence and area and
+        lists its datasets in ``dataset``.
+        """
+        step_lat = pixel_m / 111320.0
+        merged = []
+        cells = {}
+        duplicates = 0
+        for dataset_id, (rows, _info) in sorted(answers.items()):
+            for row in rows:
+                day = (self._extract_text(row, ['alert_date', 'date']) or '')[:10]
+                lat = self._extract_number(row, ['latitude', 'lat'])
+                lon = self._extract_number(row, ['longitude', 'lon'])
+                if not day or lat is None or lon is None:
+                    continue
+                step_lon = step_lat / max(0.1, abs(math.cos(math.radians(lat))))
+                cell_lat, cell_lon = int(math.floor(lat / step_lat)), int(math.floor(lon / step_lon))
+                area = self._extract_number(row, ['area_ha', 'area__ha', 'area']) or 0.0
+                confidence = self._extract_text(row, ['confidence'])
+                current = next((
+                    alert
+                    for d_lat in (-1, 0, 1) for d_lon in (-1, 0, 1)
+                    for alert in cells.get((day, cell_lat + d_lat, cell_lon + d_lon), ())
+                    if dataset_id not in alert['datasets']
+                    and abs(alert['latitude'] - lat) < step_lat / 2 and abs(alert['longitude'] - lon) < step_lon / 2
+                ), None)
+                if current is None:
+                    current = {
+                        'alert_date': day, 'latitude': lat, 'longitude': lon,
+                        'area_ha': area, 'confidence': confidence, 'datasets': [dataset_id],
+                    }
+                    merged.append(current)
+                    cells.setdefault((day, cell_lat, cell_lon), []).append(current)
+                    continue
+                duplicates += 1
+                current['datasets'].append(dataset_id)
+                current['area_ha'] = max(current['area_ha'], area)
+                if CONFIDENCE_RANK.get((confidence or '').lower(), -1) > \
+                        CONFIDENCE_RANK.get((current['confidence'] or '').lower(), -1):
+                    current['confidence'] = confidence
+        rows = []
+        for row in merged:
+            row['dataset'] = '+'.join(row.pop('datasets'))
+            rows.append(row)
+        rows.sort(key=lambda r: r['alert_date'], reverse=True)
+        return rows, duplicates
+
+    def _analyze_line_fanout(self, geom, final_geom_used, geometry_mode, headers, date_from,
+                             max_detail_rows, debug_errors):
+        """``fanout`` query mode: one points query per dataset, merged into a single alert set."""
+        datasets, pixel_m = self._get_fanout_params()
+        max_rows = self._get_batch_params()[2]
+        answers = self._fanout_query_datasets(headers, final_geom_used, datasets, date_from, max_rows, debug_errors)
+        if not answers:
+            raise UserError(_("Provider gfw: nessun dataset di allerte ha risposto (%s)") % "; ".join(debug_errors))
+
+        rows, duplicates = self._merge_dataset_alerts(answers, pixel_m)
+        info = {
+            'endpoint': 'latest',
+            'date_from': date_from,
+            'dataset': '+'.join(d for d in datasets if d in answers),
+        }
+        result = self._build_result_from_points(geom, final_geom_used, geometry_mode, rows, info, None, max_detail_rows)
+        meta = result['meta']
+        meta.pop('cluster', None)
+        meta.update({
+            'query_mode': 'fanout',
+            'queries': {dataset_id: answer[1] for dataset_id, answer in answers.items()},
+            'fanout': {
+                'datasets': datasets,
+                'answered': sorted(answers),
+                'rows': {dataset_id: len(answer[0]) for dataset_id, answer in answers.items()},
+                'duplicates': duplicates,
+                'pixel_m': pixel_m,
+            },
+            'debug': {'errors': debug_errors},
+        })
+        result['details']['responses'] = {dataset_id: answer[0] for dataset_id, answer in answers.items()}
+        return result
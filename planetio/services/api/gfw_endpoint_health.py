@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Endpoint health memory for the GFW Data API fallback chains.
+
+The registry lives at module level, so it is shared by every thread of the
+worker process (including the deforestation thread pool) but not across
+processes. Each ``(dataset, step)`` pair carries its own circuit:
+
+* ``closed``: the step is tried normally;
+* ``open``: the step failed ``failure_threshold`` times in a row and is skipped;
+* ``half-open``: ``cooldown`` seconds after opening, a single caller is allowed
+  to probe the step again. A success closes the circuit, a failure re-opens it.
+
+Once the preferred steps are open, callers skip them and go straight to the
+first closed step instead of paying for the failing attempts and their
+timeouts. A probe that ends without an answer from the endpoint (rate
+limiter refusal, cache hit, unexpected error) must be handed back with
+:meth:`EndpointHealth.release`, otherwise the step would never be probed again.
+"""
+import threading
+import time
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 60.0
+
+
+class _StepState:
+    __slots__ = ('failures', 'opened_at', 'probing', 'last_ok_at', 'last_error_at')
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.last_ok_at = None
+        self.last_error_at = None
+
+
+class EndpointHealth:
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 cooldown=DEFAULT_COOLDOWN, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def configure(self, failure_threshold=None, cooldown=None):
+        with self._lock:
+            if failure_threshold is not None:
+                self.failure_threshold = max(1, int(failure_threshold))
+            if cooldown is not None:
+                self.cooldown = max(0.0, float(cooldown))
+
+    def reset(self):
+        with self._lock:
+            self._states.clear()
+
+    def _state(self, dataset, step):
+        key = (dataset, step)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _StepState()
+        return state
+
+    def plan(self, dataset, steps):
+        """Return the steps worth trying, in order.
+
+        Closed steps keep their order. Open circuits are skipped, except
+        that the first one whose cooldown elapsed is handed out as a probe,
+        ahead of the others, to a single caller at a time.
+        """
+        with self._lock:
+            now = self._clock()
+            probe = None
+            closed = []
+            for step in steps:
+                state = self._state(dataset, step)
+                if state.opened_at is None:
+                    closed.append(step)
+                elif (probe is None and not state.probing
+                      and now - state.opened_at >= self.cooldown):
+                    state.probing = True
+                    probe = step
+            return ([probe] if probe else []) + closed
+
+    def record_success(self, dataset, step):
+        with self._lock:
+            state = self._state(dataset, step)
+            state.failures = 0
+            state.opened_at = None
+            state.probing = False
+            state.last_ok_at = self._clock()
+
+    def record_failure(self, dataset, step):
+        with self._lock:
+            state = self._state(dataset, step)
+            now = self._clock()
+            state.failures += 1
+            state.last_error_at = now
+            if state.probing or state.failures >= self.failure_threshold:
+                state.opened_at = now
+            state.probing = False
+
+    def is_open(self, dataset, step):
+        with self._lock:
+            state = self._states.get((dataset, step))
+            return state is not None and state.opened_at is not None
+
+    def release(self, dataset, step):
+        """Give back a probe slot that ended without a success or a failure."""
+        with self._lock:
+            state = self._states.get((dataset, step))
+            if state is not None:
+                state.probing = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                '%s/%s' % key: {
+                    'failures': state.failures,
+                    'open': state.opened_at is not None,
+                    'last_ok_at': state.last_ok_at,
+                }
+                for key, state in self._states.items()
+            }
+
+
+gfw_endpoint_health = EndpointHealth()
@@ -1,13 +1,111 @@
-from odoo import _
+import threading
+import time
+
+from odoo import api, _
 from odoo.exceptions import UserError
-from .gfw_client import get_access_token, create_or_get_api_key, validate_api_key
+from .gfw_client import get_access_token, create_or_get_api_key, check_api_key
+
+DEFAULT_VALIDATION_TTL = 6 * 3600
+# pg advisory lock serializing key refreshes across workers
+KEY_REFRESH_LOCK = (20240503, 1)
+
+# (dbname, api_key) -> monotonic deadline of the last successful validation.
+# Real queries answering 2xx renew it, 401/403 drop it.
+_validated = {}
+_lock = threading.Lock()
+
+
+def _validation_ttl(icp):
+    try:
+        return max(0, int(icp.get_param('planetio.gfw_key_validation_ttl') or DEFAULT_VALIDATION_TTL))
+    except Exception:
+        return DEFAULT_VALIDATION_TTL
+
+
+def _is_validated(env, api_key):
+    with _lock:
+        deadline = _validated.get((env.cr.dbname, api_key))
+    return deadline is not None and deadline > time.monotonic()
+
+
+def mark_gfw_api_key_valid(env, api_key):
+    if not api_key:
+        return
+    ttl = _validation_ttl(env['ir.config_parameter'].sudo())
+    with _lock:
+        _validated[(env.cr.dbname, api_key)] = time.monotonic() + ttl
+
+
+def invalidate_gfw_api_key(env, api_key=None):
+    with _lock:
+        for key in list(_validated):
+            if key[0] == env.cr.dbname and (api_key is None or key[1] == api_key):
+                del _validated[key]
 
-def get_valid_gfw_api_key(env):
+
+def note_gfw_api_key_response(env, api_key, status_code):
+    """Feed the status of a real Data API query back into the cache."""
+    if not api_key or status_code is None:
+        return
+    if status_code in (401, 403):
+        invalidate_gfw_api_key(env, api_key)
+    elif 200 <= status_code < 300:
+        mark_gfw_api_key_valid(env, api_key)
+
+
+def get_valid_gfw_api_key(env, force_refresh=False):
+    """Return a working GFW API key.
+
+    A key validated less than ``planetio.gfw_key_validation_ttl`` seconds ago
+    is returned without probing the Data API. When the probe cannot tell
+    (outage, timeout) the stored key is kept. A new key is only requested
+    when the API rejects the stored one or ``force_refresh`` is set.
+    """
     icp = env['ir.config_parameter'].sudo()
     api_key = icp.get_param('planetio.gfw_api_key') or ''
-    if api_key and validate_api_key(api_key):
-        return api_key
+    if api_key and not force_refresh:
+        if _is_validated(env, api_key):
+            return api_key
+        status = check_api_key(api_key)
+        if status:
+            mark_gfw_api_key_valid(env, api_key)
+            return api_key
+        if status is None:
+            return api_key
+    return refresh_gfw_api_key(env, api_key or None)
+
 
+def refresh_gfw_api_key(env, rejected_key=None):
+    """Replace ``rejected_key`` once for all workers.
+
+    The refresh runs in its own transaction under a session advisory lock:
+    workers hitting the same 401 wait for the first one and then return the
+    key it committed instead of each asking GFW for a new one.
+    """
+    invalidate_gfw_api_key(env, rejected_key)
+    with env.registry.cursor() as cr:
+        cr.execute("SELECT pg_advisory_lock(%s, %s)", KEY_REFRESH_LOCK)
+        try:
+            # new snapshot: see a key committed while we waited for the lock
+            cr.commit()
+            cr.execute("SELECT value FROM ir_config_parameter WHERE key = %s", ('planetio.gfw_api_key',))
+            row = cr.fetchone()
+            current = ((row and row[0]) or '').strip()
+            if current and current != rejected_key:
+                return current
+            new_key = _request_gfw_api_key(api.Environment(cr, env.uid, env.context))
+            cr.commit()
+        except Exception:
+            cr.rollback()
+            raise
+        finally:
+            cr.execute("SELECT pg_advisory_unlock(%s, %s)", KEY_REFRESH_LOCK)
+    mark_gfw_api_key_valid(env, new_key)
+    return new_key
+
+
+def _request_gfw_api_key(env):
+    icp = env['ir.config_parameter'].sudo()
     email = icp.get_param('planetio.gfw_email') or ''
     password = icp.get_param('planetio.gfw_password') or ''
     alias = icp.get_param('planetio.gfw_alias') or 'planetio-dev'
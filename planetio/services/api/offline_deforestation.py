@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""Offline deforestation screening on locally loaded alert extracts.
+
+CSV or GeoJSON dumps of GFW integrated / RADD / GLAD alerts are loaded into
+``deforestation.offline.alert``. Every alert is stored with the cell of a
+regular lon/lat grid (``GRID_DEG`` degrees) and the table carries a btree
+index on the cell, so a plot only reads the alerts of the cells its bounding
+box touches. No network access is needed once the extract is loaded.
+"""
+import csv
+import io
+import json
+import logging
+import math
+
+from odoo import fields, models, _, tools
+from odoo.exceptions import UserError
+
+from ...utils.geo import geometry_bbox, point_in_geometry
+
+_logger = logging.getLogger(__name__)
+
+GRID_DEG = 0.01
+INSERT_BATCH = 5000
+
+_LAT_KEYS = ('latitude', 'lat', 'y')
+_LON_KEYS = ('longitude', 'lon', 'lng', 'x')
+_DATE_KEYS = ('alert_date', 'date', 'gfw_integrated_alerts__date', 'wur_radd_alerts__date',
+              'umd_glad_landsat_alerts__date', 'umd_glad_sentinel2_alerts__date')
+_CONFIDENCE_KEYS = ('confidence', 'gfw_integrated_alerts__confidence', 'wur_radd_alerts__confidence',
+                    'umd_glad_landsat_alerts__confidence', 'umd_glad_sentinel2_alerts__confidence')
+_AREA_KEYS = ('area_ha', 'area__ha', 'area')
+
+
+def grid_cell(lon, lat, size=GRID_DEG):
+    return int(math.floor(lon / size)), int(math.floor(lat / size))
+
+
+def _pick(row, keys, suffix=None):
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ''):
+            return value
+    if suffix:
+        for key, value in row.items():
+            if key and key.endswith(suffix) and value not in (None, ''):
+                return value
+    return None
+
+
+def _normalize_alert(row, dataset):
+    row = {(k or '').strip().lower(): v for k, v in row.items()}
+    try:
+        lat = float(_pick(row, _LAT_KEYS))
+        lon = float(_pick(row, _LON_KEYS))
+    except (TypeError, ValueError):
+        return None
+    day = str(_pick(row, _DATE_KEYS, '__date') or '')[:10]
+    if len(day) != 10:
+        return None
+    try:
+        area = float(_pick(row, _AREA_KEYS) or 0.0)
+    except (TypeError, ValueError):
+        area = 0.0
+    confidence = _pick(row, _CONFIDENCE_KEYS, '__confidence')
+    return {
+        'dataset': dataset,
+        'alert_date': day,
+        'latitude': lat,
+        'longitude': lon,
+        'confidence': str(confidence) if confidence is not None else None,
+        'area_ha': area,
+    }
+
+
+def parse_alert_extract(data, filename=None, dataset='gfw_integrated_alerts'):
+    """Yield normalized alerts from a CSV or GeoJSON extract.
+
+    GeoJSON features contribute their point (or the centre of their bounding
+    box) and their properties; CSV files need latitude/longitude and date
+    columns. Rows that cannot be read are skipped.
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    text = data.lstrip()
+    is_geojson = (filename or '').lower().endswith(('.json', '.geojson')) or text[:1] == '{'
+    if not is_geojson:
+        for row in csv.DictReader(io.StringIO(text)):
+            alert = _normalize_alert(row, dataset)
+            if alert:
+                yield alert
+        return
+
+    payload = json.loads(text)
+    features = payload.get('features') if payload.get('type') == 'FeatureCollection' else [payload]
+    for feature in features or []:
+        if not isinstance(feature, dict):
+            continue
+        props = dict(feature.get('properties') or {})
+        geom = feature.get('geometry') or {}
+        if geom.get('type') == 'Point' and len(geom.get('coordinates') or []) >= 2:
+            props.setdefault('longitude', geom['coordinates'][0])
+            props.setdefault('latitude', geom['coordinates'][1])
+        else:
+            bbox = geometry_bbox(geom)
+            if bbox:
+                props.setdefault('longitude', (bbox[0] + bbox[2]) / 2.0)
+                props.setdefault('latitude', (bbox[1] + bbox[3]) / 2.0)
+        alert = _normalize_alert(props, dataset)
+        if alert:
+            yield alert
+
+
+class AlertGridIndex:
+    """In-memory grid index over alert rows (``latitude``/``longitude`` keys)."""
+
+    def __init__(self, rows=(), size=GRID_DEG):
+        self.size = size
+        self._cells = {}
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        cell = grid_cell(row['longitude'], row['latitude'], self.size)
+        self._cells.setdefault(cell, []).append(row)
+
+    def candidates(self, bbox):
+        min_x, min_y = grid_cell(bbox[0], bbox[1], self.size)
+        max_x, max_y = grid_cell(bbox[2], bbox[3], self.size)
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                for row in self._cells.get((x, y), ()):
+                    if bbox[0] <= row['longitude'] <= bbox[2] and bbox[1] <= row['latitude'] <= bbox[3]:
+                        yield row
+
+    def within(self, geometry):
+        bbox = geometry_bbox(geometry)
+        if not bbox:
+            return []
+        return [row for row in self.candidates(bbox)
+                if point_in_geometry(row['longitude'], row['latitude'], geometry)]
+
+
+class DeforestationOfflineAlert(models.Model):
+    _name = 'deforestation.offline.alert'
+    _description = 'Offline Deforestation Alert'
+    _log_access = False
+    _order = 'alert_date desc'
+
+    dataset = fields.Char(required=True, index=True)
+    alert_date = fields.Date(required=True)
+    latitude = fields.Float(digits=(9, 6), required=True)
+    longitude = fields.Float(digits=(9, 6), required=True)
+    confidence = fields.Char()
+    area_ha = fields.Float(digits=(16, 6))
+    cell_x = fields.Integer(required=True)
+    cell_y = fields.Integer(required=True)
+
+    def init(self):
+        tools.create_index(self._cr, 'deforestation_offline_alert_cell_idx', self._table,
+                           ['cell_x', 'cell_y', 'alert_date'])
+
+    def load_extract(self, data, filename=None, dataset='gfw_integrated_alerts', replace=True):
+        """Load a CSV/GeoJSON extract, returning the number of alerts stored."""
+        cr = self.env.cr
+        if replace:
+            cr.execute("DELETE FROM deforestation_offline_alert WHERE dataset = %s", (dataset,))
+        count = 0
+        batch = []
+
+        def _flush():
+            values = ','.join(
+                cr.mogrify('(%s,%s,%s,%s,%s,%s,%s,%s)', row).decode() for row in batch
+            )
+            cr.execute(
+                "INSERT INTO deforestation_offline_alert "
+                "(dataset, alert_date, latitude, longitude, confidence, area_ha, cell_x, cell_y) "
+                "VALUES " + values
+            )
+            batch[:] = []
+
+        for alert in parse_alert_extract(data, filename, dataset):
+            cell_x, cell_y = grid_cell(alert['longitude'], alert['latitude'])
+            batch.append((alert['dataset'], alert['alert_date'], alert['latitude'], alert['longitude'],
+                          alert['confidence'], alert['area_ha'], cell_x, cell_y))
+            count += 1
+            if len(batch) >= INSERT_BATCH:
+                _flush()
+        if batch:
+            _flush()
+        self.invalidate_cache()
+        _logger.info("Offline alerts: loaded %s alerts for %s from %s", count, dataset, filename or 'extract')
+        return count
+
+    def fetch_bbox(self, bbox, date_from, datasets=None):
+        """Return the alerts inside ``bbox`` since ``date_from`` as dicts."""
+        min_x, min_y = grid_cell(bbox[0], bbox[1])
+        max_x, max_y = grid_cell(bbox[2], bbox[3])
+        query = """
+            SELECT dataset, alert_date::text AS alert_date, latitude, longitude, confidence, area_ha
+              FROM deforestation_offline_alert
+             WHERE cell_x BETWEEN %s AND %s AND cell_y BETWEEN %s AND %s
+               AND longitude BETWEEN %s AND %s AND latitude BETWEEN %s AND %s
+               AND alert_date >= %s
+        """
+        params = [min_x, max_x, min_y, max_y, bbox[0], bbox[2], bbox[1], bbox[3], date_from]
+        if datasets:
+            query += " AND dataset IN %s"
+            params.append(tuple(datasets))
+        self.env.cr.execute(query, params)
+        return self.env.cr.dictfetchall()
+
+
+class DeforestationProviderOffline(models.AbstractModel):
+    """Answers like :class:`DeforestationProviderGFW`, from local extracts."""
+    _name = 'deforestation.provider.offline'
+    _inherit = 'deforestation.provider.gfw'
+    _description = 'Deforestation Provider - Offline alerts'
+
+    def _get_datasets(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        raw = (ICP.get_param('planetio.offline_alert_datasets') or '').strip()
+        return [d.strip() for d in raw.split(',') if d.strip()]
+
+    def check_prerequisites(self):
+        self.env.cr.execute("SELECT 1 FROM deforestation_offline_alert LIMIT 1")
+        if not self.env.cr.fetchone():
+            raise UserError(_("Nessun estratto di allerte caricato per l'analisi offline."))
+
+    def _build_message(self, metrics, date_from):
+        message = super()._build_message(metrics, date_from)
+        return message.replace('GFW Data API', _('Allerte offline'), 1)
+
+    def _prepare_offline_geometry(self, line):
+        geom = self._extract_geometry(line)
+        if not geom:
+            raise UserError(_("Manca geometria (GeoJSON o lat/lon) sulla riga %s") %
+                            (getattr(line, 'display_name', None) or line.id))
+        if geom.get('type') != 'Point':
+            return geom, geom, 'original'
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            min_area_ha = float(ICP.get_param('planetio.gfw_min_area_ha') or 4.0)
+        except Exception:
+            min_area_ha = 4.0
+        final_geom_used, geometry_mode = self._ensure_min_area_geometry(geom, min_area_ha)
+        return geom, final_geom_used, geometry_mode
+
+    def _build_offline_result(self, geom, final_geom_used, geometry_mode, rows, date_from, cluster_meta):
+        ICP = self.env['ir.config_parameter'].sudo()
+        max_detail_rows = int(ICP.get_param('planetio.gfw_max_detail_rows') or 80)
+        datasets = sorted({row.get('dataset') for row in rows if row.get('dataset')})
+        info = {
+            'endpoint': 'offline',
+            'date_from': date_from,
+            'dataset': ','.join(datasets) or 'offline',
+            'row_count': len(rows),
+        }
+        result = self._build_result_from_points(
+            geom, final_geom_used, geometry_mode, rows, info, cluster_meta, max_detail_rows,
+        )
+        result['meta'].update({'provider': 'offline', 'query_mode': 'offline'})
+        for alert in result['alerts']:
+            alert['provider'] = 'offline'
+        return result
+
+    def analyze_line(self, line):
+        self.check_prerequisites()
+        geom, final_geom_used, geometry_mode = self._prepare_offline_geometry(line)
+        date_from = self._compute_date_from()
+        bbox = geometry_bbox(final_geom_used)
+        rows = self.env['deforestation.offline.alert'].fetch_bbox(bbox, date_from, self._get_datasets()) \
+            if bbox else []
+        rows = AlertGridIndex(rows).within(final_geom_used)
+        return self._build_offline_result(geom, final_geom_used, geometry_mode, rows, date_from, None)
+
+    def analyze_lines_batch(self, lines):
+        """Screen many lines with one indexed read per spatial cluster."""
+        self.check_prerequisites()
+        date_from = self._compute_date_from()
+        datasets = self._get_datasets()
+        cluster_km, max_plots, _max_rows = self._get_batch_params()
+        Alert = self.env['deforestation.offline.alert']
+
+        results = {}
+        prepared = []
+        for line in lines:
+            try:
+                prepared.append((line,) + self._prepare_offline_geometry(line))
+            except UserError as ex:
+                results[line.id] = ex
+
+        clusters = self._cluster_geometries([(item, item[2]) for item in prepared], cluster_km, max_plots)
+        for index, cluster in enumerate(clusters):
+            members = [item for item, _geom in cluster]
+            bboxes = [geometry_bbox(item[2]) for item in members]
+            valid = [b for b in bboxes if b]
+            if not valid:
+                for line, *_rest in members:
+                    results[line.id] = UserError(_("Geometria non valida sulla riga %s") %
+                                                 (getattr(line, 'display_name', None) or line.id))
+                continue
+            union = (min(b[0] for b in valid), min(b[1] for b in valid),
+                     max(b[2] for b in valid), max(b[3] for b in valid))
+            grid = AlertGridIndex(Alert.fetch_bbox(union, date_from, datasets))
+            cluster_meta = {'index': index, 'size': len(members)}
+            for line, geom, final_geom_used, geometry_mode in members:
+                rows = grid.within(final_geom_used)
+                results[line.id] = self._build_offline_result(
+                    geom, final_geom_used, geometry_mode, rows, date_from, cluster_meta,
+                )
+        return results
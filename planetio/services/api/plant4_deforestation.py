@@ -2,10 +2,13 @@ from odoo import models, _
 from odoo.exceptions import UserError
 from odoo.tools import ustr
 
+import hashlib
 import json
-import uuid
 import requests
 
+from .. import http_client
+from ...utils.geo import geometry_fingerprint, simplify_for_submission
+
 
 class DeforestationProviderPlant4(models.AbstractModel):
     _name = 'deforestation.provider.plant4'
@@ -56,6 +59,20 @@ class DeforestationProviderPlant4(models.AbstractModel):
             base_url = 'https://farm.tracer.eco'
         return api_key, base_url
 
+    def _get_batch_size(self):
+        icp = self.env['ir.config_parameter'].sudo()
+        try:
+            size = int(icp.get_param('deforestation.plant4.batch_size') or 50)
+        except Exception:
+            size = 50
+        return max(1, min(500, size))
+
+    def _headers(self, api_key):
+        return {
+            'x-api-key': api_key,
+            'Content-Type': 'application/json',
+        }
+
     def check_prerequisites(self):
         api_key, base_url = self._get_config()
         if not api_key:
@@ -70,37 +87,115 @@ class DeforestationProviderPlant4(models.AbstractModel):
         if not geometry:
             raise UserError(_("Geometria mancante sulla riga %s") % (getattr(line, 'display_name', line.id)))
 
-        uid = self._build_uid(line)
-        payload = self._build_payload(line, geometry, uid)
+        uid = self._build_uid(line, geometry)
+        submit_geometry, simplification = simplify_for_submission(self.env, geometry)
+        payload = self._build_payload(line, submit_geometry, uid)
         url = f"{base_url}/api/farm-data"
-        headers = {
-            'x-api-key': api_key,
-            'Content-Type': 'application/json',
-        }
+        headers = self._headers(api_key)
+
+        response = self._post_farm_data(url, payload, headers)
+        if response.status_code == 409:
+            data = self._fetch_existing(base_url, headers, uid)
+        else:
+            data = self._check_response(response, url)
+
+        if not isinstance(data, (dict, list)):
+            raise UserError(_("Risposta Plant-for-the-Planet inattesa."))
+
+        properties = self._extract_first_feature_properties(data)
+        result = self._build_result(data, properties, uid, payload)
+        result['meta']['simplification'] = simplification
+        return result
+
+    def analyze_lines_batch(self, lines):
+        """Submit many lines as FeatureCollections, ``deforestation.plant4.batch_size`` per call.
 
+        Lines sharing the same plot (same uid) are submitted once. Results are
+        mapped back through the feature ``uid``. When the chunk already exists
+        (409, the usual answer on a re-run since uids are deterministic) the
+        stored analyses are read back by uid; features missing from the answer
+        or from the stored records go through :meth:`analyze_line`.
+        Returns ``{line.id: result or exception}``.
+        """
+        api_key, base_url = self._get_config()
+        url = f"{base_url}/api/farm-data"
+        headers = self._headers(api_key)
+        results = {}
+        by_uid = {}
+        simplifications = {}
+        features = []
+        for line in lines:
+            geometry = self._extract_geometry(line)
+            if not geometry:
+                results[line.id] = UserError(
+                    _("Geometria mancante sulla riga %s") % (getattr(line, 'display_name', line.id))
+                )
+                continue
+            uid = self._build_uid(line, geometry)
+            if uid not in by_uid:
+                by_uid[uid] = []
+                submit_geometry, simplifications[uid] = simplify_for_submission(self.env, geometry)
+                features.append((uid, self._build_payload(line, submit_geometry, uid)['geoJSON']['features'][0]))
+            by_uid[uid].append(line)
+
+        size = self._get_batch_size()
+        for start in range(0, len(features), size):
+            chunk = features[start:start + size]
+            payload = {'geoJSON': {'type': 'FeatureCollection', 'features': [f for _uid, f in chunk]}}
+            answered = {}
+            conflict = False
+            try:
+                response = self._post_farm_data(url, payload, headers)
+                if response.status_code == 409:
+                    conflict = True
+                else:
+                    answered = self._features_by_uid(self._check_response(response, url))
+            except UserError as ex:
+                for uid, _feature in chunk:
+                    for line in by_uid[uid]:
+                        results[line.id] = ex
+                continue
+
+            for uid, feature in chunk:
+                single = {'geoJSON': {'type': 'FeatureCollection', 'features': [feature]}}
+                try:
+                    if conflict:
+                        data = self._fetch_existing(base_url, headers, uid, missing_ok=True)
+                        properties = self._extract_first_feature_properties(data) if data is not None else None
+                    else:
+                        data = answered.get(uid)
+                        properties = (data.get('properties') or {}) if data is not None else None
+                    if data is None:
+                        result = self.analyze_line(by_uid[uid][0])
+                    else:
+                        result = self._build_result(data, properties, uid, single)
+                        result['meta']['batch_size'] = len(chunk)
+                        result['meta']['simplification'] = simplifications.get(uid)
+                except Exception as ex:
+                    result = ex
+                for line in by_uid[uid]:
+                    results[line.id] = result
+        return results
+
+    def _post_farm_data(self, url, payload, headers):
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=120)
+            return http_client.post(url, json=payload, headers=headers, timeout=120,
+                                    limiter=self._get_rate_limiter())
         except requests.exceptions.RequestException as ex:
             raise UserError(_("Connessione a Plant-for-the-Planet non riuscita: %s") % str(ex))
 
-        data = None
-        if response.status_code == 409:
-            data = self._fetch_existing(base_url, headers, uid)
-        elif response.status_code == 401:
+    def _check_response(self, response, url):
+        if response.status_code == 401:
             raise UserError(_("API key Plant-for-the-Planet non valida o scaduta."))
-        elif response.status_code == 404:
+        if response.status_code == 404:
             raise UserError(_("Endpoint Plant-for-the-Planet non trovato: %s") % url)
-        elif response.status_code >= 500:
+        if response.status_code >= 500:
             raise UserError(_("Plant-for-the-Planet ha risposto con errore temporaneo (%s).") % response.status_code)
-        elif response.status_code >= 400:
+        if response.status_code >= 400:
             raise UserError(self._build_http_error(response))
-        else:
-            data = self._json_or_error(response)
-
-        if not isinstance(data, (dict, list)):
-            raise UserError(_("Risposta Plant-for-the-Planet inattesa."))
+        return self._json_or_error(response)
 
-        properties = self._extract_first_feature_properties(data)
+    def _build_result(self, data, properties, uid, payload):
         block, block_path = self._find_deforestation_block(data)
         if not block and properties:
             block, block_path = self._find_deforestation_block(properties)
@@ -121,14 +216,13 @@ class DeforestationProviderPlant4(models.AbstractModel):
         except Exception:
             pass
 
-        result = {
+        return {
             'message': message,
             'alerts': alerts,
             'metrics': metrics,
             'meta': meta,
             'details': details,
         }
-        return result
 
     # ------------------------------------------------------------------
     def _extract_geometry(self, line):
@@ -147,9 +241,21 @@ class DeforestationProviderPlant4(models.AbstractModel):
                     geom = None
         return geom if isinstance(geom, dict) else None
 
-    def _build_uid(self, line):
-        base = f"eudr-{getattr(line, 'id', 'line')}"
-        return f"{base}-{uuid.uuid4().hex[:8]}"
+    def _build_uid(self, line, geometry=None):
+        """Stable uid for a plot: the same geometry and commodity map to the
+        same farm-data record, so re-submissions hit the 409 reuse path."""
+        if geometry is None:
+            geometry = self._extract_geometry(line)
+        fingerprint = geometry_fingerprint(geometry) if geometry else None
+        if not fingerprint:
+            return f"eudr-{getattr(line, 'id', 'line')}"
+        hs_record = getattr(getattr(line, 'declaration_id', None), 'hs_code_id', None)
+        commodity = getattr(hs_record, 'commodity', None) or getattr(hs_record, 'code', None)
+        if commodity:
+            fingerprint = hashlib.sha256(
+                f"{fingerprint}|{ustr(commodity)}".encode('utf-8')
+            ).hexdigest()
+        return f"eudr-{fingerprint[:32]}"
 
     def _build_payload(self, line, geometry, uid):
         declaration = getattr(line, 'declaration_id', None)
@@ -184,13 +290,17 @@ class DeforestationProviderPlant4(models.AbstractModel):
             }
         }
 
-    def _fetch_existing(self, base_url, headers, uid):
+    def _fetch_existing(self, base_url, headers, uid, missing_ok=False):
+        """Read the stored analysis of ``uid``; ``missing_ok`` returns None instead of raising on 404."""
         try:
-            response = requests.get(f"{base_url}/api/farm-data", headers=headers, params={'uid': uid}, timeout=60)
+            response = http_client.get(f"{base_url}/api/farm-data", headers=headers, params={'uid': uid}, timeout=60,
+                                      limiter=self._get_rate_limiter())
         except requests.exceptions.RequestException as ex:
             raise UserError(_("Impossibile recuperare l'analisi Plant-for-the-Planet esistente: %s") % str(ex))
 
         if response.status_code == 404:
+            if missing_ok:
+                return None
             raise UserError(_("Analisi Plant-for-the-Planet non trovata per UID %s") % uid)
         if response.status_code >= 400:
             raise UserError(self._build_http_error(response))
@@ -216,6 +326,26 @@ class DeforestationProviderPlant4(models.AbstractModel):
             "Richiesta Plant-for-the-Planet rifiutata (%(code)s): %(detail)s"
         ) % {'code': response.status_code, 'detail': detail[:300] if detail else ''}
 
+    def _features_by_uid(self, data):
+        features = []
+        if isinstance(data, list):
+            features = data
+        elif isinstance(data, dict):
+            container = data.get('geoJSON') if isinstance(data.get('geoJSON'), dict) else data
+            if isinstance(container.get('features'), list):
+                features = container['features']
+            elif isinstance(data.get('data'), list):
+                features = data['data']
+        mapped = {}
+        for feature in features:
+            if not isinstance(feature, dict):
+                continue
+            props = feature.get('properties') if isinstance(feature.get('properties'), dict) else feature
+            uid = props.get('uid')
+            if uid:
+                mapped[uid] = feature if 'properties' in feature else {'properties': feature}
+        return mapped
+
     def _extract_first_feature_properties(self, data):
         candidates = []
         if isinstance(data, dict):
@@ -1,9 +1,70 @@
-from odoo import models, _
+from odoo import api, models, _
 from odoo.exceptions import UserError
+from odoo.tools import config
 import logging
 import json
+import math
+import threading
+import time
+import types
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 _logger = logging.getLogger(__name__)
 
+# Recent successful analyze_line durations per provider, used to pick the hedge delay.
+LATENCY_SAMPLES = 200
+MIN_LATENCY_SAMPLES = 20
+_latency_lock = threading.Lock()
+_latencies = {}
+
+# Hedged provider calls of every analysis in the process share one pool, so
+# the cursors they open stay bounded: a losing call keeps its slot until the
+# provider answers, but never more than HEDGE_POOL_SIZE of them run at once.
+HEDGE_POOL_SIZE = 4
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+
+def hedge_pool():
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _hedge_pool_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix='planetio-hedge')
+    return _hedge_pool
+
+
+def db_connection_budget():
+    """Connections the analyses of this process may hold: half of ``db_maxconn``.
+
+    The other half stays available to requests and crons of the same worker.
+    """
+    try:
+        maxconn = int(config.get('db_maxconn') or 64)
+    except Exception:
+        maxconn = 64
+    return max(2, maxconn // 2)
+
+
+def record_latency(provider_code, seconds):
+    with _latency_lock:
+        _latencies.setdefault(provider_code, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+
+
+def latency_samples(provider_code):
+    with _latency_lock:
+        return list(_latencies.get(provider_code) or ())
+
+
+def latency_percentile(samples, percentile):
+    """Nearest-rank ``percentile`` (0-100) of ``samples``, or None when empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = int(math.ceil(percentile / 100.0 * len(ordered)))
+    return ordered[min(len(ordered), max(1, rank)) - 1]
+
+
 class DeforestationService(models.AbstractModel):
     _name = 'deforestation.service'
     _description = 'Deforestation Service Orchestrator'
@@ -11,6 +72,7 @@ class DeforestationService(models.AbstractModel):
     _REGISTRY = {
         'gfw':   'deforestation.provider.gfw',
         'plant4':'deforestation.provider.plant4',
+        'offline':'deforestation.provider.offline',
     }
 
     def get_enabled_providers(self):
@@ -43,9 +105,54 @@ class DeforestationService(models.AbstractModel):
         return items or ['gfw']
 
     def analyze_line(self, line):
+        """Analyze ``line`` with the enabled providers.
+
+        Concurrent calls for the same geometry, providers and window share a
+        single provider analysis (see :mod:`.single_flight`).
+        """
+        from .single_flight import analysis_flights
+
         providers = self.get_enabled_providers()
         if not providers:
             raise UserError(_("Nessun provider di deforestazione configurato."))
+        key = self._single_flight_key(line, providers)
+        if key is None:
+            return self._analyze_line(line, providers)
+        result, shared = analysis_flights.run(key, lambda: self._analyze_line(line, providers),
+                                              wait=self._get_single_flight_wait())
+        if shared and isinstance(result, dict):
+            result.setdefault('meta', {})['single_flight'] = True
+        return result
+
+    def _single_flight_key(self, line, providers):
+        """Identify what an analysis of ``line`` depends on, or None to run it alone."""
+        from ..utils.geo import geometry_fingerprint
+
+        try:
+            geometry = line._line_geometry() if hasattr(line, '_line_geometry') else getattr(line, 'geojson', None)
+        except Exception:
+            geometry = None
+        fingerprint = geometry_fingerprint(geometry) if geometry else None
+        if not fingerprint:
+            return None
+        hs_record = getattr(getattr(line, 'declaration_id', None), 'hs_code_id', None)
+        commodity = getattr(hs_record, 'commodity', None) or getattr(hs_record, 'code', None)
+        return (
+            self.env.cr.dbname, fingerprint, tuple(providers), str(commodity or ''),
+            str(self.env.context.get('deforestation_date_from') or ''),
+        )
+
+    def _get_single_flight_wait(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            return max(0.0, float(ICP.get_param('planetio.deforestation_single_flight_wait') or 300.0))
+        except Exception:
+            return 300.0
+
+    def _analyze_line(self, line, providers):
+        hedge = self._get_hedge_providers(providers)
+        if hedge:
+            return self._analyze_line_hedged(line, providers + hedge)
 
         errors = []
         for provider_code in providers:
@@ -57,7 +164,9 @@ class DeforestationService(models.AbstractModel):
                 continue
 
             try:
+                started = time.monotonic()
                 result = provider.analyze_line(line)
+                record_latency(provider_code, time.monotonic() - started)
             except UserError as ue:
                 errors.append(_('Provider %(p)s: %(m)s') % {'p': provider_code, 'm': str(ue)})
                 continue
@@ -75,6 +184,111 @@ class DeforestationService(models.AbstractModel):
             raise UserError(_('Analisi deforestazione non riuscita: %s') % '; '.join(errors))
         raise UserError(_("Analisi deforestazione non riuscita: nessun provider disponibile."))
 
+    # ----- Hedged analysis -----
+    def _get_hedge_providers(self, providers):
+        """Providers raced against ``providers`` when the hedged mode is on.
+
+        ``planetio.deforestation_hedge_providers`` lists them (comma separated);
+        an empty value disables hedging.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        raw = (ICP.get_param('planetio.deforestation_hedge_providers') or '').strip()
+        codes = [code.strip() for code in raw.split(',') if code.strip()]
+        hedge = []
+        for code in codes:
+            if code in self._REGISTRY and code not in providers and code not in hedge:
+                hedge.append(code)
+        return hedge
+
+    def _get_hedge_delay(self, provider_code):
+        """Seconds to wait on ``provider_code`` before starting the next provider.
+
+        The delay is the ``planetio.deforestation_hedge_percentile`` (default
+        95) of the recent durations of the provider, never below
+        ``planetio.deforestation_hedge_min_delay``. Until enough durations are
+        known ``planetio.deforestation_hedge_delay`` is used.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+
+        def _float(key, default):
+            try:
+                return float(ICP.get_param(key) or default)
+            except Exception:
+                return default
+
+        min_delay = max(0.0, _float('planetio.deforestation_hedge_min_delay', 2.0))
+        samples = latency_samples(provider_code)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return max(min_delay, _float('planetio.deforestation_hedge_delay', 10.0))
+        percentile = min(100.0, max(1.0, _float('planetio.deforestation_hedge_percentile', 95.0)))
+        return max(min_delay, latency_percentile(samples, percentile))
+
+    def _analyze_line_hedged(self, line, providers):
+        """Race ``providers`` on ``line``; the first result wins.
+
+        The first provider starts at once. Each following provider starts when
+        the last one started has not answered within its hedge delay, or as
+        soon as every running provider failed. Late answers are ignored and
+        providers not started yet are cancelled. Provider calls run on the
+        shared :func:`hedge_pool`.
+        """
+        snapshot = line._deforestation_snapshot() if hasattr(line, '_deforestation_snapshot') else line
+        uid, context = self.env.uid, dict(self.env.context)
+        queue = list(providers)
+        pending = {}
+        errors = []
+        executor = hedge_pool()
+
+        def _launch():
+            code = queue.pop(0)
+            pending[executor.submit(self._run_provider_in_worker, code, snapshot, uid, context)] = code
+            return code
+
+        try:
+            current = _launch()
+            while pending:
+                timeout = self._get_hedge_delay(current) if queue else None
+                done, _not_done = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    previous, current = current, _launch()
+                    _logger.info("Deforestation provider %s slower than %.1fs, hedging with %s",
+                                 previous, timeout, current)
+                    continue
+                for future in done:
+                    provider_code = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except UserError as ue:
+                        errors.append(_('Provider %(p)s: %(m)s') % {'p': provider_code, 'm': str(ue)})
+                        continue
+                    except Exception as ex:
+                        _logger.warning("Provider %s failed during hedged analyze_line: %s", provider_code, ex)
+                        errors.append(_('Provider %(p)s errore inatteso: %(m)s') % {'p': provider_code, 'm': str(ex)})
+                        continue
+                    if isinstance(result, dict):
+                        meta = result.setdefault('meta', {})
+                        meta.setdefault('provider', provider_code)
+                        meta['hedged'] = len(providers) - len(queue) > 1
+                    return result
+                if queue and not pending:
+                    current = _launch()
+        finally:
+            for future in pending:
+                future.cancel()
+
+        raise UserError(_('Analisi deforestazione non riuscita: %s') % '; '.join(errors))
+
+    def _run_provider_in_worker(self, provider_code, snapshot, uid, context):
+        """Run one provider on ``snapshot`` with a cursor of its own."""
+        with api.Environment.manage(), self.pool.cursor() as cr:
+            env = api.Environment(cr, uid, context)
+            provider = env[self._REGISTRY[provider_code]]
+            provider.check_prerequisites()
+            started = time.monotonic()
+            result = provider.analyze_line(snapshot)
+            record_latency(provider_code, time.monotonic() - started)
+            return result
+
     def analyze_records(self, eudr_import_rec, providers):
         errors, details = [], []
         lines = getattr(eudr_import_rec, 'line_ids', False)
@@ -107,15 +321,112 @@ class DeforestationService(models.AbstractModel):
 
         return {'errors': errors, 'details': details}
 
+    # ----- Batch analysis -----
+    def is_batch_enabled(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        raw = (ICP.get_param('planetio.deforestation_batch_mode') or '').strip().lower()
+        return raw in ('1', 'true', 'y', 'yes')
+
+    def analyze_lines_batch(self, lines):
+        """Analyze ``lines`` through the batch API of the first enabled provider.
+
+        :return: dict mapping line ids to a result dict or an exception, or
+            ``None`` when the provider has no batch API.
+        """
+        providers = self.get_enabled_providers()
+        if not providers:
+            return None
+        provider_code = providers[0]
+        provider = self.env[self._REGISTRY[provider_code]]
+        if not hasattr(provider, 'analyze_lines_batch'):
+            return None
+        provider.check_prerequisites()
+        results = provider.analyze_lines_batch(lines)
+        for result in results.values():
+            if isinstance(result, dict):
+                meta = result.setdefault('meta', {})
+                meta.setdefault('provider', provider_code)
+        return results
+
+    # ----- Concurrent analysis -----
+    def get_concurrency(self):
+        """Return the size of the worker pool used for line analyses.
+
+        Every worker holds a cursor, so the pool never outgrows the
+        :func:`db_connection_budget` left after the hedge pool.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            value = int(ICP.get_param('planetio.deforestation_concurrency') or 1)
+        except Exception:
+            value = 1
+        return max(1, min(32, value, db_connection_budget() - HEDGE_POOL_SIZE))
+
+    def _analyze_line_in_worker(self, snapshot, uid, context):
+        """Run :meth:`analyze_line` on ``snapshot`` from a pool thread.
+
+        The caller's environment must not be shared across threads, so the
+        worker opens its own cursor and only uses it to read configuration.
+        """
+        with api.Environment.manage(), self.pool.cursor() as cr:
+            env = api.Environment(cr, uid, context)
+            return env['deforestation.service'].analyze_line(snapshot)
+
+    def analyze_snapshots(self, snapshots):
+        """Analyze line-like ``snapshots`` (e.g. plot proxies) as one run.
+
+        Snapshots go through the provider batch API when batch mode is on,
+        the others through the worker pool sized by :meth:`get_concurrency`
+        (one by one when it is 1). Returns ``{snapshot.id: result}`` where a
+        failed analysis maps to its exception.
+        """
+        results = {}
+        pending = list(snapshots)
+        if pending and self.is_batch_enabled():
+            try:
+                batch = self.analyze_lines_batch(pending)
+            except Exception as e:
+                batch = {snapshot.id: e for snapshot in pending}
+            if batch is not None:
+                results.update((snapshot.id, batch[snapshot.id]) for snapshot in pending
+                               if batch.get(snapshot.id) is not None)
+                pending = [snapshot for snapshot in pending if snapshot.id not in results]
+
+        workers = self.get_concurrency()
+        if workers > 1 and len(pending) > 1:
+            uid, context = self.env.uid, dict(self.env.context)
+            with ThreadPoolExecutor(max_workers=min(workers, len(pending)),
+                                    thread_name_prefix='planetio-defor') as executor:
+                futures = {
+                    snapshot.id: executor.submit(self._analyze_line_in_worker, snapshot, uid, context)
+                    for snapshot in pending
+                }
+                for snapshot_id, future in futures.items():
+                    try:
+                        results[snapshot_id] = future.result()
+                    except Exception as e:
+                        results[snapshot_id] = e
+            return results
+
+        for snapshot in pending:
+            try:
+                results[snapshot.id] = self.analyze_line(snapshot)
+            except Exception as e:
+                results[snapshot.id] = e
+        return results
+
     # ----- GeoJSON utility -----
     class _GeometryLineProxy:
         """Minimal object exposing the attributes used by providers."""
 
-        def __init__(self, geometry, display_name=None):
+        def __init__(self, geometry, display_name=None, line_id=0, hs_code=None, commodity=None):
             self._geometry = geometry
             self.display_name = display_name or _('GeoJSON geometry')
             # Provide minimal attributes accessed by providers.
-            self.id = 0
+            self.id = line_id
+            self.declaration_id = types.SimpleNamespace(
+                hs_code_id=types.SimpleNamespace(code=hs_code, commodity=commodity),
+            )
             try:
                 self.geojson = json.dumps(geometry, ensure_ascii=False)
             except Exception:
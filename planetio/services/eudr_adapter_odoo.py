@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 import base64, json
 import xml.etree.ElementTree as ET
-import requests
 from requests.auth import HTTPBasicAuth
 from odoo import _, fields
 from odoo.exceptions import UserError
+from . import http_client
 from .eudr_client import EUDRClient, build_geojson_b64
 from .eudr_client_retrieve import EUDRRetrievalClient
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
@@ -55,8 +55,9 @@ def _download_and_attach_dds_pdf(record, reference_number: str, username: str, a
 
     auth = HTTPBasicAuth(username, apikey) if username and apikey else None
 
+    limiter = record.env['planetio.rate.limiter'].sudo() if 'planetio.rate.limiter' in record.env else None
     try:
-        response = requests.get(pdf_url, headers=headers, auth=auth, timeout=120)
+        response = http_client.get(pdf_url, headers=headers, auth=auth, timeout=120, limiter=limiter)
     except Exception as exc:  # pragma: no cover - network failure
         raise UserError(_('Errore durante il download del PDF DDS: %s') % exc)
 
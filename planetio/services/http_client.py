@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Process-wide keep-alive HTTP sessions for outbound integrations.
+
+One ``requests.Session`` is kept per ``scheme://host`` so that repeated calls
+to GFW, Plant4, oSapiens or TRACES reuse pooled TCP/TLS connections instead
+of paying a new handshake every time. Sessions never persist cookies: they
+are shared by every user and thread of the worker process.
+"""
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Large enough for the deforestation thread pool (planetio.deforestation_concurrency
+# is capped at 32) to keep one connection per worker.
+DEFAULT_POOL_SIZE = 32
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return (parts.scheme or 'https').lower(), (parts.netloc or '').lower()
+
+
+def _build_session(pool_size):
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.headers['Connection'] = 'keep-alive'
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(url, pool_size=None):
+    """Return the shared session for the host of ``url``."""
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = _build_session(pool_size or DEFAULT_POOL_SIZE)
+    return session
+
+
+def request(method, url, limiter=None, **kwargs):
+    """Send a request on the pooled session of the host.
+
+    ``limiter`` (a ``planetio.rate.limiter`` recordset) paces the call and is
+    told about 429 / ``Retry-After`` answers.
+    """
+    if limiter is not None:
+        limiter.acquire(url)
+    response = get_session(url).request(method, url, **kwargs)
+    if limiter is not None:
+        limiter.observe(url, response)
+    return response
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def close_all():
+    """Close every pooled connection (e.g. after a configuration change)."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Token bucket shared by every worker, one bucket per external host.
+
+Buckets live in ``planetio_rate_limiter`` and are updated under a row lock in
+a short dedicated transaction, so that the caller's transaction never holds
+the lock while it waits. Each caller reserves a slot (the token count may go
+negative) and then sleeps outside the lock until its slot comes up, which
+spreads concurrent callers evenly instead of letting them burst together.
+``Retry-After`` answers pause the whole bucket for every worker.
+
+Hosts are unlimited unless ``planetio.rate_limit.<host>`` (or
+``planetio.rate_limit_default``) is set; unlimited hosts never touch the
+table, so they cost no extra cursor.
+"""
+import email.utils
+import logging
+import time
+from urllib.parse import urlsplit
+
+from odoo import fields, models, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = ''
+DEFAULT_MAX_WAIT = 120.0
+DEFAULT_429_PAUSE = 5.0
+
+
+def host_of(url):
+    return (urlsplit(url).netloc or url or '').lower()
+
+
+def parse_retry_after(value, now=None):
+    """Return the delay in seconds announced by a ``Retry-After`` header."""
+    if value in (None, ''):
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except Exception:
+        return None
+    if when is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+def parse_limit(value):
+    """Parse ``"rate/burst"`` (requests per second / bucket size)."""
+    try:
+        rate, _sep, burst = str(value or '').partition('/')
+        rate = float(rate)
+        burst = float(burst) if burst else max(1.0, rate)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, rate), max(1.0, burst)
+
+
+def reserve_slot(tokens, updated_at, blocked_until, rate, burst, now):
+    """Refill the bucket and reserve one token.
+
+    Returns ``(tokens, wait)``: the new token count and the number of seconds
+    the caller has to wait before sending its request.
+    """
+    if rate <= 0:
+        return tokens, 0.0
+    elapsed = max(0.0, now - (updated_at or now))
+    tokens = min(burst, tokens + elapsed * rate)
+    start = max(now, blocked_until or 0.0)
+    if start > now:
+        tokens = min(tokens, 0.0)
+    tokens -= 1.0
+    wait = (start - now) + max(0.0, -tokens) / rate
+    return tokens, wait
+
+
+class PlanetioRateLimiter(models.Model):
+    _name = 'planetio.rate.limiter'
+    _description = 'External API Rate Limiter'
+    _log_access = False
+    _rec_name = 'host'
+
+    host = fields.Char(required=True, readonly=True)
+    tokens = fields.Float(readonly=True)
+    updated_at = fields.Float(readonly=True, help="Epoch seconds of the last refill.")
+    blocked_until = fields.Float(readonly=True, help="Epoch seconds until which the host asked to pause.")
+
+    _sql_constraints = [
+        ('host_unique', 'unique(host)', 'One bucket per host.'),
+    ]
+
+    # --------- Config ---------
+    def _get_limit(self, host):
+        """Return ``(rate, burst)`` for ``host``; a rate of 0 means unlimited."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        limit = parse_limit(ICP.get_param('planetio.rate_limit.%s' % host))
+        if limit is None:
+            limit = parse_limit(ICP.get_param('planetio.rate_limit_default') or DEFAULT_LIMIT)
+        return limit or (0.0, 1.0)
+
+    def _get_max_wait(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            return float(ICP.get_param('planetio.rate_limit_max_wait') or DEFAULT_MAX_WAIT)
+        except Exception:
+            return DEFAULT_MAX_WAIT
+
+    # --------- Public API ---------
+    def is_limited(self, url):
+        """Whether requests to the host of ``url`` are paced by a bucket."""
+        host = host_of(url)
+        return bool(host) and self._get_limit(host)[0] > 0
+
+    def acquire(self, url):
+        """Block until a request to the host of ``url`` may be sent.
+
+        Returns the number of seconds waited. Raises :class:`UserError` when
+        the host would make the caller wait longer than
+        ``planetio.rate_limit_max_wait``.
+        """
+        host = host_of(url)
+        rate, burst = self._get_limit(host)
+        if not host or rate <= 0:
+            return 0.0
+        max_wait = self._get_max_wait()
+        with self.pool.cursor() as cr:
+            cr.execute(
+                """
+                INSERT INTO planetio_rate_limiter (host, tokens, updated_at, blocked_until)
+                VALUES (%s, %s, extract(epoch from clock_timestamp()), 0)
+                ON CONFLICT (host) DO NOTHING
+                """,
+                (host, burst),
+            )
+            cr.execute(
+                """
+                SELECT tokens, updated_at, blocked_until, extract(epoch from clock_timestamp())
+                  FROM planetio_rate_limiter WHERE host = %s FOR UPDATE
+                """,
+                (host,),
+            )
+            tokens, updated_at, blocked_until, now = cr.fetchone()
+            tokens, wait = reserve_slot(tokens or 0.0, updated_at, blocked_until, rate, burst, float(now))
+            if wait > max_wait:
+                raise UserError(_("Limite di richieste raggiunto per %(host)s: riprovare tra %(sec)d secondi.") % {
+                    'host': host, 'sec': int(wait),
+                })
+            cr.execute(
+                "UPDATE planetio_rate_limiter SET tokens = %s, updated_at = %s WHERE host = %s",
+                (tokens, float(now), host),
+            )
+        if wait > 0:
+            _logger.debug("Rate limiter: waiting %.2fs before calling %s", wait, host)
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, url, retry_after=None):
+        """Pause the bucket of the host after a 429 / ``Retry-After`` answer."""
+        if not self.is_limited(url):
+            return
+        host = host_of(url)
+        pause = DEFAULT_429_PAUSE if retry_after is None else float(retry_after)
+        with self.pool.cursor() as cr:
+            cr.execute(
+                """
+                INSERT INTO planetio_rate_limiter (host, tokens, updated_at, blocked_until)
+                VALUES (%s, 0, extract(epoch from clock_timestamp()), 0)
+                ON CONFLICT (host) DO NOTHING
+                """,
+                (host,),
+            )
+            cr.execute(
+                """
+                UPDATE planetio_rate_limiter
+                   SET blocked_until = GREATEST(blocked_until, extract(epoch from clock_timestamp()) + %s),
+                       tokens = LEAST(tokens, 0)
+                 WHERE host = %s
+                """,
+                (pause, host),
+            )
+        _logger.info("Rate limiter: %s asked to pause for %.1fs", host, pause)
+
+    def observe(self, url, response):
+        """Feed a response back: 429 and ``Retry-After`` pause the host."""
+        status = getattr(response, 'status_code', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        if status == 429 or (status == 503 and retry_after is not None):
+            self.penalize(url, retry_after)
+        return retry_after
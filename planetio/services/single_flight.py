@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""In-flight registry of provider analyses.
+
+When several threads of the worker process (users, the deforestation thread
+pool, cron jobs) ask for the same analysis at the same time, only the first
+one calls the provider; the others wait for its outcome and receive a copy
+of it. Like :mod:`.api.gfw_endpoint_health` the registry lives at module
+level, so it is shared inside one process only. Concurrent writes to the
+same lines across processes are prevented with advisory locks by the line
+model, see ``eudr.declaration.line._claim_deforestation_lines``.
+"""
+import copy
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+DEFAULT_WAIT = 300.0
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def run(self, key, func, wait=DEFAULT_WAIT):
+        """Return ``(result, shared)`` of ``func()`` for ``key``.
+
+        The first caller for ``key`` runs ``func``; callers arriving while it
+        runs wait up to ``wait`` seconds and get a deep copy of its result
+        (or its exception), with ``shared`` set. A caller whose wait expires
+        runs ``func`` on its own.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            try:
+                return copy.deepcopy(future.result(timeout=wait)), True
+            except FutureTimeout:
+                return func(), False
+
+        try:
+            result = func()
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        else:
+            future.set_result(copy.deepcopy(result))
+            return result, False
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+
+analysis_flights = SingleFlight()
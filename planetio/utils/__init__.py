@@ -1,4 +1,10 @@
 """Utility helpers for the Planetio module."""
 
-from .geo import estimate_geojson_area_ha  # noqa: F401
+from .geo import (  # noqa: F401
+    canonical_geometry,
+    estimate_geojson_area_ha,
+    geometry_bbox,
+    geometry_fingerprint,
+    point_in_geometry,
+)
 
@@ -0,0 +1,176 @@
+"""End-to-end throughput benchmark of the deforestation providers.
+
+Drives ``deforestation.service.analyze_records`` over synthetic lines while
+the GFW and Plant4 providers talk to :mod:`.mock_deforestation_server`.
+Run it from an Odoo shell::
+
+    from odoo.addons.planetio.utils.deforestation_benchmark import format_report, run_benchmark
+    print(format_report(run_benchmark(env, lines=2000, provider='gfw', latency_ms=80, error_rate=0.02)))
+
+The provider parameters are pointed to the mock server for the duration of
+the run and restored afterwards; nothing is committed by the harness.
+
+Only the serial path is measured: ``analyze_records`` calls the provider
+line after line on the caller's cursor, so the worker pool, the batch API,
+hedging and single-flight of ``analyze_snapshots`` are not exercised. They
+open cursors of their own, which would not see the uncommitted overrides.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+import types
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from .mock_deforestation_server import MockConfig, MockDeforestationServer
+
+_logger = logging.getLogger(__name__)
+
+# ~2 ha squares around a coffee region; overridable through ``center``.
+DEFAULT_CENTER = (-75.6, 4.8)
+PLOT_SIDE_DEG = 0.0013
+
+
+def synthetic_geometries(count: int, seed: int = 0, duplicate_rate: float = 0.0,
+                         center=DEFAULT_CENTER, spread_deg: float = 0.5) -> List[dict]:
+    """``count`` small square polygons; ``duplicate_rate`` of them repeat an earlier plot."""
+    rng = random.Random(seed)
+    geometries = []
+    for _i in range(count):
+        if geometries and rng.random() < duplicate_rate:
+            geometries.append(rng.choice(geometries))
+            continue
+        lon = center[0] + rng.uniform(-spread_deg, spread_deg)
+        lat = center[1] + rng.uniform(-spread_deg, spread_deg)
+        side = PLOT_SIDE_DEG * rng.uniform(0.5, 1.5)
+        geometries.append({
+            "type": "Polygon",
+            "coordinates": [[
+                [round(lon, 7), round(lat, 7)],
+                [round(lon + side, 7), round(lat, 7)],
+                [round(lon + side, 7), round(lat + side, 7)],
+                [round(lon, 7), round(lat + side, 7)],
+                [round(lon, 7), round(lat, 7)],
+            ]],
+        })
+    return geometries
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of ``samples`` (None when empty)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, min(len(ordered), int(-(-pct * len(ordered) // 100))))
+    return ordered[rank - 1]
+
+
+def _benchmark_params(env, base_url, use_cache, rate_limit):
+    ICP = env["ir.config_parameter"].sudo()
+    host = urlsplit(base_url).netloc.lower()
+    return {
+        "planetio.rate_limit.%s" % host: rate_limit,
+        "planetio.gfw_base_url": base_url,
+        "deforestation.plant4.base_url": base_url,
+        "planetio.gfw_api_key": ICP.get_param("planetio.gfw_api_key") or "benchmark",
+        "deforestation.plant4.api_key": ICP.get_param("deforestation.plant4.api_key") or "benchmark",
+        "planetio.gfw_cache_enabled": "True" if use_cache else "False",
+    }
+
+
+def _timed_proxy_class(base, marks):
+    """Subclass of the line proxy noting when ``analyze_records`` is done with each line."""
+
+    class TimedProxy(base):
+        _external_message = None
+
+        @property
+        def external_message(self):
+            return self._external_message
+
+        @external_message.setter
+        def external_message(self, value):
+            self._external_message = value
+            marks.append(time.monotonic())
+
+    return TimedProxy
+
+
+def run_benchmark(env, lines: int = 1000, provider: str = "gfw", seed: int = 0,
+                  duplicate_rate: float = 0.0, server_url: Optional[str] = None,
+                  use_cache: bool = False, rate_limit: str = "1000/1000", commodity: str = "coffee",
+                  **mock_options) -> dict:
+    """Analyze ``lines`` synthetic lines with ``provider`` and report the throughput.
+
+    ``mock_options`` are :class:`MockConfig` fields (``latency_ms``,
+    ``error_rate``, ``throttle_rate``, ``timeout_rate``...). A mock server is
+    started on a free local port unless ``server_url`` points to a running
+    one, in which case requests per line are not reported. ``rate_limit``
+    (``rate/burst``) replaces the shared rate limit of the mock host.
+
+    All lines go through a single ``analyze_records`` call; the per-line
+    latencies are the intervals between two lines being done.
+    """
+    ICP = env["ir.config_parameter"].sudo()
+    server = None
+    if server_url is None:
+        server = MockDeforestationServer(config=MockConfig(seed=seed, **mock_options)).start()
+        server_url = server.base_url
+    params = _benchmark_params(env, server_url, use_cache, rate_limit)
+    previous = {key: ICP.get_param(key) for key in params}
+    svc = env["deforestation.service"]
+    marks = []
+    proxy_class = _timed_proxy_class(svc._GeometryLineProxy, marks)
+    proxies = [
+        proxy_class(geometry, display_name="bench-%s" % idx, line_id=idx, commodity=commodity)
+        for idx, geometry in enumerate(synthetic_geometries(lines, seed, duplicate_rate), start=1)
+    ]
+
+    try:
+        for key, value in params.items():
+            ICP.set_param(key, value)
+        started = time.monotonic()
+        result = svc.analyze_records(types.SimpleNamespace(line_ids=proxies), [provider])
+        elapsed = time.monotonic() - started
+        errors = len(result.get("errors") or [])
+        latencies = [done - before for before, done in zip([started] + marks, marks)]
+    finally:
+        for key, value in previous.items():
+            ICP.set_param(key, value or False)
+        if server is not None:
+            server.stop()
+
+    stats = server.stats.snapshot() if server is not None else None
+    report = {
+        "provider": provider,
+        "lines": len(proxies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "lines_per_sec": round(len(proxies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "requests": stats["requests"] if stats else None,
+        "requests_per_line": round(stats["requests"] / len(proxies), 2) if stats and proxies else None,
+        "status_codes": stats["by_status"] if stats else None,
+    }
+    _logger.info("Deforestation benchmark: %s", report)
+    return report
+
+
+def format_report(report: dict) -> str:
+    rows = [
+        ("Provider", report["provider"]),
+        ("Lines", report["lines"]),
+        ("Errors", report["errors"]),
+        ("Elapsed (s)", report["elapsed_s"]),
+        ("Lines/sec", report["lines_per_sec"]),
+        ("Latency p50/p95/p99 (ms)", "%s / %s / %s" % (report["p50_ms"], report["p95_ms"], report["p99_ms"])),
+        ("Requests/line", report["requests_per_line"]),
+        ("Status codes", report["status_codes"]),
+    ]
+    width = max(len(label) for label, _value in rows)
+    return "\n".join("%s  %s" % (label.ljust(width), value) for label, value in rows)
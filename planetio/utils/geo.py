@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import math
 from typing import Iterable, List, Sequence, Tuple
@@ -12,6 +13,15 @@ except Exception:  # pragma: no cover - pyproj may not be available in tests
     CRS = None  # type: ignore
     Transformer = None  # type: ignore
 
+try:  # pragma: no cover - optional dependency
+    from shapely.geometry import mapping, shape  # type: ignore
+    from shapely.ops import transform as shapely_transform, unary_union  # type: ignore
+except Exception:  # pragma: no cover - shapely may not be available in tests
+    mapping = None  # type: ignore
+    shape = None  # type: ignore
+    shapely_transform = None  # type: ignore
+    unary_union = None  # type: ignore
+
 
 Point = Tuple[float, float]
 Ring = List[Point]
@@ -262,5 +272,300 @@ def estimate_geojson_area_ha(env, geometry, min_point_area_ha: float | None = No
     return (area_m2 / 10000.0) if area_m2 > 0.0 else 0.0
 
 
-__all__ = ["estimate_geojson_area_ha"]
+def _canonical_coords(coords: object, precision: int) -> object:
+    """Round nested coordinate arrays to ``precision`` decimals."""
+
+    if isinstance(coords, (list, tuple)):
+        if coords and all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in coords):
+            return [round(float(c), precision) for c in coords[:2]]
+        return [_canonical_coords(c, precision) for c in coords]
+    return coords
+
+
+def _canonical_ring(ring: list) -> list:
+    """Rotate a closed ring so that it starts from its smallest vertex."""
+
+    if len(ring) < 4 or ring[0] != ring[-1]:
+        return ring
+    open_ring = ring[:-1]
+    start = open_ring.index(min(open_ring))
+    rotated = open_ring[start:] + open_ring[:start]
+    return rotated + [rotated[0]]
+
+
+def canonical_geometry(geometry: object, precision: int = 7) -> dict | None:
+    """Return a normalised copy of ``geometry`` suitable for hashing.
+
+    Features are unwrapped, coordinates rounded to ``precision`` decimals
+    (about 1 cm at 7) and polygon rings rotated to a stable start vertex, so
+    that the same plot digitised twice yields the same canonical form.
+    """
+
+    gobj = _safe_load_geojson(geometry)
+    if isinstance(gobj, dict) and gobj.get("type") == "Feature":
+        gobj = gobj.get("geometry")
+    if not isinstance(gobj, dict) or not gobj.get("type"):
+        return None
+
+    gtype = gobj.get("type")
+    coords = _canonical_coords(gobj.get("coordinates"), precision)
+    if gtype == "Polygon" and isinstance(coords, list):
+        coords = [_canonical_ring(ring) for ring in coords]
+    elif gtype == "MultiPolygon" and isinstance(coords, list):
+        coords = [[_canonical_ring(ring) for ring in poly] for poly in coords]
+    return {"type": gtype, "coordinates": coords}
+
+
+def geometry_fingerprint(geometry: object, precision: int = 7) -> str | None:
+    """Return a stable SHA-256 hex digest of the canonical geometry."""
+
+    canonical = canonical_geometry(geometry, precision=precision)
+    if canonical is None:
+        return None
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def geometry_bbox(geometry: object) -> Tuple[float, float, float, float] | None:
+    """Return ``(min_lon, min_lat, max_lon, max_lat)`` for a GeoJSON geometry."""
+
+    gobj = _safe_load_geojson(geometry)
+    lons: List[float] = []
+    lats: List[float] = []
+    for geom in _iter_geometries(gobj):
+        if geom.get("type") == "Point":
+            coords = geom.get("coordinates") or []
+            if len(coords) >= 2:
+                lons.append(float(coords[0]))
+                lats.append(float(coords[1]))
+            continue
+        for rings in _collect_polygons(geom):
+            for ring in rings:
+                lons.extend(p[0] for p in ring)
+                lats.extend(p[1] for p in ring)
+    if not lons:
+        return None
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def _point_in_ring(lon: float, lat: float, ring: Ring) -> bool:
+    """Ray-casting test of ``(lon, lat)`` against a closed ring."""
+
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat):
+            x_cross = (xj - xi) * (lat - yi) / (yj - yi) + xi
+            if lon < x_cross:
+                inside = not inside
+        j = i
+    return inside
+
+
+def point_in_geometry(lon: float, lat: float, geometry: object) -> bool:
+    """Return whether ``(lon, lat)`` falls inside a (Multi)Polygon, holes excluded."""
+
+    gobj = _safe_load_geojson(geometry)
+    for geom in _iter_geometries(gobj):
+        for rings in _collect_polygons(geom):
+            if not rings or not _point_in_ring(lon, lat, rings[0]):
+                continue
+            if not any(_point_in_ring(lon, lat, hole) for hole in rings[1:]):
+                return True
+    return False
+
+
+def _bbox_polygon(bbox: Tuple[float, float, float, float]) -> Polygon:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return [[(min_lon, min_lat), (max_lon, min_lat), (max_lon, max_lat),
+             (min_lon, max_lat), (min_lon, min_lat)]]
+
+
+def _bboxes_touch(a, b) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def union_geometries(geometries: Iterable[object]) -> dict | None:
+    """Return one valid (Multi)Polygon covering every input geometry.
+
+    A MultiPolygon whose parts overlap is invalid, so the parts are
+    dissolved with shapely's ``unary_union``. Without shapely, parts whose
+    bounding boxes touch are replaced by the envelope of their group: the
+    result covers slightly more ground but its parts never overlap.
+    """
+
+    parts: List[Polygon] = []
+    for geometry in geometries:
+        gobj = _safe_load_geojson(geometry)
+        for geom in _iter_geometries(gobj):
+            parts.extend(rings for rings in _collect_polygons(geom) if rings)
+    if not parts:
+        return None
+
+    if shape is not None and unary_union is not None:
+        try:
+            merged = unary_union([
+                shape({"type": "Polygon", "coordinates": rings}).buffer(0) for rings in parts
+            ])
+            result = json.loads(json.dumps(mapping(merged)))
+            if result.get("type") in ("Polygon", "MultiPolygon"):
+                return result
+        except Exception:  # pragma: no cover - fall back to envelopes
+            pass
+
+    groups = [(geometry_bbox({"type": "Polygon", "coordinates": rings}), [rings]) for rings in parts]
+    merged_any = True
+    while merged_any:
+        merged_any = False
+        out: List[tuple] = []
+        for bbox, members in groups:
+            for idx, (other_bbox, other_members) in enumerate(out):
+                if _bboxes_touch(bbox, other_bbox):
+                    out[idx] = (
+                        (min(bbox[0], other_bbox[0]), min(bbox[1], other_bbox[1]),
+                         max(bbox[2], other_bbox[2]), max(bbox[3], other_bbox[3])),
+                        other_members + members,
+                    )
+                    merged_any = True
+                    break
+            else:
+                out.append((bbox, members))
+        groups = out
+
+    polygons = [members[0] if len(members) == 1 else _bbox_polygon(bbox) for bbox, members in groups]
+    coordinates = [[[list(p) for p in ring] for ring in rings] for rings in polygons]
+    if len(coordinates) == 1:
+        return {"type": "Polygon", "coordinates": coordinates[0]}
+    return {"type": "MultiPolygon", "coordinates": coordinates}
+
+
+def count_vertices(geometry: object) -> int:
+    """Return the number of ring vertices of a (Multi)Polygon."""
+
+    gobj = _safe_load_geojson(geometry)
+    total = 0
+    for geom in _iter_geometries(gobj):
+        for rings in _collect_polygons(geom):
+            total += sum(len(ring) for ring in rings)
+    return total
+
+
+def _metric_transforms(lon0: float, lat0: float):
+    """Return ``(forward, inverse)`` functions between WGS84 and metres."""
+
+    if Transformer and CRS:
+        try:
+            zone = int(math.floor((lon0 + 180.0) / 6.0) + 1)
+            epsg = (32600 if lat0 >= 0.0 else 32700) + zone
+            forward = Transformer.from_crs("EPSG:4326", f"EPSG:{epsg}", always_xy=True)
+            inverse = Transformer.from_crs(f"EPSG:{epsg}", "EPSG:4326", always_xy=True)
+            return forward.transform, inverse.transform
+        except Exception:  # pragma: no cover - fall back to local projection
+            pass
+
+    R = 6371008.8
+    cos_lat0 = max(math.cos(math.radians(lat0)), 1e-6)
+
+    def _forward(xs, ys):
+        return ([R * math.radians(x - lon0) * cos_lat0 for x in xs],
+                [R * math.radians(y - lat0) for y in ys])
+
+    def _inverse(xs, ys):
+        return ([lon0 + math.degrees(x / (R * cos_lat0)) for x in xs],
+                [lat0 + math.degrees(y / R) for y in ys])
+
+    return _forward, _inverse
+
+
+def simplify_geometry(geometry: object, tolerance_m: float, min_vertices: int = 0):
+    """Douglas-Peucker simplification of a (Multi)Polygon with a metric tolerance.
+
+    Rings are thinned with ``preserve_topology`` so that the result stays a
+    valid polygon with the same holes. Geometries with fewer than
+    ``min_vertices`` vertices are left alone. Returns ``(geometry, info)``
+    where ``info`` reports the vertices and the area before and after, or
+    ``None`` when nothing was simplified.
+    """
+
+    gobj = _safe_load_geojson(geometry)
+    if (shape is None or tolerance_m is None or float(tolerance_m) <= 0.0
+            or not isinstance(gobj, dict) or gobj.get("type") not in ("Polygon", "MultiPolygon")):
+        return geometry, None
+
+    vertices_before = count_vertices(gobj)
+    if vertices_before < max(int(min_vertices or 0), 4):
+        return geometry, None
+
+    try:
+        original = shape(gobj)
+        bbox = original.bounds
+        forward, inverse = _metric_transforms((bbox[0] + bbox[2]) / 2.0, (bbox[1] + bbox[3]) / 2.0)
+        projected = shapely_transform(forward, original)
+        simplified = projected.simplify(float(tolerance_m), preserve_topology=True)
+        if simplified.is_empty or simplified.geom_type not in ("Polygon", "MultiPolygon"):
+            return geometry, None
+        result = json.loads(json.dumps(mapping(shapely_transform(inverse, simplified))))
+    except Exception:  # pragma: no cover - invalid input, keep it as it is
+        return geometry, None
+
+    vertices_after = count_vertices(result)
+    if vertices_after >= vertices_before:
+        return geometry, None
+
+    area_before = projected.area
+    area_after = simplified.area
+    info = {
+        "tolerance_m": float(tolerance_m),
+        "vertices_before": vertices_before,
+        "vertices_after": vertices_after,
+        "area_before_ha": round(area_before / 10000.0, 4),
+        "area_after_ha": round(area_after / 10000.0, 4),
+        "area_error_pct": round(abs(area_after - area_before) * 100.0 / area_before, 4) if area_before else 0.0,
+    }
+    return result, info
+
+
+def _get_simplify_params(env, default_tolerance: float = 2.0, default_min_vertices: int = 200):
+    """Fetch the simplification tolerance (metres) and vertex threshold."""
+
+    tolerance, min_vertices = default_tolerance, default_min_vertices
+    if env is None:
+        return tolerance, min_vertices
+
+    try:
+        icp = env["ir.config_parameter"].sudo()
+        raw = icp.get_param("planetio.geometry_simplify_tolerance_m")
+        if raw not in (None, "", False):
+            tolerance = max(float(raw), 0.0)
+        raw = icp.get_param("planetio.geometry_simplify_min_vertices")
+        if raw not in (None, "", False):
+            min_vertices = max(int(raw), 0)
+    except Exception:  # pragma: no cover - defensive
+        pass
+    return tolerance, min_vertices
+
+
+def simplify_for_submission(env, geometry: object):
+    """Apply :func:`simplify_geometry` with the configured tolerance.
+
+    Used by the providers right before a geometry goes over the wire; a
+    tolerance of 0 disables the step.
+    """
+
+    tolerance, min_vertices = _get_simplify_params(env)
+    return simplify_geometry(geometry, tolerance, min_vertices=min_vertices)
+
+
+__all__ = [
+    "canonical_geometry",
+    "count_vertices",
+    "estimate_geojson_area_ha",
+    "geometry_bbox",
+    "geometry_fingerprint",
+    "point_in_geometry",
+    "simplify_for_submission",
+    "simplify_geometry",
+]
 
@@ -0,0 +1,326 @@
+"""Local stand-in for the GFW Data API and the Plant4 farm-data API.
+
+Used to measure the deforestation pipeline without touching the real
+services (see :mod:`.deforestation_benchmark`). The server answers
+
+* ``POST /dataset/<dataset>/<version>/query/json`` with rows shaped like the
+  SQL the GFW provider sends (aggregates, grouped series, alert points or the
+  ``cnt`` of the fallback query);
+* ``POST /api/farm-data`` and ``GET /api/farm-data?uid=`` like Plant4.
+
+Alerts are synthetic but deterministic: they are derived from the geometry
+fingerprint, so repeated runs over the same plots return the same payloads.
+Latency, 5xx / 429 answers and hanging requests are injected according to
+:class:`MockConfig`.
+
+Run it standalone with ``python -m odoo.addons.planetio.utils.mock_deforestation_server``
+and point ``planetio.gfw_base_url`` / ``deforestation.plant4.base_url`` to it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .geo import geometry_fingerprint
+
+CONFIDENCE_LEVELS = ("nominal", "high", "highest")
+_DATE_FROM_RE = re.compile(r">=\s*'(\d{4}-\d{2}-\d{2})'")
+_GFW_PATH_RE = re.compile(r"^/dataset/(?P<dataset>[^/]+)/(?P<version>[^/]+)/query(?:/json)?$")
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock server; every rate is a probability in [0, 1]."""
+
+    latency_ms: float = 50.0
+    jitter_ms: float = 20.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    timeout_rate: float = 0.0
+    hang_seconds: float = 95.0
+    alert_rate: float = 0.3
+    max_alerts: int = 40
+    history_days: int = 5 * 365
+    seed: int = 0
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    by_route: Dict[str, int] = field(default_factory=dict)
+    by_status: Dict[int, int] = field(default_factory=dict)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "by_route": dict(self.by_route),
+            "by_status": dict(self.by_status),
+        }
+
+
+def synthetic_alerts(geometry: object, config: MockConfig, today: Optional[date] = None) -> List[dict]:
+    """Deterministic alert points for ``geometry``.
+
+    A share ``alert_rate`` of the geometries has between 1 and ``max_alerts``
+    alerts spread over the last ``history_days``; the others have none.
+    """
+    fingerprint = geometry_fingerprint(geometry) or json.dumps(geometry, sort_keys=True, default=str)
+    digest = hashlib.sha256(f"{config.seed}|{fingerprint}".encode("utf-8")).hexdigest()
+    rng = random.Random(int(digest[:16], 16))
+    if rng.random() >= config.alert_rate:
+        return []
+    today = today or date.today()
+    lon, lat = _reference_point(geometry)
+    alerts = []
+    for _i in range(rng.randint(1, max(1, config.max_alerts))):
+        alerts.append({
+            "alert_date": (today - timedelta(days=rng.randint(0, config.history_days))).isoformat(),
+            "confidence": rng.choice(CONFIDENCE_LEVELS),
+            "area_ha": round(rng.uniform(0.01, 1.5), 4),
+            "latitude": round(lat + rng.uniform(-0.002, 0.002), 6),
+            "longitude": round(lon + rng.uniform(-0.002, 0.002), 6),
+        })
+    alerts.sort(key=lambda a: a["alert_date"], reverse=True)
+    return alerts
+
+
+def _reference_point(geometry: object):
+    coords = geometry.get("coordinates") if isinstance(geometry, dict) else None
+    while isinstance(coords, list) and coords and isinstance(coords[0], list):
+        coords = coords[0]
+    if isinstance(coords, list) and len(coords) >= 2:
+        try:
+            return float(coords[0]), float(coords[1])
+        except (TypeError, ValueError):
+            pass
+    return 0.0, 0.0
+
+
+def gfw_rows(sql: str, alerts: List[dict]) -> List[dict]:
+    """Answer ``sql`` (as sent by the GFW provider) from ``alerts``."""
+    match = _DATE_FROM_RE.search(sql or "")
+    if match:
+        alerts = [a for a in alerts if a["alert_date"] >= match.group(1)]
+    lowered = (sql or "").lower()
+
+    if " as cnt" in lowered:
+        return [{"cnt": len(alerts)}]
+    if "latitude" in lowered or "st_centroid" in lowered:
+        return [dict(a, area__ha=a["area_ha"], alert_id=f"mock-{idx}") for idx, a in enumerate(alerts)]
+    if "group by" in lowered:
+        by_confidence = "__confidence" in lowered.split("group by", 1)[1]
+        groups = {}
+        for alert in alerts:
+            key = (alert["alert_date"], alert["confidence"] if by_confidence else None)
+            row = groups.setdefault(key, {
+                "alert_date": alert["alert_date"], "alert_count": 0, "area_ha": 0.0,
+                "confidence": alert["confidence"],
+                "first_alert_date": alert["alert_date"], "last_alert_date": alert["alert_date"],
+            })
+            row["alert_count"] += 1
+            row["area_ha"] += alert["area_ha"]
+            if CONFIDENCE_LEVELS.index(alert["confidence"]) > CONFIDENCE_LEVELS.index(row["confidence"]):
+                row["confidence"] = alert["confidence"]
+        return sorted(groups.values(), key=lambda r: r["alert_date"], reverse=True)
+    dates = [a["alert_date"] for a in alerts]
+    return [{
+        "alert_count": len(alerts),
+        "area_ha_total": sum(a["area_ha"] for a in alerts),
+        "first_alert_date": min(dates) if dates else None,
+        "last_alert_date": max(dates) if dates else None,
+    }]
+
+
+def plant4_feature(feature: dict, alerts: List[dict]) -> dict:
+    props = dict(feature.get("properties") or {})
+    props["deforestation"] = {
+        "alert_count": len(alerts),
+        "area_ha": round(sum(a["area_ha"] for a in alerts), 4),
+        "risk_level": "high" if alerts else "low",
+        "last_alert_date": alerts[0]["alert_date"] if alerts else None,
+        "alerts": [
+            {"date": a["alert_date"], "confidence": a["confidence"], "area_ha": a["area_ha"]}
+            for a in alerts
+        ],
+    }
+    return {"type": "Feature", "properties": props, "geometry": None}
+
+
+class MockDeforestationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), config: Optional[MockConfig] = None):
+        super().__init__(address, _Handler)
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self.farms: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockDeforestationServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="planetio-mock-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = MockStats()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self):
+        with self.lock:
+            return self._rng.random(), self._rng.random()
+
+    def _count(self, route: str, status: int):
+        with self.lock:
+            self.stats.requests += 1
+            self.stats.by_route[route] = self.stats.by_route.get(route, 0) + 1
+            self.stats.by_status[status] = self.stats.by_status.get(status, 0) + 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockDeforestationServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 - keep benchmarks quiet
+        pass
+
+    # ---- plumbing ----
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw.decode("utf-8")) if raw else {}
+        except ValueError:
+            return None
+
+    def _send(self, route: str, status: int, payload=None, headers=None):
+        body = json.dumps(payload if payload is not None else {}).encode("utf-8")
+        self.server._count(route, status)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_faults(self, route: str) -> bool:
+        """Sleep and possibly answer with an error; True when a fault was sent."""
+        config = self.server.config
+        fault, jitter = self.server._draw()
+        delay = max(0.0, config.latency_ms + (jitter * 2.0 - 1.0) * config.jitter_ms) / 1000.0
+        if fault < config.timeout_rate:
+            time.sleep(config.hang_seconds)
+            self._send(route, 504, {"status": "error", "message": "mock timeout"})
+            return True
+        time.sleep(delay)
+        fault -= config.timeout_rate
+        if fault < config.throttle_rate:
+            self._send(route, 429, {"status": "error", "message": "mock throttling"},
+                       {"Retry-After": str(config.retry_after)})
+            return True
+        fault -= config.throttle_rate
+        if fault < config.error_rate:
+            self._send(route, 503, {"status": "error", "message": "mock failure"})
+            return True
+        return False
+
+    # ---- routes ----
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if _GFW_PATH_RE.match(path):
+            return self._gfw_query()
+        if path == "/api/farm-data":
+            return self._plant4_post()
+        self._send("unknown", 404, {"status": "error", "message": "not found"})
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/api/farm-data":
+            return self._plant4_get(parse_qs(parts.query).get("uid", [None])[0])
+        self._send("unknown", 404, {"status": "error", "message": "not found"})
+
+    def _gfw_query(self):
+        body = self._read_json()
+        if self._inject_faults("gfw"):
+            return
+        if not isinstance(body, dict) or not body.get("sql"):
+            return self._send("gfw", 422, {"status": "failed", "message": "sql is required"})
+        alerts = synthetic_alerts(body.get("geometry"), self.server.config)
+        self._send("gfw", 200, {"status": "success", "data": gfw_rows(body["sql"], alerts)})
+
+    def _plant4_post(self):
+        body = self._read_json()
+        if self._inject_faults("plant4"):
+            return
+        features = (((body or {}).get("geoJSON") or {}).get("features")) or []
+        if not features:
+            return self._send("plant4", 400, {"message": "geoJSON.features is required"})
+        answered = []
+        for feature in features:
+            answer = plant4_feature(feature, synthetic_alerts(feature.get("geometry"), self.server.config))
+            uid = answer["properties"].get("uid")
+            if uid:
+                with self.server.lock:
+                    self.server.farms[uid] = answer
+            answered.append(answer)
+        self._send("plant4", 200, {"geoJSON": {"type": "FeatureCollection", "features": answered}})
+
+    def _plant4_get(self, uid):
+        if self._inject_faults("plant4"):
+            return
+        with self.server.lock:
+            answer = self.server.farms.get(uid)
+        if answer is None:
+            return self._send("plant4", 404, {"message": "farm not found"})
+        self._send("plant4", 200, {"geoJSON": {"type": "FeatureCollection", "features": [answer]}})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, value in MockConfig().__dict__.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=type(value), default=value)
+    args = parser.parse_args(argv)
+    config = MockConfig(**{name: getattr(args, name) for name in MockConfig().__dict__})
+    server = MockDeforestationServer((args.host, args.port), config)
+    print(f"Mock GFW/Plant4 API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
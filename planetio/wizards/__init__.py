@@ -1,2 +1,3 @@
 from . import import_wizard
-from . import deforestation_geometry_wizard
\ No newline at end of file
+from . import deforestation_geometry_wizard
+from . import offline_alert_import_wizard
\ No newline at end of file
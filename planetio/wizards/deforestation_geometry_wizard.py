@@ -12,6 +12,7 @@ class DeforestationGeometryWizard(models.TransientModel):
         selection=[
             ('gfw', 'Global Forest Watch'),
             ('plant4', 'Plant-for-the-Planet Farm Analysis'),
+            ('offline', 'Offline alert extracts'),
         ],
         string="Deforestation Provider",
         required=True,
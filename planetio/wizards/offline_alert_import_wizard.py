@@ -0,0 +1,50 @@
+import base64
+
+from odoo import fields, models, _
+from odoo.exceptions import UserError
+
+
+class OfflineAlertImportWizard(models.TransientModel):
+    _name = 'deforestation.offline.alert.import.wizard'
+    _description = 'Offline Alert Extract Import Wizard'
+
+    file_data = fields.Binary(string="Extract (CSV / GeoJSON)", required=True)
+    file_name = fields.Char(string="File name")
+    dataset = fields.Selection(
+        selection=[
+            ('gfw_integrated_alerts', 'GFW Integrated Alerts'),
+            ('wur_radd_alerts', 'RADD Alerts'),
+            ('umd_glad_landsat_alerts', 'GLAD-L Alerts'),
+            ('umd_glad_sentinel2_alerts', 'GLAD-S2 Alerts'),
+        ],
+        string="Dataset",
+        required=True,
+        default='gfw_integrated_alerts',
+    )
+    replace = fields.Boolean(
+        string="Replace dataset",
+        default=True,
+        help="Elimina le allerte già caricate per lo stesso dataset prima dell'import.",
+    )
+
+    def action_import(self):
+        self.ensure_one()
+        try:
+            data = base64.b64decode(self.file_data or b'')
+            count = self.env['deforestation.offline.alert'].sudo().load_extract(
+                data, filename=self.file_name, dataset=self.dataset, replace=self.replace,
+            )
+        except UserError:
+            raise
+        except Exception as exc:
+            raise UserError(_("Estratto allerte non valido: %s") % exc)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Allerte offline"),
+                'message': _("%(n)s allerte caricate per %(d)s.") % {'n': count, 'd': self.dataset},
+                'type': 'success',
+                'sticky': False,
+            },
+        }
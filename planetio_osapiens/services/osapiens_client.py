@@ -4,6 +4,9 @@ import time
 import logging
 import requests
 
+from odoo.addons.planetio.services import http_client
+from odoo.addons.planetio.services.rate_limiter import parse_retry_after
+
 DEFAULT_TIMEOUT = 60
 MAX_RETRIES = 3
 BACKOFF_SEC = 2.0
@@ -29,6 +32,7 @@ class OsapiensClient:
             self.verify_ssl = self.verify_ssl.lower() in ('1', 'true', 'yes')
         if not self.base_url or not self.account_id or not self.api_token:
             raise ValueError("Configurazione oSapiens incompleta: base_url/account_id/api_token richiesti.")
+        self.limiter = env['planetio.rate.limiter'].sudo() if 'planetio.rate.limiter' in env else None
 
     def _auth_headers(self):
         return {
@@ -59,11 +63,13 @@ class OsapiensClient:
         for attempt in range(1, MAX_RETRIES + 1):
             try:
                 if files:
-                    resp = requests.request(method, url, headers=headers, data=payload, files=files,
-                                            timeout=self.timeout, verify=self.verify_ssl)
+                    resp = http_client.request(method, url, headers=headers, data=payload, files=files,
+                                               timeout=self.timeout, verify=self.verify_ssl,
+                                               limiter=self.limiter)
                 else:
-                    resp = requests.request(method, url, headers=headers, json=payload, params=params,
-                                            timeout=self.timeout, verify=self.verify_ssl)
+                    resp = http_client.request(method, url, headers=headers, json=payload, params=params,
+                                               timeout=self.timeout, verify=self.verify_ssl,
+                                               limiter=self.limiter)
                 if 200 <= resp.status_code < 300:
                     ct = resp.headers.get('Content-Type', '')
                     if ct.startswith('application/json'):
@@ -72,7 +78,13 @@ class OsapiensClient:
                 else:
                     self._log_ir('ERROR', f"HTTP {resp.status_code} {method} {url}", resp.text)
                     if resp.status_code in (429, 500, 502, 503, 504) and attempt < MAX_RETRIES:
-                        time.sleep(BACKOFF_SEC * attempt)
+                        retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+                        if retry_after is None:
+                            time.sleep(BACKOFF_SEC * attempt)
+                        elif self.limiter is None or not self.limiter.is_limited(url):
+                            time.sleep(max(retry_after, BACKOFF_SEC * attempt))
+                        # else: the shared limiter already paused the host and
+                        # makes the next attempt wait in acquire()
                         continue
                     resp.raise_for_status()
             except requests.RequestException as e:
@@ -0,0 +1,404 @@
+import importlib.util
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+
+
+def _ensure_odoo_stub():
+    odoo = sys.modules.get('odoo')
+    if odoo is None:
+        odoo = types.ModuleType('odoo')
+        sys.modules['odoo'] = odoo
+
+    models_ns = getattr(odoo, 'models', types.SimpleNamespace())
+    for attr in ('Model', 'AbstractModel', 'TransientModel'):
+        if not hasattr(models_ns, attr):
+            setattr(models_ns, attr, object)
+    odoo.models = models_ns
+
+    class _Field:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    fields_ns = getattr(odoo, 'fields', types.SimpleNamespace())
+    for attr in ('Binary', 'Char', 'Integer', 'Float', 'Text', 'Boolean',
+                 'Many2one', 'One2many', 'Date', 'Datetime', 'Selection'):
+        if not hasattr(fields_ns, attr):
+            setattr(fields_ns, attr, _Field)
+    odoo.fields = fields_ns
+
+    if not hasattr(odoo, 'api'):
+        odoo.api = types.SimpleNamespace()
+    odoo._ = lambda value: value
+
+    tools_module = sys.modules.get('odoo.tools')
+    if tools_module is None:
+        tools_module = types.ModuleType('odoo.tools')
+        sys.modules['odoo.tools'] = tools_module
+    if not hasattr(tools_module, 'ustr'):
+        tools_module.ustr = lambda value: str(value)
+    if not hasattr(tools_module, 'html_escape'):
+        tools_module.html_escape = lambda value: value
+    if not hasattr(tools_module, 'config'):
+        tools_module.config = {}
+    odoo.tools = tools_module
+
+    exceptions_mod = sys.modules.get('odoo.exceptions')
+    if exceptions_mod is None:
+        exceptions_mod = types.SimpleNamespace(UserError=Exception)
+        sys.modules['odoo.exceptions'] = exceptions_mod
+    if not hasattr(exceptions_mod, 'UserError'):
+        exceptions_mod.UserError = Exception
+    odoo.exceptions = exceptions_mod
+
+
+_ensure_odoo_stub()
+
+module_path = repo_root / 'planetio' / 'models' / 'eudr_deforestation.py'
+# Light parent packages so that the model's relative imports resolve
+# without importing the Odoo addon itself.
+for _name, _path in (('planetio_light', 'planetio'), ('planetio_light.services', 'planetio/services')):
+    _package = types.ModuleType(_name)
+    _package.__path__ = [str(repo_root / _path)]
+    sys.modules.setdefault(_name, _package)
+
+spec = importlib.util.spec_from_file_location('planetio_light.models.eudr_deforestation', module_path)
+mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mod)
+
+Line = mod.EUDRDeclarationLineDeforestation
+
+
+class FakeService:
+    def __init__(self, workers):
+        self.workers = workers
+        self.env = types.SimpleNamespace(uid=1, context={})
+        self.threads = set()
+
+    def get_concurrency(self):
+        return self.workers
+
+    def _analyze_line_in_worker(self, snapshot, uid, context):
+        self.threads.add(threading.current_thread().name)
+        # later lines answer first to check that results are re-ordered
+        time.sleep(0.01 * (5 - snapshot))
+        if snapshot == 3:
+            raise ValueError('boom')
+        return {'metrics': {'alert_count': snapshot}}
+
+
+class FakeLine:
+    external_properties_json = None
+
+    def __init__(self, line_id, svc):
+        self.id = line_id
+        self._svc = svc
+
+    def _get_deforestation_service(self):
+        return self._svc
+
+    def _deforestation_snapshot(self):
+        return self.id
+
+    def retrieve_deforestation_status(self):
+        return {'metrics': {'alert_count': self.id}, 'sequential': True}
+
+
+class FakeLines(list):
+    progress_calls = 0
+
+    def __getitem__(self, item):
+        res = super().__getitem__(item)
+        return FakeLines(res) if isinstance(item, slice) else res
+
+    def _get_deforestation_service(self):
+        return self[0]._get_deforestation_service()
+
+    def with_progress(self, msg):
+        FakeLines.progress_calls += 1
+        return iter(self)
+
+
+def _run(workers):
+    svc = FakeService(workers)
+    lines = FakeLines(FakeLine(i, svc) for i in range(1, 5))
+    return svc, list(Line._iter_deforestation_statuses(lines, 'msg'))
+
+
+def test_concurrent_statuses_keep_line_order_and_errors():
+    svc, results = _run(workers=4)
+
+    assert [line.id for line, _status, _err in results] == [1, 2, 3, 4]
+    assert results[0][1] == {'metrics': {'alert_count': 1}}
+    assert results[2][1] is None
+    assert isinstance(results[2][2], ValueError)
+    assert all(name.startswith('planetio-defor') for name in svc.threads)
+
+
+def test_single_worker_runs_sequentially():
+    FakeLines.progress_calls = 0
+    svc, results = _run(workers=1)
+
+    assert FakeLines.progress_calls == 1
+    assert not svc.threads
+    assert all(status.get('sequential') for _line, status, _err in results)
+
+
+class RecordingModel:
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+        self.ids = []
+
+    def browse(self, ids):
+        rec = RecordingModel(self.log, self.name)
+        rec.ids = list(ids)
+        return rec
+
+    def search(self, domain):
+        self.log.append(('search', self.name, domain))
+        return self
+
+    def write(self, vals):
+        self.log.append(('write', tuple(self.ids), vals))
+
+    def unlink(self):
+        self.log.append(('unlink', self.name))
+
+    def create(self, rows):
+        self.log.append(('create', self.name, rows))
+
+
+class RecordingField:
+    def __init__(self, name, column_type):
+        self.name = name
+        self.column_type = (column_type, column_type)
+
+    def convert_to_column(self, value, record):
+        return value if value is not False else None
+
+
+class RecordingLines(RecordingModel):
+    _table = 'eudr_declaration_line'
+    _fields = {
+        name: RecordingField(name, column_type)
+        for name, column_type in (
+            ('defor_details_json', 'text'),
+            ('defor_raw_payload', 'bytea'),
+            ('defor_geometry_hash', 'varchar'),
+            ('defor_area_ha', 'numeric'),
+            ('external_message', 'varchar'),
+            ('external_message_short', 'varchar'),
+        )
+    }
+
+    def flush(self, fnames=None):
+        self.log.append(('flush', tuple(fnames or ())))
+
+    def invalidate_cache(self, fnames=None, ids=None):
+        self.log.append(('invalidate', tuple(ids or ())))
+
+
+class RecordingCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, query, params=None):
+        self.log.append(('sql', query, list(params or ())))
+
+
+class RecordingEnv(dict):
+    def __init__(self, log, models):
+        super().__init__(models)
+        self.cr = RecordingCursor(log)
+        self.uid = 7
+
+
+def _line_vals(line_id, alerts):
+    message = 'Line %s: %s alerts' % (line_id, alerts)
+    return {
+        'defor_alerts': alerts,
+        'external_status': 'fail' if alerts else 'ok',
+        'external_ok': not alerts,
+        'defor_date_from': '2024-01-01',
+        'defor_details_json': '{"line": %s}' % line_id,
+        'defor_raw_payload': b'payload-%d' % line_id,
+        'defor_geometry_hash': 'hash-%s' % line_id,
+        'defor_area_ha': 0.5 * alerts,
+        'external_message': message,
+        'external_message_short': message[:10],
+    }
+
+
+def test_write_buffer_groups_shared_fields_and_bulk_updates_per_line_fields():
+    log = []
+    env = RecordingEnv(log, {
+        'eudr.declaration.line': RecordingLines(log, 'line'),
+        'eudr.declaration.line.alert': RecordingModel(log, 'alert'),
+    })
+    buffer = mod._DeforestationWriteBuffer(env)
+    line = types.SimpleNamespace
+    buffer.write(line(id=1), _line_vals(1, 0))
+    buffer.write(line(id=2), _line_vals(2, 0))
+    buffer.write(line(id=3), _line_vals(3, 2))
+    buffer.replace_alerts(line(id=3), [{'line_id': 3, 'name': 'a'}, {'line_id': 3, 'name': 'b'}])
+    buffer.replace_alerts(line(id=1), [])
+
+    assert len(buffer) == 3
+    buffer.flush()
+
+    writes = [entry for entry in log if entry[0] == 'write']
+    shared = {'defor_date_from': '2024-01-01'}
+    assert writes == [
+        ('write', (1, 2), dict(shared, defor_alerts=0, external_status='ok', external_ok=True)),
+        ('write', (3,), dict(shared, defor_alerts=2, external_status='fail', external_ok=False)),
+    ]
+    statements = [entry for entry in log if entry[0] == 'sql']
+    assert len(statements) == 1
+    _sql, query, params = statements[0]
+    assert query.startswith('UPDATE "eudr_declaration_line" AS t SET "defor_area_ha" = v."defor_area_ha"')
+    assert '"write_date" = (now() at time zone \'UTC\')' in query
+    assert query.count('%s::bytea') == 3
+    assert params[0] == 7
+    assert params[1] == 1 and params[8] == 2 and params[15] == 3
+    assert b'payload-2' in params and 'Line 3: 2 alerts' in params
+    assert ('invalidate', (1, 2, 3)) in log
+    assert ('search', 'alert', [('line_id', 'in', [3, 1])]) in log
+    creates = [entry for entry in log if entry[0] == 'create']
+    assert len(creates) == 1 and len(creates[0][2]) == 2
+    assert len(buffer) == 0
+
+
+def test_write_buffer_refreshes_rollups_of_touched_declarations():
+    log = []
+
+    class RecordingDeclarations(RecordingModel):
+        def browse(self, ids):
+            rec = RecordingDeclarations(self.log, self.name)
+            rec.ids = list(ids)
+            return rec
+
+        def _refresh_deforestation_rollups(self):
+            self.log.append(('rollup', tuple(sorted(self.ids))))
+
+    env = {
+        'eudr.declaration.line': RecordingModel(log, 'line'),
+        'eudr.declaration.line.alert': RecordingModel(log, 'alert'),
+        'eudr.declaration': RecordingDeclarations(log, 'declaration'),
+    }
+    buffer = mod._DeforestationWriteBuffer(env)
+    decl = types.SimpleNamespace
+    buffer.write(types.SimpleNamespace(id=1, declaration_id=decl(id=10)), {'defor_alerts': 1})
+    buffer.write(types.SimpleNamespace(id=2, declaration_id=decl(id=20)), {'defor_alerts': 0})
+    buffer.write(types.SimpleNamespace(id=3, declaration_id=decl(id=10)), {'defor_alerts': 0})
+    buffer.flush()
+
+    assert log[-1] == ('rollup', (10, 20))
+    buffer.flush()
+    assert [entry for entry in log if entry[0] == 'rollup'] == [('rollup', (10, 20))]
+
+
+class FakeResults:
+    def __init__(self, stored=None):
+        self.stored = dict(stored or {})
+        self.writes = []
+
+    def is_enabled(self):
+        return True
+
+    def lookup(self, keys):
+        return {key: self.stored[key] for key in keys if key in self.stored}
+
+    def store(self, key, status, **info):
+        result_id = 100 + len(self.writes)
+        self.writes.append((key, info['geometry_hash']))
+        self.stored[key] = (result_id, status)
+        return result_id
+
+
+class SharedLines(FakeLines):
+    keys = {}
+    env = {}
+    inherited = {}
+
+    def _inherited_plot_statuses(self):
+        return {line.id: self.inherited[line.id] for line in self if line.id in self.inherited}
+
+    def browse(self, ids):
+        by_id = {line.id: line for line in self}
+        return SharedLines(by_id[i] for i in ids)
+
+    def _deforestation_result_keys(self):
+        return {line.id: self.keys[line.id] for line in self if line.id in self.keys}
+
+    def _iter_deforestation_statuses(self, msg):
+        return Line._iter_deforestation_statuses(self, msg)
+
+
+def test_shared_statuses_analyze_each_geometry_once():
+    svc = FakeService(workers=1)
+    analyzed = []
+
+    class CountingLine(FakeLine):
+        def retrieve_deforestation_status(self):
+            analyzed.append(self.id)
+            return {'metrics': {'alert_count': self.id}, 'meta': {'provider': 'gfw'}}
+
+    results_model = FakeResults(stored={'k-cached': (7, {'metrics': {'alert_count': 9}, 'meta': {}})})
+    SharedLines.env = {'deforestation.analysis.result': results_model}
+    SharedLines.inherited = {}
+    SharedLines.keys = {
+        1: ('k-a', {'geometry_hash': 'a', 'provider': 'gfw'}),
+        2: ('k-cached', {'geometry_hash': 'c', 'provider': 'gfw'}),
+        3: ('k-a', {'geometry_hash': 'a', 'provider': 'gfw'}),
+        # line 4 has no geometry and always goes to the provider
+    }
+    lines = SharedLines(CountingLine(i, svc) for i in range(1, 5))
+
+    results = list(Line._iter_shared_deforestation_statuses(lines, 'msg'))
+
+    assert [line.id for line, _status, _err in results] == [1, 2, 3, 4]
+    assert analyzed == [1, 4]
+    assert results_model.writes == [('k-a', 'a')]
+    assert results[0][1]['meta']['result_id'] == 100
+    assert results[2][1] == results[0][1] and results[2][1] is not results[0][1]
+    assert results[1][1] == {'metrics': {'alert_count': 9}, 'meta': {'result_id': 7}}
+    assert 'result_id' not in results[3][1]['meta']
+
+
+def test_shared_statuses_take_over_fresh_plot_results():
+    svc = FakeService(workers=1)
+    plot_status = {'metrics': {'alert_count': 0}, 'meta': {'plot_id': 5}}
+    SharedLines.env = {}
+    SharedLines.keys = {}
+    SharedLines.inherited = {2: plot_status}
+    lines = SharedLines(FakeLine(i, svc) for i in range(1, 4))
+
+    results = list(Line._iter_shared_deforestation_statuses(lines, 'msg'))
+
+    assert [line.id for line, _status, _err in results] == [1, 2, 3]
+    assert results[1][1] is plot_status
+    assert results[0][1].get('sequential') and results[2][1].get('sequential')
+
+
+def test_result_staleness_checks_provider_window_and_geometry():
+    from datetime import date, datetime
+
+    record = types.SimpleNamespace(
+        defor_provider='gfw',
+        defor_analyzed_at=datetime(2024, 6, 1, 12, 0),
+        defor_date_from=date(2023, 6, 2),
+        defor_geometry_hash='abc',
+    )
+    stale = mod.is_deforestation_result_stale
+
+    assert not stale(record, 'abc', 'gfw', datetime(2024, 5, 1), 365)
+    assert stale(record, 'abc', 'plant4')
+    assert stale(record, 'other', 'gfw')
+    assert stale(record, 'abc', 'gfw', datetime(2024, 7, 1))
+    assert stale(record, 'abc', 'gfw', None, 730)
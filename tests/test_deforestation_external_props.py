@@ -78,7 +78,14 @@ def _ensure_odoo_stub():
 _ensure_odoo_stub()
 
 module_path = repo_root / 'planetio' / 'models' / 'eudr_deforestation.py'
-spec = importlib.util.spec_from_file_location('eudr_deforestation', module_path)
+# Light parent packages so that the model's relative imports resolve
+# without importing the Odoo addon itself.
+for _name, _path in (('planetio_light', 'planetio'), ('planetio_light.services', 'planetio/services')):
+    _package = types.ModuleType(_name)
+    _package.__path__ = [str(repo_root / _path)]
+    sys.modules.setdefault(_name, _package)
+
+spec = importlib.util.spec_from_file_location('planetio_light.models.eudr_deforestation', module_path)
 mod = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(mod)
 
@@ -175,3 +182,48 @@ def test_prepare_alert_vals_area_from_total_key():
     assert vals["line_id"] == 456
     assert vals["provider"] == "gfw"
     assert vals["area_ha"] == pytest.approx(1.75)
+
+
+def test_slim_summary_drops_raw_responses_and_geometries():
+    polygon = {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 0], [1, 1], [0, 0]]]}
+    status = {
+        'message': 'GFW: 60 alerts',
+        'metrics': {'alert_count': 60},
+        'meta': {'provider': 'gfw', 'original_geom': polygon, 'final_geom_used': polygon},
+        'alerts': [{'alert_id': str(i)} for i in range(60)],
+        'details': {'responses': {'aggregate': {'data': [{'cnt': 60}]}}},
+    }
+
+    summary = mod.slim_deforestation_status(status)
+    assert set(summary) == {'message', 'metrics', 'meta', 'alerts', 'alerts_truncated'}
+    assert summary['meta'] == {'provider': 'gfw'}
+    assert len(summary['alerts']) == 50
+    assert summary['alerts_truncated'] == 60
+
+    packed = mod.compress_deforestation_payload(status)
+    assert len(packed) < len(json.dumps(status))
+    restored = mod.decompress_deforestation_payload(packed)
+    assert restored['details'] == status['details']
+    assert 'original_geom' not in restored['meta']
+
+
+def test_series_rows_prefer_grouped_rows_with_confidence():
+    status = {
+        'details': {
+            'time_series': [{'date': '2024-03-02', 'alert_count': 3.0, 'area_ha': 0.3}],
+            'responses': {'grouped': {'data': [
+                {'alert_date': '2024-03-02', 'confidence': 'high', 'alert_count': 2, 'area_ha': 0.2},
+                {'alert_date': '2024-03-02', 'confidence': 'nominal', 'alert_count': 1, 'area_ha': 0.1},
+                {'alert_date': None, 'confidence': 'high', 'alert_count': 5},
+            ]}},
+        },
+    }
+
+    assert mod.deforestation_series_rows(status) == [
+        ('2024-03-02', 'high', 2, 0.2),
+        ('2024-03-02', 'nominal', 1, 0.1),
+    ]
+
+    del status['details']['responses']
+    assert mod.deforestation_series_rows(status) == [('2024-03-02', 'n/a', 3, 0.3)]
+    assert mod.deforestation_series_rows('no alerts') == []
@@ -0,0 +1,201 @@
+import importlib.util
+import sys
+import threading
+import types
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+
+
+def _ensure_odoo_stub():
+    odoo = sys.modules.get('odoo')
+    if odoo is None:
+        odoo = types.ModuleType('odoo')
+        sys.modules['odoo'] = odoo
+
+    models_ns = getattr(odoo, 'models', types.SimpleNamespace())
+    for attr in ('Model', 'AbstractModel', 'TransientModel'):
+        if not hasattr(models_ns, attr):
+            setattr(models_ns, attr, object)
+    odoo.models = models_ns
+
+    if not hasattr(odoo, 'api'):
+        odoo.api = types.SimpleNamespace()
+    odoo._ = lambda value: value
+
+    tools_module = sys.modules.get('odoo.tools')
+    if tools_module is None:
+        tools_module = types.ModuleType('odoo.tools')
+        sys.modules['odoo.tools'] = tools_module
+    if not hasattr(tools_module, 'config'):
+        tools_module.config = {}
+    odoo.tools = tools_module
+
+    exceptions_mod = sys.modules.get('odoo.exceptions')
+    if exceptions_mod is None:
+        exceptions_mod = types.SimpleNamespace(UserError=Exception)
+        sys.modules['odoo.exceptions'] = exceptions_mod
+    if not hasattr(exceptions_mod, 'UserError'):
+        exceptions_mod.UserError = Exception
+    odoo.exceptions = exceptions_mod
+
+
+_ensure_odoo_stub()
+
+module_path = repo_root / 'planetio' / 'services' / 'deforestation_service.py'
+spec = importlib.util.spec_from_file_location('planetio_deforestation_service', module_path)
+mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mod)
+
+Service = mod.DeforestationService
+
+
+class FakeService:
+    """Providers answer after ``release`` events so that the race is deterministic."""
+
+    def __init__(self, delay=0.05):
+        self.env = types.SimpleNamespace(uid=1, context={})
+        self.delay = delay
+        self.started = []
+        self.release = {'gfw': threading.Event(), 'plant4': threading.Event()}
+        self.outcome = {'gfw': {'metrics': {'alert_count': 1}}, 'plant4': {'metrics': {'alert_count': 2}}}
+
+    def _get_hedge_delay(self, provider_code):
+        return self.delay
+
+    def _run_provider_in_worker(self, provider_code, snapshot, uid, context):
+        self.started.append(provider_code)
+        self.release[provider_code].wait(5)
+        outcome = self.outcome[provider_code]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return dict(outcome)
+
+
+def _hedged(svc):
+    return Service._analyze_line_hedged(svc, types.SimpleNamespace(), ['gfw', 'plant4'])
+
+
+def test_fast_primary_is_not_hedged():
+    svc = FakeService(delay=5)
+    svc.release['gfw'].set()
+
+    result = _hedged(svc)
+
+    assert svc.started == ['gfw']
+    assert result['meta'] == {'provider': 'gfw', 'hedged': False}
+
+
+def test_slow_primary_is_hedged_and_secondary_wins():
+    svc = FakeService(delay=0.05)
+    svc.release['plant4'].set()
+
+    result = _hedged(svc)
+    svc.release['gfw'].set()
+
+    assert svc.started == ['gfw', 'plant4']
+    assert result['metrics'] == {'alert_count': 2}
+    assert result['meta'] == {'provider': 'plant4', 'hedged': True}
+
+
+def test_failed_primary_falls_back_without_waiting():
+    svc = FakeService(delay=5)
+    svc.outcome['gfw'] = ValueError('down')
+    svc.release['gfw'].set()
+    svc.release['plant4'].set()
+
+    result = _hedged(svc)
+
+    assert result['meta']['provider'] == 'plant4'
+
+
+def test_latency_percentile_nearest_rank():
+    samples = [float(i) for i in range(1, 101)]
+
+    assert mod.latency_percentile(samples, 95) == 95.0
+    assert mod.latency_percentile(samples, 100) == 100.0
+    assert mod.latency_percentile([3.0], 50) == 3.0
+    assert mod.latency_percentile([], 95) is None
+
+
+class SnapshotService:
+    def __init__(self, workers, batch=None):
+        self.env = types.SimpleNamespace(uid=1, context={})
+        self.workers = workers
+        self.batch = batch
+        self.calls = []
+
+    def is_batch_enabled(self):
+        return self.batch is not None
+
+    def analyze_lines_batch(self, snapshots):
+        self.calls.append(('batch', [snapshot.id for snapshot in snapshots]))
+        return self.batch
+
+    def get_concurrency(self):
+        return self.workers
+
+    def _analyze_line_in_worker(self, snapshot, uid, context):
+        self.calls.append(('worker', snapshot.id, threading.current_thread().name))
+        return self.analyze_line(snapshot)
+
+    def analyze_line(self, snapshot):
+        if snapshot.id == 3:
+            raise ValueError('no geometry')
+        return {'metrics': {'alert_count': snapshot.id}}
+
+
+def test_snapshots_use_the_batch_api_then_the_worker_pool():
+    snapshots = [types.SimpleNamespace(id=i) for i in (1, 2, 3)]
+    svc = SnapshotService(workers=4, batch={1: {'metrics': {'alert_count': 0}}})
+
+    results = Service.analyze_snapshots(svc, snapshots)
+
+    assert svc.calls[0] == ('batch', [1, 2, 3])
+    workers = [call for call in svc.calls if call[0] == 'worker']
+    assert sorted(call[1] for call in workers) == [2, 3]
+    assert all(call[2].startswith('planetio-defor') for call in workers)
+    assert results[1] == {'metrics': {'alert_count': 0}}
+    assert results[2] == {'metrics': {'alert_count': 2}}
+    assert isinstance(results[3], ValueError)
+
+
+def test_snapshots_run_one_by_one_without_concurrency():
+    snapshots = [types.SimpleNamespace(id=i) for i in (1, 2)]
+    svc = SnapshotService(workers=1)
+
+    results = Service.analyze_snapshots(svc, snapshots)
+
+    assert svc.calls == []
+    assert results == {1: {'metrics': {'alert_count': 1}}, 2: {'metrics': {'alert_count': 2}}}
+
+
+def test_hedges_share_one_bounded_pool():
+    first = FakeService(delay=5)
+    first.release['gfw'].set()
+    second = FakeService(delay=5)
+    second.release['gfw'].set()
+
+    _hedged(first)
+    _hedged(second)
+
+    assert mod.hedge_pool() is mod.hedge_pool()
+    assert mod.hedge_pool()._max_workers == mod.HEDGE_POOL_SIZE
+
+
+def test_concurrency_is_capped_by_the_connection_budget(monkeypatch):
+    class ICP:
+        def sudo(self):
+            return self
+
+        def get_param(self, key, default=None):
+            return '32' if key == 'planetio.deforestation_concurrency' else default
+
+    svc = types.SimpleNamespace(env={'ir.config_parameter': ICP()})
+    monkeypatch.setattr(mod, 'config', {'db_maxconn': 16})
+
+    assert Service.get_concurrency(svc) == 16 // 2 - mod.HEDGE_POOL_SIZE
+
+    monkeypatch.setattr(mod, 'config', {'db_maxconn': 4})
+    assert Service.get_concurrency(svc) == 1
@@ -0,0 +1,394 @@
+import importlib.util
+import sys
+import types
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+
+
+def _ensure_odoo_stub():
+    odoo = sys.modules.get('odoo')
+    if odoo is None:
+        odoo = types.ModuleType('odoo')
+        sys.modules['odoo'] = odoo
+
+    models_ns = getattr(odoo, 'models', types.SimpleNamespace())
+    for attr in ('Model', 'AbstractModel', 'TransientModel'):
+        if not hasattr(models_ns, attr):
+            setattr(models_ns, attr, object)
+    odoo.models = models_ns
+
+    class _Field:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    fields_ns = getattr(odoo, 'fields', types.SimpleNamespace())
+    for attr in ('Binary', 'Char', 'Integer', 'Float', 'Text', 'Boolean',
+                 'Many2one', 'One2many', 'Date', 'Datetime', 'Selection'):
+        if not hasattr(fields_ns, attr):
+            setattr(fields_ns, attr, _Field)
+    odoo.fields = fields_ns
+
+    if not hasattr(odoo, 'api'):
+        odoo.api = types.SimpleNamespace()
+    odoo._ = lambda value: value
+
+    tools_module = sys.modules.get('odoo.tools')
+    if tools_module is None:
+        tools_module = types.ModuleType('odoo.tools')
+        sys.modules['odoo.tools'] = tools_module
+    if not hasattr(tools_module, 'ustr'):
+        tools_module.ustr = lambda value: str(value)
+    if not hasattr(tools_module, 'html_escape'):
+        tools_module.html_escape = lambda value: value
+    odoo.tools = tools_module
+
+    exceptions_mod = sys.modules.get('odoo.exceptions')
+    if exceptions_mod is None:
+        exceptions_mod = types.SimpleNamespace(UserError=Exception)
+        sys.modules['odoo.exceptions'] = exceptions_mod
+    if not hasattr(exceptions_mod, 'UserError'):
+        exceptions_mod.UserError = Exception
+    odoo.exceptions = exceptions_mod
+
+_ensure_odoo_stub()
+
+module_path = repo_root / 'planetio' / 'models' / 'eudr_deforestation.py'
+# Light parent packages so that the model's relative imports resolve
+# without importing the Odoo addon itself.
+for _name, _path in (('planetio_light', 'planetio'), ('planetio_light.services', 'planetio/services')):
+    _package = types.ModuleType(_name)
+    _package.__path__ = [str(repo_root / _path)]
+    sys.modules.setdefault(_name, _package)
+
+spec = importlib.util.spec_from_file_location('planetio_light.models.eudr_deforestation', module_path)
+mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mod)
+
+Line = mod.EUDRDeclarationLineDeforestation
+
+
+NOW = datetime(2026, 10, 17, 12, 0, 0)
+
+
+class FakeICP:
+    def __init__(self, params):
+        self.params = params
+
+    def sudo(self):
+        return self
+
+    def get_param(self, key, default=None):
+        return self.params.get(key, default)
+
+
+class FakeGFW:
+    def _compute_date_from(self):
+        return (date.today() - timedelta(days=365)).isoformat()
+
+
+class FakeEnv(dict):
+    context = {}
+
+
+class FakeLine:
+    def __init__(self, line_id, hash_now, **vals):
+        self.id = line_id
+        self._hash_now = hash_now
+        self.defor_provider = vals.get('provider', 'gfw')
+        self.defor_analyzed_at = vals.get('analyzed_at', NOW - timedelta(days=1))
+        self.defor_geometry_hash = vals.get('hash', 'h%s' % line_id)
+        default_from = self.defor_analyzed_at.date() - timedelta(days=365) if self.defor_analyzed_at else None
+        self.defor_date_from = vals.get('date_from', default_from)
+
+    def _deforestation_geometry_hash(self):
+        return self._hash_now
+
+
+class FakeLines(list):
+    def __init__(self, items, env):
+        super().__init__(items)
+        self.env = env
+
+    def filtered(self, func):
+        return [line for line in self if func(line)]
+
+
+def _filter(lines, params):
+    env = FakeEnv({'ir.config_parameter': FakeICP(params), 'deforestation.provider.gfw': FakeGFW()})
+    return Line._filter_deforestation_stale(FakeLines(lines, env))
+
+
+def test_incremental_filter_keeps_only_changed_lines(monkeypatch):
+    monkeypatch.setattr(mod, 'fields', types.SimpleNamespace(
+        Datetime=types.SimpleNamespace(now=lambda: NOW),
+        Date=types.SimpleNamespace(from_string=lambda value: date.fromisoformat(value)),
+    ))
+    lines = [
+        FakeLine(1, 'h1'),
+        FakeLine(2, 'edited'),
+        FakeLine(3, 'h3', analyzed_at=None),
+        FakeLine(4, 'h4', analyzed_at=NOW - timedelta(days=45)),
+        FakeLine(5, 'h5', provider='plant4'),
+        FakeLine(6, 'h6', date_from=(NOW - timedelta(days=90)).date()),
+    ]
+
+    stale = _filter(lines, {'planetio.deforestation_freshness_days': '30'})
+    assert [line.id for line in stale] == [2, 3, 4, 5, 6]
+
+    stale = _filter(lines, {'planetio.deforestation_freshness_days': '0'})
+    assert 4 not in [line.id for line in stale]
+
+
+def _days_ago(days):
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+def test_delta_merge_keeps_old_days_and_counts_overlap_once():
+    previous = {
+        'message': 'old',
+        'metrics': {'alert_count': 6, 'area_ha_total': 0.6},
+        'alerts': [
+            {'date': _days_ago(400), 'alert_id': 'out-of-window'},
+            {'date': _days_ago(100), 'alert_id': 'a'},
+            {'date': _days_ago(5), 'alert_id': 'b'},
+        ],
+        'meta': {'provider': 'gfw', 'date_from': _days_ago(730), 'result_id': 7},
+        'details': {'time_series': [
+            {'date': _days_ago(400), 'alert_count': 1, 'area_ha': 0.1},
+            {'date': _days_ago(100), 'alert_count': 3, 'area_ha': 0.3},
+            {'date': _days_ago(5), 'alert_count': 2, 'area_ha': 0.2},
+        ]},
+    }
+    delta = {
+        'metrics': {'alert_count': 3},
+        'alerts': [{'date': _days_ago(5), 'alert_id': 'b'}, {'date': _days_ago(1), 'alert_id': 'c'}],
+        'meta': {'provider': 'gfw', 'queries': {'aggregate': {'date_from': _days_ago(7)}}},
+        'details': {'time_series': [
+            {'date': _days_ago(5), 'alert_count': 2, 'area_ha': 0.2},
+            {'date': _days_ago(1), 'alert_count': 1, 'area_ha': 0.05},
+        ]},
+    }
+
+    merged = mod.merge_deforestation_delta(previous, delta, _days_ago(7), _days_ago(365))
+
+    assert merged['metrics']['alert_count'] == 6
+    assert abs(merged['metrics']['area_ha_total'] - 0.55) < 1e-9
+    assert merged['metrics']['first_alert_date'] == _days_ago(100)
+    assert merged['metrics']['last_alert_date'] == _days_ago(1)
+    assert merged['metrics']['alert_count_30d'] == 3
+    assert [a['alert_id'] for a in merged['alerts']] == ['a', 'b', 'c']
+    assert merged['meta']['date_from'] == _days_ago(365)
+    assert merged['meta']['rescan']['date_from'] == _days_ago(7)
+    assert 'result_id' not in merged['meta']
+    assert mod.deforestation_series_rows(merged) == [
+        (_days_ago(100), 'n/a', 3, 0.3), (_days_ago(5), 'n/a', 2, 0.2), (_days_ago(1), 'n/a', 1, 0.05),
+    ]
+
+
+def test_rescan_window_only_for_unchanged_windowed_results():
+    window_from = date.today() - timedelta(days=365)
+
+    yesterday = datetime.now() - timedelta(days=1)
+
+    def _line(line_id, hash_now='h', **vals):
+        vals.setdefault('analyzed_at', yesterday)
+        line = FakeLine(line_id, hash_now, hash='h', **vals)
+        line.external_status = vals.get('status', 'ok')
+        line.external_properties_json = None
+        line.ensure_one = lambda: None
+        return line
+
+    def _from(line, provider='gfw'):
+        return Line._deforestation_rescan_from(line, provider, 7, window_from)
+
+    fresh = _line(1)
+    assert _from(fresh) == yesterday.date() - timedelta(days=7)
+    assert _from(fresh, provider='plant4') is None
+    assert _from(_line(2, hash_now='edited')) is None
+    assert _from(_line(3, status='error')) is None
+    assert _from(_line(4, analyzed_at=None)) is None
+    assert _from(_line(5, analyzed_at=yesterday - timedelta(days=400))) is None
+
+
+
+def test_week_buckets_align_the_delta_window_and_are_counted_once():
+    analyzed_at = datetime(2025, 6, 12, 9, 0)  # a Thursday
+    line = FakeLine(1, 'h', hash='h', analyzed_at=analyzed_at)
+    line.external_status = 'ok'
+    line.external_properties_json = None
+    line.ensure_one = lambda: None
+
+    delta_from = Line._deforestation_rescan_from(line, 'gfw', 7, date(2024, 6, 1), 'week')
+    assert delta_from == date(2025, 6, 2)
+    assert Line._deforestation_rescan_from(line, 'gfw', 7, date(2024, 6, 1)) == date(2025, 6, 5)
+    assert mod.series_bucket_start(date(2025, 6, 5), 'month') == date(2025, 6, 1)
+
+    # the 2025-06-02 week straddled the unaligned 2025-06-05 start
+    previous = {
+        'metrics': {'alert_count': 9, 'area_ha_total': 0.9},
+        'meta': {'provider': 'gfw'},
+        'details': {'time_series': [
+            {'date': '2025-05-26', 'alert_count': 4, 'area_ha': 0.4},
+            {'date': '2025-06-02', 'alert_count': 5, 'area_ha': 0.5},
+        ]},
+    }
+    delta = {
+        'metrics': {'alert_count': 7, 'area_ha_total': 0.7},
+        'meta': {'provider': 'gfw'},
+        'details': {'time_series': [
+            {'date': '2025-06-02', 'alert_count': 6, 'area_ha': 0.6},
+            {'date': '2025-06-09', 'alert_count': 1, 'area_ha': 0.1},
+        ]},
+    }
+
+    merged = mod.merge_deforestation_delta(previous, delta, delta_from, '2024-06-01')
+
+    assert merged['metrics']['alert_count'] == 4 + 7
+    assert abs(merged['metrics']['area_ha_total'] - 1.1) < 1e-9
+    assert mod.deforestation_series_rows(merged) == [
+        ('2025-05-26', 'n/a', 4, 0.4), ('2025-06-02', 'n/a', 6, 0.6), ('2025-06-09', 'n/a', 1, 0.1),
+    ]
+
+def test_large_run_posts_bounded_summary_with_csv(monkeypatch):
+    import base64
+    import csv
+    import io
+
+    monkeypatch.setattr(mod, 'fields', types.SimpleNamespace(
+        Datetime=types.SimpleNamespace(now=lambda: NOW),
+    ))
+
+    class SummaryLine:
+        _name = 'eudr.declaration.line'
+
+        def __init__(self, line_id, alerts, area):
+            self.id = line_id
+            self.display_name = 'Line %s' % line_id
+            self.defor_alerts = alerts
+            self.defor_area_ha = area
+            self.defor_provider = 'gfw'
+            self.defor_analyzed_at = NOW
+
+    class Declaration:
+        _name = 'eudr.declaration'
+        id = 9
+
+        def __init__(self, lines):
+            self.line_ids = lines
+            self.posts = []
+
+        def message_post(self, **kwargs):
+            self.posts.append(kwargs)
+
+    class Attachments:
+        def __init__(self):
+            self.created = []
+
+        def create(self, vals):
+            self.created.append(vals)
+            return types.SimpleNamespace(id=len(self.created), ids=[len(self.created)])
+
+    lines = [SummaryLine(i, alerts=i % 4, area=float(i)) for i in range(1, 8)]
+    items = [
+        {'line': line, 'status': 'fail' if line.defor_alerts else 'ok',
+         'msg': 'msg %s' % line.id, 'alert_count': line.defor_alerts}
+        for line in lines
+    ]
+    decl = Declaration(lines)
+    attachments = Attachments()
+    env = FakeEnv({
+        'ir.config_parameter': FakeICP({'planetio.deforestation_summary_lines': '2'}),
+        'eudr.declaration': types.SimpleNamespace(browse=lambda _id: decl),
+        'ir.attachment': attachments,
+    })
+    grouped = {9: {'items': items, 'alerts': 5, 'errors': 0, 'skipped': 0, 'running': 0}}
+
+    Line._post_deforestation_summary(types.SimpleNamespace(
+        env=env,
+        _deforestation_summary_size=lambda: Line._deforestation_summary_size(types.SimpleNamespace(env=env)),
+        _deforestation_item_html=lambda item: Line._deforestation_item_html(None, item),
+        _deforestation_report_csv=lambda rows: Line._deforestation_report_csv(None, rows),
+    ), grouped)
+
+    [post] = decl.posts
+    assert post['attachment_ids'] == [1]
+    assert post['body'].count('<li>') == 2
+    assert 'Line 7' in post['body'] and 'Line 3' in post['body']
+    assert 'ALERT: 6, OK: 1' in post['body']
+
+    [vals] = attachments.created
+    assert vals['res_model'] == 'eudr.declaration' and vals['res_id'] == 9
+    assert vals['name'] == 'Deforestation_Analysis_9_20261017_120000.csv'
+    rows = list(csv.reader(io.StringIO(base64.b64decode(vals['datas']).decode('utf-8-sig'))))
+    assert rows[0][:4] == ['line_id', 'line', 'status', 'alerts']
+    assert len(rows) == 8
+    assert rows[7][:4] == ['7', 'Line 7', 'ALERT', '3']
+
+
+def test_result_keys_do_not_change_when_the_window_slides(monkeypatch):
+    monkeypatch.setattr(mod, 'fields', types.SimpleNamespace(
+        Datetime=types.SimpleNamespace(now=lambda: NOW),
+        Date=types.SimpleNamespace(from_string=lambda value: date.fromisoformat(value)),
+    ))
+
+    class KeyResults:
+        def make_key(self, *parts):
+            return parts
+
+    class DayGFW:
+        def __init__(self, today):
+            self.today = today
+
+        def _compute_date_from(self):
+            return (self.today - timedelta(days=365)).isoformat()
+
+    line = FakeLine(1, 'h1')
+    line.external_properties_json = None
+    line.declaration_id = types.SimpleNamespace(_fields={})
+
+    keys = []
+    for shift in (0, 1):
+        today = date.today() + timedelta(days=shift)
+        monkeypatch.setattr(mod, 'date', types.SimpleNamespace(today=lambda today=today: today))
+        env = FakeEnv({
+            'ir.config_parameter': FakeICP({}),
+            'deforestation.provider.gfw': DayGFW(today),
+            'deforestation.analysis.result': KeyResults(),
+        })
+        key, info = Line._deforestation_result_keys(FakeLines([line], env))[1]
+        keys.append(key)
+        assert info['date_from'] == (today - timedelta(days=365)).isoformat()
+
+    assert keys[0] == keys[1] == ('h1', 'gfw', 365, None)
+
+
+def test_delta_merge_adds_to_totals_beyond_the_stored_series():
+    # the stored series is capped: the totals cover more days than it lists
+    previous = {
+        'metrics': {'alert_count': 900, 'area_ha_total': 90.0, 'first_alert_date': _days_ago(360)},
+        'meta': {'provider': 'gfw'},
+        'details': {'time_series': [
+            {'date': _days_ago(370), 'alert_count': 4, 'area_ha': 0.4},
+            {'date': _days_ago(20), 'alert_count': 10, 'area_ha': 1.0},
+            {'date': _days_ago(3), 'alert_count': 5, 'area_ha': 0.5},
+        ]},
+    }
+    delta = {
+        'metrics': {'alert_count': 8, 'area_ha_total': 0.8},
+        'meta': {'provider': 'gfw'},
+        'details': {'time_series': [
+            {'date': _days_ago(3), 'alert_count': 6, 'area_ha': 0.6},
+            {'date': _days_ago(1), 'alert_count': 2, 'area_ha': 0.2},
+        ]},
+    }
+
+    merged = mod.merge_deforestation_delta(previous, delta, _days_ago(7), _days_ago(365))
+
+    assert merged['metrics']['alert_count'] == 900 - 4 - 5 + 8
+    assert abs(merged['metrics']['area_ha_total'] - (90.0 - 0.4 - 0.5 + 0.8)) < 1e-9
+    assert merged['metrics']['first_alert_date'] == _days_ago(360)
+    assert merged['metrics']['last_alert_date'] == _days_ago(1)
+    assert merged['metrics']['alert_count_30d'] == 18
@@ -0,0 +1,199 @@
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+
+
+def _ensure_odoo_stub():
+    odoo = sys.modules.get('odoo')
+    if odoo is None:
+        odoo = types.ModuleType('odoo')
+        sys.modules['odoo'] = odoo
+
+    models_ns = getattr(odoo, 'models', types.SimpleNamespace())
+    for attr in ('Model', 'AbstractModel', 'TransientModel'):
+        if not hasattr(models_ns, attr):
+            setattr(models_ns, attr, object)
+    odoo.models = models_ns
+
+    class _Field:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    fields_ns = getattr(odoo, 'fields', types.SimpleNamespace())
+    for attr in ('Char', 'Integer', 'Float', 'Text', 'Many2one', 'Many2many', 'Datetime', 'Selection'):
+        if not hasattr(fields_ns, attr):
+            setattr(fields_ns, attr, _Field)
+    odoo.fields = fields_ns
+
+    api_ns = getattr(odoo, 'api', types.SimpleNamespace())
+    for attr in ('model', 'depends'):
+        if not hasattr(api_ns, attr):
+            setattr(api_ns, attr, (lambda func: func) if attr == 'model' else (lambda *a: (lambda func: func)))
+    odoo.api = api_ns
+    odoo._ = lambda value: value
+
+    tools_module = sys.modules.get('odoo.tools')
+    if tools_module is None:
+        tools_module = types.ModuleType('odoo.tools')
+        sys.modules['odoo.tools'] = tools_module
+    if not hasattr(tools_module, 'ustr'):
+        tools_module.ustr = lambda value: str(value)
+    odoo.tools = tools_module
+
+
+_ensure_odoo_stub()
+
+module_path = repo_root / 'planetio' / 'models' / 'eudr_deforestation_job.py'
+spec = importlib.util.spec_from_file_location('eudr_deforestation_job', module_path)
+mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mod)
+
+
+class FakeLine:
+    def __init__(self, line_id):
+        self.id = line_id
+
+
+class FakeLines(list):
+    @property
+    def ids(self):
+        return [line.id for line in self]
+
+    def _run_deforestation_analysis(self):
+        if FakeJob.fail_on in self.ids:
+            FakeJob.fail_on = None
+            raise RuntimeError('worker killed')
+        done = [line for line in self if line.id not in FakeJob.busy]
+        return {7: {
+            'items': [{'line': line, 'status': 'ok', 'msg': 'ok %s' % line.id} for line in done],
+            'alerts': 0, 'errors': 0, 'skipped': 0, 'running': len(self) - len(done),
+        }}
+
+
+class FakeCr:
+    # session advisory locks held by any cursor
+    locks = set()
+
+    def __init__(self, job):
+        self.job = job
+        self.committed = None
+        self._row = None
+
+    def execute(self, query, params):
+        if 'pg_try_advisory_lock' in query:
+            self._row = (params not in FakeCr.locks,)
+            FakeCr.locks.add(params)
+        elif 'pg_advisory_unlock' in query:
+            FakeCr.locks.discard(params)
+
+    def fetchone(self):
+        return self._row
+
+    def commit(self):
+        self.committed = dict(self.job.__dict__)
+
+    def rollback(self):
+        saved = {k: v for k, v in self.committed.items() if k not in ('env', 'attempts', 'state', 'last_error')}
+        self.job.__dict__.update(saved)
+
+
+class FakeJob(mod.EUDRDeforestationJob):
+    fail_on = None
+    busy = ()
+
+    def __init__(self, line_ids, chunk_size=2):
+        self.id = 1
+        self.all_lines = [FakeLine(i) for i in line_ids]
+        self.declaration_id = types.SimpleNamespace(id=7, display_name='DDS')
+        self.chunk_size = chunk_size
+        self.last_line_id = 0
+        self.processed_count = self.skipped_count = self.alert_count = self.error_count = 0
+        self.analyzed_line_ids = []
+        self.attempts = 0
+        self.state = 'queued'
+        self.started_at = None
+        self.progress = 0.0
+        self.finished = []
+        self.env = types.SimpleNamespace(
+            registry=types.SimpleNamespace(in_test_mode=lambda: False),
+            cr=FakeCr(self),
+        )
+
+    def ensure_one(self):
+        return self
+
+    def write(self, vals):
+        vals = dict(vals)
+        commands = vals.pop('analyzed_line_ids', [])
+        self.__dict__.update(vals)
+        self.analyzed_line_ids = self.analyzed_line_ids + [line_id for _cmd, line_id in commands]
+
+    def invalidate_cache(self, *args):
+        pass
+
+    def web_progress_percent(self, *args, **kwargs):
+        pass
+
+    def _next_chunk(self):
+        pending = [line for line in self.all_lines if line.id > self.last_line_id]
+        return FakeLines(pending[:self.chunk_size])
+
+    def _finish(self):
+        self.finished.append((self.last_line_id, self.processed_count))
+        self.state = 'done'
+
+
+def test_job_resumes_from_checkpoint_after_failure():
+    job = FakeJob([11, 12, 13, 14, 15])
+    FakeJob.fail_on = 13
+
+    assert job._run() is False
+    assert job.state == 'running'
+    assert job.last_line_id == 12
+    assert job.attempts == 1
+    assert not job.finished
+
+    assert job._run() is True
+    assert job.state == 'done'
+    assert job.processed_count == 5
+    assert job.finished == [(15, 5)]
+    assert not FakeCr.locks
+
+
+def test_job_fails_after_max_attempts():
+    job = FakeJob([1, 2])
+    for _attempt in range(mod.MAX_ATTEMPTS):
+        FakeJob.fail_on = 1
+        job._run()
+    assert job.state == 'failed'
+    assert 'worker killed' in job.last_error
+
+
+def test_job_already_running_elsewhere_is_left_alone():
+    job = FakeJob([1, 2])
+    FakeCr.locks.add((mod.JOB_LOCK_NAMESPACE, job.id))
+    try:
+        assert job._run() is False
+        assert job.state == 'queued'
+        assert job.last_line_id == 0
+    finally:
+        FakeCr.locks.clear()
+
+    assert job._run() is True
+    assert job.state == 'done'
+
+
+def test_job_records_only_the_lines_it_analyzed():
+    job = FakeJob([1, 2, 3, 4])
+    FakeJob.busy = (2,)
+    try:
+        assert job._run() is True
+    finally:
+        FakeJob.busy = ()
+    assert job.analyzed_line_ids == [1, 3, 4]
+    assert job.processed_count == 3
+    assert job.skipped_count == 1
@@ -17,8 +17,14 @@ def _load_provider_module(genai_stub):
     sys.modules["google"] = google_module
     sys.modules["google.generativeai"] = genai_stub
 
-    module_path = repo_root / "ai_gateway" / "services" / "provider_gemini.py"
-    spec = importlib.util.spec_from_file_location("provider_gemini_test", module_path)
+    # light parent package so that the relative imports resolve without Odoo
+    services_dir = repo_root / "ai_gateway" / "services"
+    package = types.ModuleType("ai_gateway_services_test")
+    package.__path__ = [str(services_dir)]
+    sys.modules.setdefault("ai_gateway_services_test", package)
+
+    module_path = services_dir / "provider_gemini.py"
+    spec = importlib.util.spec_from_file_location("ai_gateway_services_test.provider_gemini", module_path)
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
     return module
@@ -159,7 +165,7 @@ def test_rest_generate_retries_with_versioned_model():
 
     genai_stub = types.SimpleNamespace(configure=lambda api_key=None: None)
     module = _load_provider_module(genai_stub)
-    module.requests.post = fake_post
+    module.get_session = lambda url: types.SimpleNamespace(post=fake_post)
 
     try:
         env = {
@@ -221,7 +227,7 @@ def test_rest_generate_falls_back_from_prefixed_model():
 
     genai_stub = types.SimpleNamespace(configure=lambda api_key=None: None)
     module = _load_provider_module(genai_stub)
-    module.requests.post = fake_post
+    module.get_session = lambda url: types.SimpleNamespace(post=fake_post)
 
     try:
         env = {
@@ -242,3 +248,54 @@ def test_rest_generate_falls_back_from_prefixed_model():
         assert provider.model_name == "gemini-1.5-flash"
     finally:
         _cleanup_google_modules()
+
+
+def test_sdk_calls_go_through_the_shared_rate_limiter():
+    calls = []
+
+    class FakeLimiter:
+        def sudo(self):
+            return self
+
+        def acquire(self, url):
+            calls.append(("acquire", url))
+            return 0.0
+
+        def penalize(self, url, retry_after=None):
+            calls.append(("penalize", url))
+
+    class DummyGenerativeModel:
+        def __init__(self, name):
+            self.failures = 1
+
+        def generate_content(self, parts):
+            calls.append(("generate",))
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("429 Resource has been exhausted")
+            return types.SimpleNamespace(text="ok", to_dict=lambda: {})
+
+    genai_stub = types.SimpleNamespace(
+        configure=lambda api_key=None: None,
+        GenerativeModel=DummyGenerativeModel,
+    )
+    module = _load_provider_module(genai_stub)
+    module.time = types.SimpleNamespace(sleep=lambda seconds: None)
+
+    try:
+        env = {
+            "ir.config_parameter": FakeConfigParameter({"ai_gateway.gemini_api_key": "KEY"}),
+            "planetio.rate.limiter": FakeLimiter(),
+        }
+
+        provider = module.GeminiProvider(env)
+        result = provider.generate("prompt")
+
+        base = module.GeminiProvider.REST_BASE
+        assert result["text"] == "ok"
+        assert calls == [
+            ("acquire", base), ("generate",), ("penalize", base),
+            ("acquire", base), ("generate",),
+        ]
+    finally:
+        _cleanup_google_modules()
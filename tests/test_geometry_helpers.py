@@ -0,0 +1,119 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(repo_root))
+
+module_path = repo_root / "planetio" / "utils" / "geo.py"
+spec = importlib.util.spec_from_file_location("planetio.utils.geo", module_path)
+geo_mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(geo_mod)
+
+
+SQUARE = {
+    "type": "Polygon",
+    "coordinates": [[[10.0, 45.0], [10.001, 45.0], [10.001, 45.001], [10.0, 45.001], [10.0, 45.0]]],
+}
+
+
+def test_fingerprint_ignores_ring_start_and_float_noise():
+    rotated = {
+        "type": "Polygon",
+        "coordinates": [[[10.001, 45.001], [10.0, 45.001], [10.0, 45.0], [10.001, 45.0], [10.001, 45.001]]],
+    }
+    noisy = json.loads(json.dumps(SQUARE))
+    noisy["coordinates"][0][1][0] += 1e-10
+
+    base = geo_mod.geometry_fingerprint(SQUARE)
+    assert base == geo_mod.geometry_fingerprint(rotated)
+    assert base == geo_mod.geometry_fingerprint(json.dumps(noisy))
+    assert base == geo_mod.geometry_fingerprint({"type": "Feature", "geometry": SQUARE})
+
+
+def test_fingerprint_distinguishes_geometries():
+    moved = json.loads(json.dumps(SQUARE))
+    moved["coordinates"][0][2][1] += 0.001
+
+    assert geo_mod.geometry_fingerprint(SQUARE) != geo_mod.geometry_fingerprint(moved)
+    assert geo_mod.geometry_fingerprint(None) is None
+    assert geo_mod.geometry_fingerprint("not json") is None
+
+
+def test_point_in_geometry_respects_holes_and_multipolygons():
+    donut = {
+        "type": "Polygon",
+        "coordinates": [
+            [[0.0, 0.0], [4.0, 0.0], [4.0, 4.0], [0.0, 4.0], [0.0, 0.0]],
+            [[1.0, 1.0], [3.0, 1.0], [3.0, 3.0], [1.0, 3.0], [1.0, 1.0]],
+        ],
+    }
+    multi = {"type": "MultiPolygon", "coordinates": [donut["coordinates"], SQUARE["coordinates"]]}
+
+    assert geo_mod.point_in_geometry(0.5, 0.5, donut)
+    assert not geo_mod.point_in_geometry(2.0, 2.0, donut)
+    assert not geo_mod.point_in_geometry(5.0, 5.0, donut)
+    assert geo_mod.point_in_geometry(10.0005, 45.0005, multi)
+    assert geo_mod.geometry_bbox(multi) == (0.0, 0.0, 10.001, 45.001)
+
+
+def _walked_square(points_per_side=200, noise_deg=0.000002):
+    """A ~1 ha square digitised by a GPS walker: many points with sub-metre jitter."""
+    ring = []
+    corners = [(10.0, 45.0), (10.0013, 45.0), (10.0013, 45.0009), (10.0, 45.0009)]
+    for idx, (x0, y0) in enumerate(corners):
+        x1, y1 = corners[(idx + 1) % len(corners)]
+        for step in range(points_per_side):
+            t = step / points_per_side
+            jitter = noise_deg if step % 2 else -noise_deg
+            ring.append([x0 + (x1 - x0) * t + jitter, y0 + (y1 - y0) * t - jitter])
+    ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def test_simplify_geometry_thins_walked_polygon_and_reports_area_error():
+    walked = _walked_square()
+    simplified, info = geo_mod.simplify_geometry(walked, 2.0, min_vertices=100)
+
+    assert simplified["type"] == "Polygon"
+    assert info["vertices_before"] == geo_mod.count_vertices(walked) == 801
+    assert info["vertices_after"] < 20
+    assert info["area_error_pct"] < 1.0
+    assert abs(info["area_after_ha"] - info["area_before_ha"]) < 0.01
+    json.dumps(simplified)
+
+
+def test_simplify_geometry_leaves_small_or_disabled_geometries_alone():
+    walked = _walked_square()
+
+    assert geo_mod.simplify_geometry(SQUARE, 2.0) == (SQUARE, None)
+    assert geo_mod.simplify_geometry(walked, 2.0, min_vertices=1000) == (walked, None)
+    assert geo_mod.simplify_geometry(walked, 0.0) == (walked, None)
+    point = {"type": "Point", "coordinates": [10.0, 45.0]}
+    assert geo_mod.simplify_for_submission(None, point) == (point, None)
+
+
+def _shifted(dx, dy=0.0):
+    return {
+        "type": "Polygon",
+        "coordinates": [[[x + dx, y + dy] for x, y in SQUARE["coordinates"][0]]],
+    }
+
+
+def test_union_geometries_never_returns_overlapping_parts(monkeypatch):
+    overlapping = [SQUARE, _shifted(0.0005), _shifted(0.01)]
+
+    dissolved = geo_mod.union_geometries(overlapping)
+    assert dissolved["type"] == "MultiPolygon"
+    assert len(dissolved["coordinates"]) == 2
+
+    monkeypatch.setattr(geo_mod, "shape", None)
+    envelopes = geo_mod.union_geometries(overlapping)
+    assert envelopes["type"] == "MultiPolygon"
+    assert len(envelopes["coordinates"]) == 2
+    for lon, lat in ((10.0002, 45.0005), (10.0013, 45.0005), (10.0105, 45.0005)):
+        assert geo_mod.point_in_geometry(lon, lat, envelopes)
+    assert geo_mod.union_geometries([SQUARE])["type"] == "Polygon"
+    assert geo_mod.union_geometries([]) is None
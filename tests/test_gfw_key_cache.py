@@ -0,0 +1,254 @@
+import json
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+
+if 'odoo' not in sys.modules:
+    odoo = types.ModuleType('odoo')
+    sys.modules['odoo'] = odoo
+else:
+    odoo = sys.modules['odoo']
+
+models_ns = getattr(odoo, 'models', types.SimpleNamespace())
+for attr in ('Model', 'AbstractModel', 'TransientModel'):
+    if not hasattr(models_ns, attr):
+        setattr(models_ns, attr, object)
+odoo.models = models_ns
+
+api_ns = getattr(odoo, 'api', types.SimpleNamespace())
+if not hasattr(api_ns, 'onchange'):
+    api_ns.onchange = lambda *args, **kwargs: (lambda func: func)
+if not hasattr(api_ns, 'model'):  # used as decorator elsewhere
+    api_ns.model = lambda func: func
+odoo.api = api_ns
+
+if not hasattr(odoo, '_'):
+    odoo._ = lambda value: value
+
+fields_ns = getattr(odoo, 'fields', types.SimpleNamespace())
+
+class _Field:
+    def __init__(self, *args, **kwargs):
+        pass
+
+for attr in (
+    'Binary',
+    'Char',
+    'Integer',
+    'Float',
+    'Text',
+    'Boolean',
+    'Many2one',
+    'One2many',
+    'Many2many',
+    'Date',
+    'Datetime',
+    'Selection',
+):
+    setattr(fields_ns, attr, _Field)
+odoo.fields = fields_ns
+
+tools_module = sys.modules.get('odoo.tools')
+if tools_module is None:
+    tools_module = types.ModuleType('odoo.tools')
+    sys.modules['odoo.tools'] = tools_module
+if not hasattr(tools_module, 'ustr'):
+    tools_module.ustr = lambda value: str(value)
+misc_module = sys.modules.get('odoo.tools.misc')
+if misc_module is None:
+    misc_module = types.ModuleType('odoo.tools.misc')
+    sys.modules['odoo.tools.misc'] = misc_module
+if not hasattr(misc_module, 'formatLang'):
+    misc_module.formatLang = lambda env, value, digits=None: value
+tools_module.misc = misc_module
+odoo.tools = tools_module
+
+exceptions_mod = sys.modules.get('odoo.exceptions')
+if exceptions_mod is None:
+    exceptions_mod = types.SimpleNamespace(UserError=Exception)
+    sys.modules['odoo.exceptions'] = exceptions_mod
+if not hasattr(exceptions_mod, 'UserError'):
+    exceptions_mod.UserError = Exception
+odoo.exceptions = exceptions_mod
+
+modules_pkg = sys.modules.get('odoo.modules')
+if modules_pkg is None:
+    modules_pkg = types.ModuleType('odoo.modules')
+    sys.modules['odoo.modules'] = modules_pkg
+module_subpkg = getattr(modules_pkg, 'module', None)
+if module_subpkg is None:
+    module_subpkg = types.ModuleType('odoo.modules.module')
+    modules_pkg.module = module_subpkg
+    sys.modules['odoo.modules.module'] = module_subpkg
+if not hasattr(module_subpkg, 'get_module_resource'):
+    module_subpkg.get_module_resource = lambda *args, **kwargs: ''
+
+
+from planetio.services.api import gfw_key_provider
+
+
+class FakeICP:
+    def __init__(self, values):
+        self.values = values
+
+    def sudo(self):
+        return self
+
+    def get_param(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set_param(self, key, value):
+        self.values[key] = value
+
+
+class FakeCursor:
+    """Cursor over the shared parameters; advisory locks are a thread lock."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.dbname = 'test-db'
+        self.row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if 'pg_advisory_lock' in query:
+            self.registry.lock.acquire()
+        elif 'pg_advisory_unlock' in query:
+            self.registry.lock.release()
+        elif 'ir_config_parameter' in query:
+            self.row = (self.registry.values.get(params[0]),)
+
+    def fetchone(self):
+        return self.row
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakeRegistry:
+    def __init__(self, values):
+        self.values = values
+        self.lock = threading.Lock()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeEnv(dict):
+    def __init__(self, values, registry=None):
+        super().__init__({'ir.config_parameter': FakeICP(values)})
+        self.registry = registry or FakeRegistry(values)
+        self.cr = types.SimpleNamespace(dbname='test-db')
+        self.uid = 1
+        self.context = {}
+
+
+def _patch_environment(monkeypatch):
+    monkeypatch.setattr(gfw_key_provider, 'api', types.SimpleNamespace(
+        Environment=lambda cr, uid, context: FakeEnv(cr.registry.values, cr.registry)))
+
+
+def _patch_probe(monkeypatch, answers):
+    calls = []
+
+    def check_api_key(api_key):
+        calls.append(api_key)
+        return answers.get(api_key)
+
+    monkeypatch.setattr(gfw_key_provider, 'check_api_key', check_api_key)
+    return calls
+
+
+def test_validated_key_is_not_probed_again(monkeypatch):
+    gfw_key_provider._validated.clear()
+    calls = _patch_probe(monkeypatch, {'key-1': True})
+    env = FakeEnv({'planetio.gfw_api_key': 'key-1'})
+
+    assert gfw_key_provider.get_valid_gfw_api_key(env) == 'key-1'
+    assert gfw_key_provider.get_valid_gfw_api_key(env) == 'key-1'
+    assert calls == ['key-1']
+
+    # A 401 from a real query drops the cached validation.
+    gfw_key_provider.note_gfw_api_key_response(env, 'key-1', 401)
+    assert gfw_key_provider.get_valid_gfw_api_key(env) == 'key-1'
+    assert calls == ['key-1', 'key-1']
+
+
+def test_inconclusive_probe_keeps_the_key(monkeypatch):
+    gfw_key_provider._validated.clear()
+    calls = _patch_probe(monkeypatch, {'key-1': None})
+    monkeypatch.setattr(gfw_key_provider, 'create_or_get_api_key',
+                        lambda *a, **kw: (_ for _ in ()).throw(AssertionError('no refresh expected')))
+    env = FakeEnv({'planetio.gfw_api_key': 'key-1'})
+
+    assert gfw_key_provider.get_valid_gfw_api_key(env) == 'key-1'
+    assert gfw_key_provider.get_valid_gfw_api_key(env) == 'key-1'
+    assert calls == ['key-1', 'key-1']
+
+
+def test_rejected_key_is_replaced(monkeypatch):
+    gfw_key_provider._validated.clear()
+    _patch_probe(monkeypatch, {'old-key': False})
+    _patch_environment(monkeypatch)
+    monkeypatch.setattr(gfw_key_provider, 'get_access_token', lambda email, password: 'token')
+    monkeypatch.setattr(gfw_key_provider, 'create_or_get_api_key', lambda token, **kw: 'new-key')
+    values = {
+        'planetio.gfw_api_key': 'old-key',
+        'planetio.gfw_email': 'user@example.org',
+        'planetio.gfw_password': 'secret',
+    }
+    env = FakeEnv(values)
+
+    assert gfw_key_provider.get_valid_gfw_api_key(env) == 'new-key'
+    assert values['planetio.gfw_api_key'] == 'new-key'
+    assert gfw_key_provider._is_validated(env, 'new-key')
+
+
+def test_concurrent_401s_request_a_single_new_key(monkeypatch):
+    gfw_key_provider._validated.clear()
+    _patch_environment(monkeypatch)
+    created = []
+
+    def create_or_get_api_key(token, **kw):
+        time.sleep(0.05)
+        created.append(token)
+        return 'new-key'
+
+    monkeypatch.setattr(gfw_key_provider, 'get_access_token', lambda email, password: 'token')
+    monkeypatch.setattr(gfw_key_provider, 'create_or_get_api_key', create_or_get_api_key)
+    values = {
+        'planetio.gfw_api_key': 'old-key',
+        'planetio.gfw_email': 'user@example.org',
+        'planetio.gfw_password': 'secret',
+    }
+    registry = FakeRegistry(values)
+    results = []
+
+    def worker():
+        results.append(gfw_key_provider.refresh_gfw_api_key(FakeEnv(values, registry), 'old-key'))
+
+    threads = [threading.Thread(target=worker) for _i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['new-key'] * 4
+    assert created == ['token']
+    assert not registry.lock.locked()
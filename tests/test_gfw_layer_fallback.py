@@ -1,3 +1,4 @@
+import json
 import sys
 import types
 from pathlib import Path
@@ -46,6 +47,7 @@ for attr in (
     'Many2one',
     'One2many',
     'Date',
+    'Datetime',
     'Selection',
 ):
     setattr(fields_ns, attr, _Field)
@@ -106,6 +108,8 @@ class DummyICP:
 
 
 class DummyEnv(dict):
+    context = {}
+
     def __getitem__(self, key):
         return super().__getitem__(key)
 
@@ -158,3 +162,479 @@ def test_analyze_line_uses_plural_layer_fallback():
     assert any('SUM(alerts__count)' in sql for sql in provider._sql_calls)
     assert result['metrics']['alert_count'] == 5
     assert result['metrics']['area_ha_total'] == 1.25
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeCache:
+    def __init__(self):
+        self.entries = {}
+
+    def lookup(self, url, sql, geometry, date_from):
+        return self.entries.get((url, sql, date_from))
+
+    def store(self, url, sql, geometry, date_from, response):
+        self.entries[(url, sql, date_from)] = response
+
+
+class CachingProvider(DeforestationProviderGFW):
+    def __init__(self, status_code=200):
+        self.cache = FakeCache()
+        self.http_calls = 0
+        self.status_code = status_code
+
+    def _get_query_cache(self):
+        return self.cache
+
+    def _http_post_query(self, url, headers, sql, geometry):
+        self.http_calls += 1
+        return FakeResponse(self.status_code, {'data': [{'cnt': 1}]})
+
+
+def test_post_query_serves_repeated_queries_from_cache():
+    provider = CachingProvider()
+    geom = DummyLine()._line_geometry()
+
+    first = provider._post_query('https://x/dataset/d/latest/query/json', {}, 'SELECT 1', geom, date_from='2025-01-01')
+    second = provider._post_query('https://x/dataset/d/latest/query/json', {}, 'SELECT 1', geom, date_from='2025-01-01')
+    provider._post_query('https://x/dataset/d/latest/query/json', {}, 'SELECT 1', geom, date_from='2025-02-01')
+
+    assert provider.http_calls == 2
+    assert second.json() == first.json()
+
+
+def test_post_query_does_not_cache_errors():
+    provider = CachingProvider(status_code=503)
+    geom = DummyLine()._line_geometry()
+
+    provider._post_query('https://x/dataset/d/latest/query/json', {}, 'SELECT 1', geom, date_from='2025-01-01')
+    provider._post_query('https://x/dataset/d/latest/query/json', {}, 'SELECT 1', geom, date_from='2025-01-01')
+
+    assert provider.http_calls == 2
+
+
+class SingleModeICP(DummyICP):
+    def get_param(self, key):
+        if key == 'planetio.gfw_query_mode':
+            return 'single'
+        if key == 'planetio.gfw_min_confidence':
+            return 'high'
+        return super().get_param(key)
+
+
+class SingleModeProvider(DummyProvider):
+    def __init__(self, rows):
+        super().__init__()
+        self.env = DummyEnv({'ir.config_parameter': SingleModeICP()})
+        self._rows = rows
+
+    def _gfw_execute_sql(self, headers, geometry, sql_template, date_from, allow_short=True):
+        self._sql_calls.append(sql_template)
+        return ({'data': self._rows},
+                {'endpoint': 'latest', 'date_from': date_from, 'sql': sql_template, 'status_code': 200})
+
+
+def test_single_query_mode_derives_metrics_from_grouped_rows():
+    from datetime import date, timedelta
+
+    recent = (date.today() - timedelta(days=10)).isoformat()
+    older = (date.today() - timedelta(days=60)).isoformat()
+    oldest = (date.today() - timedelta(days=200)).isoformat()
+    rows = [
+        {'alert_date': recent, 'confidence': 'high', 'alert_count': 2, 'area_ha': 0.2},
+        {'alert_date': recent, 'confidence': 'highest', 'alert_count': 1, 'area_ha': 0.1},
+        {'alert_date': older, 'confidence': 'high', 'alert_count': 4, 'area_ha': 0.4},
+        {'alert_date': oldest, 'confidence': 'high', 'alert_count': 3, 'area_ha': 0.3},
+    ]
+    provider = SingleModeProvider(rows)
+    result = provider.analyze_line(DummyLine())
+
+    assert len(provider._sql_calls) == 1
+    sql = provider._sql_calls[0]
+    assert "IN ('high', 'highest')" in sql
+    assert 'LIMIT' not in sql
+
+    metrics = result['metrics']
+    assert metrics['alert_count'] == 10
+    assert metrics['first_alert_date'] == oldest
+    assert metrics['last_alert_date'] == recent
+    assert metrics['alert_count_30d'] == 3
+    assert metrics['alert_count_90d'] == 7
+    assert result['details']['confidence_breakdown'] == {'high': 9, 'highest': 1}
+    assert result['meta']['query_mode'] == 'single'
+    assert result['alerts'][0]['confidence'] == 'highest'
+
+
+class WeeklyICP(SingleModeICP):
+    def get_param(self, key):
+        if key == 'planetio.gfw_series_bucket':
+            return 'week'
+        return super().get_param(key)
+
+
+class WeeklyProvider(SingleModeProvider):
+    def __init__(self, week_rows, day_rows, fail_days=False):
+        super().__init__(week_rows)
+        self.env = DummyEnv({'ir.config_parameter': WeeklyICP()})
+        self._day_rows = day_rows
+        self._fail_days = fail_days
+
+    def _gfw_execute_sql(self, headers, geometry, sql_template, date_from, allow_short=True):
+        if 'date_trunc' in sql_template:
+            return super()._gfw_execute_sql(headers, geometry, sql_template, date_from, allow_short)
+        self._sql_calls.append(sql_template)
+        if self._fail_days:
+            raise UserError('boom')
+        return ({'data': self._day_rows},
+                {'endpoint': 'latest', 'date_from': date_from, 'sql': sql_template, 'status_code': 200})
+
+
+def test_weekly_buckets_take_recent_figures_from_daily_rows():
+    from datetime import date, timedelta
+
+    # the week starting 33 days ago is mostly inside the 30 day window
+    week_start = (date.today() - timedelta(days=33)).isoformat()
+    week_rows = [{'alert_date': week_start, 'confidence': 'high', 'alert_count': 4, 'area_ha': 0.4,
+                  'first_alert_date': week_start, 'last_alert_date': week_start}]
+    day_rows = [
+        {'alert_date': (date.today() - timedelta(days=33)).isoformat(), 'confidence': 'high',
+         'alert_count': 1, 'area_ha': 0.1},
+        {'alert_date': (date.today() - timedelta(days=28)).isoformat(), 'confidence': 'high',
+         'alert_count': 3, 'area_ha': 0.3},
+    ]
+    provider = WeeklyProvider(week_rows, day_rows)
+    metrics = provider.analyze_line(DummyLine())['metrics']
+
+    assert len(provider._sql_calls) == 2
+    assert metrics['alert_count'] == 4
+    assert metrics['alert_count_30d'] == 3
+    assert metrics['alert_count_90d'] == 4
+
+    provider = WeeklyProvider(week_rows, day_rows, fail_days=True)
+    result = provider.analyze_line(DummyLine())
+    assert 'alert_count_30d' not in result['metrics']
+    assert result['metrics']['alert_count'] == 4
+    assert any('recent_days_error' in err for err in result['meta']['debug']['errors'])
+
+
+class FanoutICP(DummyICP):
+    def get_param(self, key):
+        if key == 'planetio.gfw_query_mode':
+            return 'fanout'
+        if key == 'planetio.gfw_fanout_datasets':
+            return 'umd_glad_landsat_alerts, wur_radd_alerts,umd_glad_sentinel2_alerts'
+        return super().get_param(key)
+
+
+class FanoutEnv(DummyEnv):
+    uid = 1
+
+
+class FanoutProvider(DummyProvider):
+    _name = 'deforestation.provider.gfw'
+
+    def __init__(self, rows_by_dataset, failing=()):
+        super().__init__()
+        self.env = FanoutEnv({'ir.config_parameter': FanoutICP()})
+        self._rows_by_dataset = rows_by_dataset
+        self._failing = failing
+        self._threads = set()
+
+    def _get_rate_limiter(self):
+        return None
+
+    def _fanout_post(self, url, headers, sql, geometry):
+        import threading
+
+        self._threads.add(threading.current_thread().name)
+        dataset_id = next(d for d in self._rows_by_dataset_ids() if d in url)
+        self._sql_calls.append((dataset_id, sql))
+        if dataset_id in self._failing:
+            return FanoutResponse(503, {'status': 'failed'})
+        return FanoutResponse(200, {'data': self._rows_by_dataset.get(dataset_id, [])})
+
+    def _rows_by_dataset_ids(self):
+        return [d.strip() for d in FanoutICP().get_param('planetio.gfw_fanout_datasets').split(',')]
+
+
+class FanoutResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self._payload
+
+
+def test_fanout_mode_merges_datasets_and_counts_shared_pixels_once():
+    shared = {'latitude': 0.5, 'longitude': 0.5, 'alert_date': '2025-06-01', 'area_ha': 0.01}
+    rows = {
+        'umd_glad_landsat_alerts': [dict(shared, confidence='nominal', area_ha=0.09),
+                                    {'latitude': 0.2, 'longitude': 0.2, 'alert_date': '2025-05-01',
+                                     'confidence': 'high', 'area_ha': 0.09}],
+        'wur_radd_alerts': [dict(shared, latitude=0.50001, confidence='high'),
+                            dict(shared, alert_date='2025-06-10', confidence='high')],
+        'umd_glad_sentinel2_alerts': [dict(shared, confidence='highest')],
+    }
+    provider = FanoutProvider(rows)
+    result = provider.analyze_line(DummyLine())
+
+    assert sorted(d for d, _sql in provider._sql_calls) == sorted(rows)
+    assert all(d in sql for d, sql in provider._sql_calls)
+    assert all(name.startswith('gfw-fanout') for name in provider._threads)
+    assert result['metrics']['alert_count'] == 3
+    assert result['meta']['query_mode'] == 'fanout'
+    assert result['meta']['fanout']['duplicates'] == 2
+    merged = [a for a in result['alerts'] if a['date'] == '2025-06-01']
+    assert len(merged) == 1
+    assert merged[0]['confidence'] == 'highest'
+    assert merged[0]['area_ha'] == 0.09
+    assert merged[0]['description'] == 'umd_glad_landsat_alerts+umd_glad_sentinel2_alerts+wur_radd_alerts'
+
+
+def test_fanout_merge_matches_pixels_across_a_cell_border():
+    provider = FanoutProvider({})
+    step = 30.0 / 111320.0
+    border = 1000 * step
+    answers = {
+        'a': ([{'alert_date': '2025-06-01', 'latitude': border - step / 10, 'longitude': 0.2}], {}),
+        'b': ([{'alert_date': '2025-06-01', 'latitude': border + step / 10, 'longitude': 0.2},
+               {'alert_date': '2025-06-01', 'latitude': border + step, 'longitude': 0.2}], {}),
+    }
+
+    rows, duplicates = provider._merge_dataset_alerts(answers, 30.0)
+
+    assert duplicates == 1
+    assert sorted(row['dataset'] for row in rows) == ['a+b', 'b']
+
+
+
+def test_fanout_merge_keeps_adjacent_pixels_of_one_dataset():
+    provider = FanoutProvider({})
+    ten_m = 10.0 / 111320.0
+    answers = {
+        'radd': ([{'alert_date': '2025-06-01', 'latitude': 0.1, 'longitude': 0.2},
+                  {'alert_date': '2025-06-01', 'latitude': 0.1 + ten_m, 'longitude': 0.2}], {}),
+        'sentinel2': ([{'alert_date': '2025-06-01', 'latitude': 0.1 + ten_m, 'longitude': 0.2}], {}),
+    }
+
+    rows, duplicates = provider._merge_dataset_alerts(answers, 30.0)
+
+    assert len(rows) == 2
+    assert duplicates == 1
+    assert sorted(row['dataset'] for row in rows) == ['radd', 'radd+sentinel2']
+
+def test_fanout_mode_survives_a_failing_dataset():
+    rows = {'umd_glad_landsat_alerts': [{'latitude': 0.5, 'longitude': 0.5, 'alert_date': '2025-06-01',
+                                         'confidence': 'high', 'area_ha': 0.01}]}
+    provider = FanoutProvider(rows, failing=('wur_radd_alerts',))
+    result = provider.analyze_line(DummyLine())
+
+    assert result['metrics']['alert_count'] == 1
+    assert result['meta']['fanout']['answered'] == ['umd_glad_landsat_alerts', 'umd_glad_sentinel2_alerts']
+    assert any('wur_radd_alerts' in err for err in result['meta']['debug']['errors'])
+
+
+def _square(lon, lat, half=0.0005):
+    return {
+        'type': 'Polygon',
+        'coordinates': [[[lon - half, lat - half], [lon + half, lat - half], [lon + half, lat + half],
+                         [lon - half, lat + half], [lon - half, lat - half]]],
+    }
+
+
+class BatchLine:
+    def __init__(self, line_id, geom):
+        self.id = line_id
+        self.display_name = 'line %s' % line_id
+        self._geom = geom
+
+    def _line_geometry(self):
+        return self._geom
+
+
+class BatchProvider(DummyProvider):
+    def _gfw_execute_sql(self, headers, geometry, sql_template, date_from, allow_short=True):
+        self._sql_calls.append((geometry, sql_template))
+        rows = [
+            {'latitude': -3.0, 'longitude': 20.0, 'alert_date': '2025-06-01', 'confidence': 'high', 'area_ha': 0.01},
+            {'latitude': -3.0, 'longitude': 20.0, 'alert_date': '2025-05-01', 'confidence': 'high', 'area_ha': 0.01},
+            {'latitude': -3.0, 'longitude': 20.02, 'alert_date': '2025-06-02', 'confidence': 'nominal', 'area_ha': 0.01},
+            {'latitude': 10.0, 'longitude': 10.0, 'alert_date': '2025-06-03', 'confidence': 'high', 'area_ha': 0.01},
+        ]
+        return ({'data': rows}, {'endpoint': 'latest', 'date_from': date_from, 'sql': sql_template, 'status_code': 200})
+
+
+def test_batch_clusters_neighbouring_plots_and_attributes_alerts():
+    provider = BatchProvider()
+    lines = [
+        BatchLine(1, _square(20.0, -3.0)),
+        BatchLine(2, _square(20.02, -3.0)),
+        BatchLine(3, _square(25.0, 5.0)),
+        BatchLine(4, None),
+    ]
+    results = provider.analyze_lines_batch(lines)
+
+    assert len(provider._sql_calls) == 2
+    geometries = sorted(call[0]['type'] for call in provider._sql_calls)
+    assert geometries == ['MultiPolygon', 'Polygon']
+    assert 'ST_' not in provider._sql_calls[0][1]
+
+    assert results[1]['metrics']['alert_count'] == 2
+    assert results[1]['metrics']['last_alert_date'] == '2025-06-01'
+    assert results[2]['metrics']['alert_count'] == 1
+    assert results[3]['metrics']['alert_count'] == 0
+    assert results[1]['meta']['query_mode'] == 'batch'
+    assert results[1]['meta']['cluster']['size'] == 2
+    assert isinstance(results[4], Exception)
+
+
+class OverlapProvider(DummyProvider):
+    def __init__(self, rows=(), failing=False):
+        super().__init__()
+        self._rows = list(rows)
+        self._failing = failing
+        self.single_calls = []
+
+    def _gfw_execute_sql(self, headers, geometry, sql_template, date_from, allow_short=True):
+        self._sql_calls.append((geometry, sql_template))
+        if self._failing:
+            raise UserError('cluster query failed')
+        return ({'data': self._rows}, {'endpoint': 'latest', 'date_from': date_from, 'status_code': 200})
+
+    def analyze_line(self, line):
+        self.single_calls.append(line.id)
+        return {'metrics': {'alert_count': 7}, 'meta': {}}
+
+
+def test_batch_dissolves_overlapping_squares_and_counts_each_alert_once():
+    # two small plots 50 m apart: their 4 ha squares overlap
+    rows = [
+        # inside plot 1 only
+        {'latitude': -3.0, 'longitude': 20.0, 'alert_date': '2025-06-01', 'confidence': 'high', 'area_ha': 0.01},
+        # in both squares, outside both plots
+        {'latitude': -3.0, 'longitude': 20.00025, 'alert_date': '2025-06-02', 'confidence': 'high', 'area_ha': 0.01},
+    ]
+    provider = OverlapProvider(rows)
+    lines = [BatchLine(1, _square(20.0, -3.0, half=0.0002)), BatchLine(2, _square(20.0005, -3.0, half=0.0002))]
+    results = provider.analyze_lines_batch(lines)
+
+    [(geometry, _sql)] = provider._sql_calls
+    assert geometry['type'] == 'Polygon'
+    assert results[1]['metrics']['alert_count'] == 1
+    assert results[2]['metrics']['alert_count'] == 0
+
+    points = [BatchLine(3, {'type': 'Point', 'coordinates': [20.0, -3.0]}),
+              BatchLine(4, {'type': 'Point', 'coordinates': [20.0005, -3.0]})]
+    results = OverlapProvider(rows).analyze_lines_batch(points)
+    assert results[3]['metrics']['alert_count'] + results[4]['metrics']['alert_count'] == 2
+    assert results[3]['metrics']['alert_count'] >= 1
+
+
+def test_batch_retries_failed_or_truncated_clusters_line_by_line(monkeypatch):
+    lines = [BatchLine(1, _square(20.0, -3.0)), BatchLine(2, _square(20.02, -3.0))]
+    provider = OverlapProvider(failing=True)
+    results = provider.analyze_lines_batch(lines)
+    assert provider.single_calls == [1, 2]
+    assert results[1]['metrics']['alert_count'] == 7
+    assert results[1]['meta']['cluster_fallback'] == 'error'
+
+    row = {'latitude': -3.0, 'longitude': 20.0, 'alert_date': '2025-06-01', 'confidence': 'high', 'area_ha': 0.01}
+    provider = OverlapProvider(rows=[row, row])
+    monkeypatch.setattr(provider, '_get_batch_params', lambda: (5.0, 100, 2))
+    results = provider.analyze_lines_batch(lines[:1])
+    assert provider.single_calls == [1]
+    assert results[1]['meta']['cluster_fallback'] == 'max_rows'
+
+
+class FlakyProvider(DeforestationProviderGFW):
+    def __init__(self, health):
+        self.env = DummyEnv({'ir.config_parameter': DummyICP()})
+        self.health = health
+        self.urls = []
+
+    def _get_endpoint_health(self):
+        return self.health
+
+    def _post_query(self, url, headers, sql, geometry, date_from=None):
+        self.urls.append((url, date_from))
+        if '/latest/' in url:
+            return FakeResponse(503, {})
+        return FakeResponse(200, {'data': [{'cnt': 3}]})
+
+
+def test_circuit_breaker_skips_failing_endpoint_until_probe():
+    from planetio.services.api.gfw_endpoint_health import EndpointHealth
+
+    now = [0.0]
+    health = EndpointHealth(failure_threshold=2, cooldown=60, clock=lambda: now[0])
+    provider = FlakyProvider(health)
+
+    for _ in range(2):
+        provider.urls = []
+        data, info = provider._gfw_execute_sql({}, {}, "SELECT '{date_from}'", '2024-01-01')
+        assert len(provider.urls) == 3
+        assert info['fallback'] == 'version'
+
+    # latest and latest_90d are open: the pinned version answers alone
+    provider.urls = []
+    data, info = provider._gfw_execute_sql({}, {}, "SELECT '{date_from}'", '2024-01-01')
+    assert [u for u, _d in provider.urls] == ['https://data-api.globalforestwatch.org/dataset/gfw_integrated_alerts/v20250909/query/json']
+    assert data == {'data': [{'cnt': 3}]}
+    assert info['skipped'] == ['latest', 'latest_90d']
+
+    # after the cooldown each failing step gets a single probe
+    now[0] = 61.0
+    for _ in range(2):
+        provider.urls = []
+        provider._gfw_execute_sql({}, {}, "SELECT '{date_from}'", '2024-01-01')
+        assert len(provider.urls) == 2
+    provider.urls = []
+    provider._gfw_execute_sql({}, {}, "SELECT '{date_from}'", '2024-01-01')
+    assert len(provider.urls) == 1
+
+
+class ProbeProvider(FlakyProvider):
+    def __init__(self, health, outcome):
+        super().__init__(health)
+        self.outcome = outcome
+
+    def _post_query(self, url, headers, sql, geometry, date_from=None):
+        self.urls.append((url, date_from))
+        if self.outcome == 'limited':
+            raise UserError('rate limit')
+        if self.outcome == 'cached':
+            response = FakeResponse(200, {'data': [{'cnt': 1}]})
+            response.from_cache = True
+            return response
+        return FakeResponse(429, {'message': 'slow down'})
+
+
+def test_probe_slot_is_released_whatever_ends_the_call():
+    from planetio.services.api.gfw_endpoint_health import EndpointHealth
+
+    for outcome in ('limited', 'cached', 'throttled'):
+        now = [0.0]
+        health = EndpointHealth(failure_threshold=1, cooldown=60, clock=lambda: now[0])
+        health.record_failure('gfw_integrated_alerts', 'latest')
+        now[0] = 61.0
+        provider = ProbeProvider(health, outcome)
+
+        for _ in range(2):
+            provider.urls = []
+            try:
+                provider._gfw_execute_sql({}, {}, "SELECT '{date_from}'", '2024-01-01')
+            except UserError:
+                pass
+            # the open step is probed again by the next caller
+            assert '/latest/' in provider.urls[0][0]
+        # neither a cache hit nor a 4xx closes the circuit
+        assert health.is_open('gfw_integrated_alerts', 'latest')
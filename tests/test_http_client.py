@@ -0,0 +1,28 @@
+import importlib.util
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+module_path = repo_root / 'planetio' / 'services' / 'http_client.py'
+spec = importlib.util.spec_from_file_location('planetio_http_client', module_path)
+http_client = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(http_client)
+
+
+def test_sessions_are_shared_per_host():
+    http_client.close_all()
+    first = http_client.get_session('https://data-api.globalforestwatch.org/dataset/a/latest/query/json')
+    second = http_client.get_session('https://DATA-API.globalforestwatch.org/auth/token')
+    other = http_client.get_session('https://farm.plant-for-the-planet.org/api/farm-data')
+
+    assert first is second
+    assert first is not other
+    adapter = first.get_adapter('https://data-api.globalforestwatch.org/')
+    assert adapter._pool_maxsize == http_client.DEFAULT_POOL_SIZE
+
+
+def test_shared_sessions_do_not_keep_cookies():
+    http_client.close_all()
+    session = http_client.get_session('https://example.org')
+
+    assert session.cookies.get_policy().allowed_domains() == ()
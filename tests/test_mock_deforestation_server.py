@@ -0,0 +1,169 @@
+import importlib.util
+import json
+import sys
+import types
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+utils_dir = repo_root / 'planetio' / 'utils'
+
+# Load the helpers as a light package so that their relative imports resolve
+# without importing the Odoo addon itself.
+package = types.ModuleType('planetio_bench_utils')
+package.__path__ = [str(utils_dir)]
+sys.modules.setdefault('planetio_bench_utils', package)
+
+
+def _load(name):
+    spec = importlib.util.spec_from_file_location('planetio_bench_utils.%s' % name, utils_dir / ('%s.py' % name))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+mock = _load('mock_deforestation_server')
+bench = _load('deforestation_benchmark')
+
+SQUARE = {
+    'type': 'Polygon',
+    'coordinates': [[[10.0, 45.0], [10.001, 45.0], [10.001, 45.001], [10.0, 45.001], [10.0, 45.0]]],
+}
+
+
+def _alerts():
+    return [
+        {'alert_date': '2024-05-02', 'confidence': 'high', 'area_ha': 0.5, 'latitude': 45.0, 'longitude': 10.0},
+        {'alert_date': '2024-05-02', 'confidence': 'nominal', 'area_ha': 0.25, 'latitude': 45.0, 'longitude': 10.0},
+        {'alert_date': '2023-01-01', 'confidence': 'high', 'area_ha': 1.0, 'latitude': 45.0, 'longitude': 10.0},
+    ]
+
+
+def test_gfw_rows_follow_the_sql_shape():
+    since = "WHERE gfw_integrated_alerts__date >= '2024-01-01'"
+
+    assert mock.gfw_rows("SELECT COUNT(*) AS cnt FROM results " + since, _alerts()) == [{'cnt': 2}]
+
+    aggregate = mock.gfw_rows("SELECT SUM(area__ha) AS area_ha_total FROM results " + since, _alerts())
+    assert aggregate[0]['alert_count'] == 2
+    assert aggregate[0]['first_alert_date'] == '2024-05-02'
+
+    grouped = mock.gfw_rows(
+        "SELECT gfw_integrated_alerts__date AS alert_date FROM results " + since
+        + " GROUP BY gfw_integrated_alerts__date, gfw_integrated_alerts__confidence ORDER BY alert_date DESC",
+        _alerts(),
+    )
+    assert sorted(row['confidence'] for row in grouped) == ['high', 'nominal']
+
+    series = mock.gfw_rows(
+        "SELECT gfw_integrated_alerts__date AS alert_date FROM results " + since
+        + " GROUP BY gfw_integrated_alerts__date ORDER BY alert_date DESC",
+        _alerts(),
+    )
+    assert series == [{
+        'alert_date': '2024-05-02', 'alert_count': 2, 'area_ha': 0.75, 'confidence': 'high',
+        'first_alert_date': '2024-05-02', 'last_alert_date': '2024-05-02',
+    }]
+
+
+def test_synthetic_alerts_are_deterministic():
+    config = mock.MockConfig(alert_rate=1.0, max_alerts=5)
+
+    first = mock.synthetic_alerts(SQUARE, config)
+    assert first and first == mock.synthetic_alerts(SQUARE, config)
+    assert mock.synthetic_alerts(SQUARE, mock.MockConfig(alert_rate=0.0)) == []
+
+
+def _call(url, payload=None):
+    """Return ``(status, headers, json body)``; urllib keeps other tests' requests patches out."""
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.headers, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, json.loads(error.read())
+
+
+def test_server_answers_gfw_and_plant4_and_injects_throttling():
+    config = mock.MockConfig(latency_ms=0, jitter_ms=0, alert_rate=1.0, max_alerts=3)
+    with mock.MockDeforestationServer(config=config) as server:
+        url = server.base_url + '/dataset/gfw_integrated_alerts/latest/query/json'
+        status, _headers, body = _call(url, {
+            'sql': "SELECT COUNT(*) AS cnt FROM results WHERE gfw_integrated_alerts__date >= '2000-01-01'",
+            'geometry': SQUARE,
+        })
+        assert status == 200
+        assert body['data'][0]['cnt'] >= 1
+
+        feature = {'type': 'Feature', 'properties': {'uid': 'eudr-1'}, 'geometry': SQUARE}
+        _status, _headers, body = _call(server.base_url + '/api/farm-data',
+                                        {'geoJSON': {'type': 'FeatureCollection', 'features': [feature]}})
+        assert body['geoJSON']['features'][0]['properties']['deforestation']['alert_count'] >= 1
+        status, _headers, _body = _call(server.base_url + '/api/farm-data?uid=eudr-1')
+        assert status == 200
+
+        server.config.throttle_rate = 1.0
+        status, headers, _body = _call(url, {'sql': 'SELECT 1'})
+        assert status == 429
+        assert headers['Retry-After'] == '1'
+
+        assert server.stats.requests == 4
+        assert server.stats.by_route == {'gfw': 2, 'plant4': 2}
+
+
+def test_synthetic_geometries_and_percentile():
+    geometries = bench.synthetic_geometries(50, seed=1, duplicate_rate=0.5)
+    assert len(geometries) == 50
+    assert len({str(g) for g in geometries}) < 50
+
+    assert bench.percentile([float(i) for i in range(1, 101)], 99) == 99.0
+    assert bench.percentile([], 50) is None
+
+
+class BenchICP:
+    def __init__(self, values):
+        self.values = values
+
+    def sudo(self):
+        return self
+
+    def get_param(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set_param(self, key, value):
+        self.values[key] = value
+
+
+class BenchProxy:
+    def __init__(self, geometry, display_name=None, line_id=0, hs_code=None, commodity=None):
+        self.id = line_id
+
+
+class BenchService:
+    _GeometryLineProxy = BenchProxy
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze_records(self, record, providers):
+        self.calls.append(len(record.line_ids))
+        for line in record.line_ids:
+            line.external_message = 'OK'
+        return {'errors': [{'line_id': 2}], 'details': []}
+
+
+def test_benchmark_analyzes_all_lines_in_one_call():
+    values = {'planetio.gfw_api_key': 'real-key'}
+    svc = BenchService()
+    env = {'ir.config_parameter': BenchICP(values), 'deforestation.service': svc}
+
+    report = bench.run_benchmark(env, lines=5, server_url='http://127.0.0.1:9')
+
+    assert svc.calls == [5]
+    assert report['lines'] == 5 and report['errors'] == 1
+    assert report['p50_ms'] is not None
+    assert values['planetio.gfw_api_key'] == 'real-key'
@@ -0,0 +1,157 @@
+import json
+import sys
+import types
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+
+if 'odoo' not in sys.modules:
+    odoo = types.ModuleType('odoo')
+    sys.modules['odoo'] = odoo
+else:
+    odoo = sys.modules['odoo']
+
+models_ns = getattr(odoo, 'models', types.SimpleNamespace())
+for attr in ('Model', 'AbstractModel', 'TransientModel'):
+    if not hasattr(models_ns, attr):
+        setattr(models_ns, attr, object)
+odoo.models = models_ns
+
+api_ns = getattr(odoo, 'api', types.SimpleNamespace())
+if not hasattr(api_ns, 'onchange'):
+    api_ns.onchange = lambda *args, **kwargs: (lambda func: func)
+if not hasattr(api_ns, 'model'):  # used as decorator elsewhere
+    api_ns.model = lambda func: func
+odoo.api = api_ns
+
+if not hasattr(odoo, '_'):
+    odoo._ = lambda value: value
+
+fields_ns = getattr(odoo, 'fields', types.SimpleNamespace())
+
+class _Field:
+    def __init__(self, *args, **kwargs):
+        pass
+
+for attr in (
+    'Binary',
+    'Char',
+    'Integer',
+    'Float',
+    'Text',
+    'Boolean',
+    'Many2one',
+    'One2many',
+    'Many2many',
+    'Date',
+    'Datetime',
+    'Selection',
+):
+    setattr(fields_ns, attr, _Field)
+odoo.fields = fields_ns
+
+tools_module = sys.modules.get('odoo.tools')
+if tools_module is None:
+    tools_module = types.ModuleType('odoo.tools')
+    sys.modules['odoo.tools'] = tools_module
+if not hasattr(tools_module, 'ustr'):
+    tools_module.ustr = lambda value: str(value)
+if not hasattr(tools_module, 'config'):
+    tools_module.config = {}
+misc_module = sys.modules.get('odoo.tools.misc')
+if misc_module is None:
+    misc_module = types.ModuleType('odoo.tools.misc')
+    sys.modules['odoo.tools.misc'] = misc_module
+if not hasattr(misc_module, 'formatLang'):
+    misc_module.formatLang = lambda env, value, digits=None: value
+tools_module.misc = misc_module
+odoo.tools = tools_module
+
+exceptions_mod = sys.modules.get('odoo.exceptions')
+if exceptions_mod is None:
+    exceptions_mod = types.SimpleNamespace(UserError=Exception)
+    sys.modules['odoo.exceptions'] = exceptions_mod
+if not hasattr(exceptions_mod, 'UserError'):
+    exceptions_mod.UserError = Exception
+odoo.exceptions = exceptions_mod
+
+modules_pkg = sys.modules.get('odoo.modules')
+if modules_pkg is None:
+    modules_pkg = types.ModuleType('odoo.modules')
+    sys.modules['odoo.modules'] = modules_pkg
+module_subpkg = getattr(modules_pkg, 'module', None)
+if module_subpkg is None:
+    module_subpkg = types.ModuleType('odoo.modules.module')
+    modules_pkg.module = module_subpkg
+    sys.modules['odoo.modules.module'] = module_subpkg
+if not hasattr(module_subpkg, 'get_module_resource'):
+    module_subpkg.get_module_resource = lambda *args, **kwargs: ''
+
+
+from planetio.services.api.gfw_deforestation import DeforestationProviderGFW
+from odoo.exceptions import UserError
+
+from planetio.services.api import offline_deforestation as offline
+
+
+CSV_EXTRACT = (
+    "latitude,longitude,gfw_integrated_alerts__date,gfw_integrated_alerts__confidence,area__ha\n"
+    "-3.0005,-60.0005,2024-05-01,high,0.01\n"
+    "-3.0015,-60.0015,2024-05-02,nominal,0.02\n"
+    "-3.5000,-60.5000,2024-05-03,high,0.01\n"
+    "not-a-number,-60.0,2024-05-04,high,0.01\n"
+)
+
+
+def test_parse_alert_extract_reads_csv_and_geojson():
+    alerts = list(offline.parse_alert_extract(CSV_EXTRACT.encode(), 'alerts.csv'))
+    assert len(alerts) == 3
+    assert alerts[0] == {
+        'dataset': 'gfw_integrated_alerts',
+        'alert_date': '2024-05-01',
+        'latitude': -3.0005,
+        'longitude': -60.0005,
+        'confidence': 'high',
+        'area_ha': 0.01,
+    }
+
+    geojson = json.dumps({
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [-60.0005, -3.0005]},
+            'properties': {'wur_radd_alerts__date': '2024-06-01T00:00:00', 'wur_radd_alerts__confidence': 3},
+        }],
+    })
+    alerts = list(offline.parse_alert_extract(geojson, 'radd.geojson', dataset='wur_radd_alerts'))
+    assert alerts == [{
+        'dataset': 'wur_radd_alerts',
+        'alert_date': '2024-06-01',
+        'latitude': -3.0005,
+        'longitude': -60.0005,
+        'confidence': '3',
+        'area_ha': 0.0,
+    }]
+
+
+def test_alert_grid_index_returns_alerts_inside_the_plot():
+    index = offline.AlertGridIndex(offline.parse_alert_extract(CSV_EXTRACT, 'alerts.csv'))
+    plot = {
+        'type': 'Polygon',
+        'coordinates': [[[-60.001, -3.001], [-60.0, -3.001], [-60.0, -3.0], [-60.001, -3.0], [-60.001, -3.001]]],
+    }
+
+    inside = index.within(plot)
+
+    assert [row['alert_date'] for row in inside] == ['2024-05-01']
+    assert index.within({'type': 'Polygon', 'coordinates': []}) == []
+
+
+def test_offline_provider_is_registered():
+    from planetio.services.deforestation_service import DeforestationService
+
+    assert DeforestationService._REGISTRY['offline'] == 'deforestation.provider.offline'
@@ -0,0 +1,130 @@
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+
+
+def _ensure_odoo_stub():
+    odoo = sys.modules.get('odoo')
+    if odoo is None:
+        odoo = types.ModuleType('odoo')
+        sys.modules['odoo'] = odoo
+
+    models_ns = getattr(odoo, 'models', types.SimpleNamespace())
+    for attr in ('Model', 'AbstractModel', 'TransientModel'):
+        if not hasattr(models_ns, attr):
+            setattr(models_ns, attr, object)
+    odoo.models = models_ns
+
+    class _Field:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    fields_ns = getattr(odoo, 'fields', types.SimpleNamespace())
+    for attr in ('Char', 'Float'):
+        if not hasattr(fields_ns, attr):
+            setattr(fields_ns, attr, _Field)
+    odoo.fields = fields_ns
+    odoo._ = lambda value: value
+
+    exceptions_module = sys.modules.get('odoo.exceptions')
+    if exceptions_module is None:
+        exceptions_module = types.ModuleType('odoo.exceptions')
+        sys.modules['odoo.exceptions'] = exceptions_module
+    if not hasattr(exceptions_module, 'UserError'):
+        class UserError(Exception):
+            pass
+        exceptions_module.UserError = UserError
+    odoo.exceptions = exceptions_module
+
+
+def _load(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_ensure_odoo_stub()
+
+for package in ('odoo.addons', 'odoo.addons.planetio', 'odoo.addons.planetio.services'):
+    sys.modules.setdefault(package, types.ModuleType(package))
+services = repo_root / 'planetio' / 'services'
+http_client = sys.modules.setdefault(
+    'odoo.addons.planetio.services.http_client',
+    _load('odoo.addons.planetio.services.http_client', services / 'http_client.py'),
+)
+rate_limiter = sys.modules.setdefault(
+    'odoo.addons.planetio.services.rate_limiter',
+    _load('odoo.addons.planetio.services.rate_limiter', services / 'rate_limiter.py'),
+)
+osapiens_client = _load('osapiens_client', repo_root / 'planetio_osapiens' / 'services' / 'osapiens_client.py')
+
+
+class FakeICP:
+    def __init__(self, values):
+        self.values = values
+
+    def sudo(self):
+        return self
+
+    def get_param(self, key, default=None):
+        return self.values.get(key, default)
+
+
+class NoCursorPool:
+    def cursor(self):
+        raise AssertionError('unlimited hosts must not open a cursor')
+
+
+class FakeEnv(dict):
+    def __init__(self, params):
+        icp = FakeICP(params)
+        limiter = rate_limiter.PlanetioRateLimiter()
+        limiter.env = {'ir.config_parameter': icp}
+        limiter.pool = NoCursorPool()
+        limiter.sudo = lambda: limiter
+        super().__init__({'ir.config_parameter': icp, 'planetio.rate.limiter': limiter})
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, payload=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.payload = payload
+        self.text = ''
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def request(self, method, url, **kwargs):
+        return self.responses.pop(0)
+
+
+def test_retry_after_is_slept_when_the_host_has_no_limit(monkeypatch):
+    env = FakeEnv({
+        'osapiens.base_url': 'https://portal.example.org',
+        'osapiens.account_id': 'acc',
+        'osapiens.api_token': 'token',
+    })
+    client = osapiens_client.OsapiensClient(env)
+    client._log_ir = lambda *args: None
+    session = FakeSession([
+        FakeResponse(429, {'Retry-After': '7'}),
+        FakeResponse(429, {'Retry-After': '1'}),
+        FakeResponse(200, {'Content-Type': 'application/json'}, {'ok': True}),
+    ])
+    monkeypatch.setattr(http_client, 'get_session', lambda url: session)
+    sleeps = []
+    monkeypatch.setattr(osapiens_client.time, 'sleep', sleeps.append)
+
+    assert client._request('GET', '/api/v1/eudr/requests') == {'ok': True}
+    assert sleeps == [7.0, 2 * osapiens_client.BACKOFF_SEC]
@@ -0,0 +1,213 @@
+import json
+import sys
+import types
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+
+if 'odoo' not in sys.modules:
+    odoo = types.ModuleType('odoo')
+    sys.modules['odoo'] = odoo
+else:
+    odoo = sys.modules['odoo']
+
+models_ns = getattr(odoo, 'models', types.SimpleNamespace())
+for attr in ('Model', 'AbstractModel', 'TransientModel'):
+    if not hasattr(models_ns, attr):
+        setattr(models_ns, attr, object)
+odoo.models = models_ns
+
+api_ns = getattr(odoo, 'api', types.SimpleNamespace())
+if not hasattr(api_ns, 'onchange'):
+    api_ns.onchange = lambda *args, **kwargs: (lambda func: func)
+if not hasattr(api_ns, 'model'):  # used as decorator elsewhere
+    api_ns.model = lambda func: func
+odoo.api = api_ns
+
+if not hasattr(odoo, '_'):
+    odoo._ = lambda value: value
+
+fields_ns = getattr(odoo, 'fields', types.SimpleNamespace())
+
+class _Field:
+    def __init__(self, *args, **kwargs):
+        pass
+
+for attr in (
+    'Binary',
+    'Char',
+    'Integer',
+    'Float',
+    'Text',
+    'Boolean',
+    'Many2one',
+    'Many2many',
+    'One2many',
+    'Date',
+    'Datetime',
+    'Selection',
+):
+    setattr(fields_ns, attr, _Field)
+odoo.fields = fields_ns
+
+tools_module = sys.modules.get('odoo.tools')
+if tools_module is None:
+    tools_module = types.ModuleType('odoo.tools')
+    sys.modules['odoo.tools'] = tools_module
+if not hasattr(tools_module, 'ustr'):
+    tools_module.ustr = lambda value: str(value)
+misc_module = sys.modules.get('odoo.tools.misc')
+if misc_module is None:
+    misc_module = types.ModuleType('odoo.tools.misc')
+    sys.modules['odoo.tools.misc'] = misc_module
+if not hasattr(misc_module, 'formatLang'):
+    misc_module.formatLang = lambda env, value, digits=None: value
+tools_module.misc = misc_module
+odoo.tools = tools_module
+
+exceptions_mod = sys.modules.get('odoo.exceptions')
+if exceptions_mod is None:
+    exceptions_mod = types.SimpleNamespace(UserError=Exception)
+    sys.modules['odoo.exceptions'] = exceptions_mod
+if not hasattr(exceptions_mod, 'UserError'):
+    exceptions_mod.UserError = Exception
+odoo.exceptions = exceptions_mod
+
+modules_pkg = sys.modules.get('odoo.modules')
+if modules_pkg is None:
+    modules_pkg = types.ModuleType('odoo.modules')
+    sys.modules['odoo.modules'] = modules_pkg
+module_subpkg = getattr(modules_pkg, 'module', None)
+if module_subpkg is None:
+    module_subpkg = types.ModuleType('odoo.modules.module')
+    modules_pkg.module = module_subpkg
+    sys.modules['odoo.modules.module'] = module_subpkg
+if not hasattr(module_subpkg, 'get_module_resource'):
+    module_subpkg.get_module_resource = lambda *args, **kwargs: ''
+
+
+
+from planetio.services.api.plant4_deforestation import DeforestationProviderPlant4
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self._payload
+
+
+class FakeLine:
+    def __init__(self, line_id, geom, commodity='coffee'):
+        self.id = line_id
+        self.display_name = 'line %s' % line_id
+        self._geom = geom
+        self.declaration_id = types.SimpleNamespace(
+            hs_code_id=types.SimpleNamespace(code='0901', commodity=commodity)
+        )
+
+    def _line_geometry(self):
+        return self._geom
+
+
+def _square(lon, lat):
+    return {
+        'type': 'Polygon',
+        'coordinates': [[[lon, lat], [lon + 0.001, lat], [lon + 0.001, lat + 0.001], [lon, lat + 0.001], [lon, lat]]],
+    }
+
+
+class BatchPlant4(DeforestationProviderPlant4):
+    def __init__(self):
+        self.env = None
+        self.posts = []
+
+    def _get_config(self):
+        return 'KEY', 'https://farm.example'
+
+    def _get_batch_size(self):
+        return 50
+
+    def _post_farm_data(self, url, payload, headers):
+        features = payload['geoJSON']['features']
+        self.posts.append(features)
+        answer = []
+        for feature in features:
+            props = dict(feature['properties'])
+            props['deforestation'] = {'alert_count': props['line_id'] * 10}
+            answer.append({'type': 'Feature', 'properties': props})
+        return FakeResponse(200, {'type': 'FeatureCollection', 'features': answer})
+
+
+def test_uid_is_stable_for_the_same_plot():
+    provider = BatchPlant4()
+    a = FakeLine(1, _square(10.0, 45.0))
+    b = FakeLine(2, _square(10.0, 45.0))
+    c = FakeLine(3, _square(10.0, 45.0), commodity='cocoa')
+
+    assert provider._build_uid(a) == provider._build_uid(b)
+    assert provider._build_uid(a) != provider._build_uid(c)
+    assert provider._build_uid(a).startswith('eudr-')
+
+
+def test_batch_submits_one_feature_collection_and_maps_results():
+    provider = BatchPlant4()
+    lines = [
+        FakeLine(1, _square(10.0, 45.0)),
+        FakeLine(2, _square(11.0, 45.0)),
+        FakeLine(3, _square(10.0, 45.0)),
+        FakeLine(4, None),
+    ]
+    results = provider.analyze_lines_batch(lines)
+
+    assert len(provider.posts) == 1
+    assert len(provider.posts[0]) == 2
+    assert results[1]['metrics']['alert_count'] == 10
+    assert results[2]['metrics']['alert_count'] == 20
+    assert results[3] is results[1]
+    assert isinstance(results[4], Exception)
+
+
+class ConflictPlant4(BatchPlant4):
+    def __init__(self, stored):
+        super().__init__()
+        self.stored = stored
+        self.fetched = []
+        self.single = []
+
+    def _post_farm_data(self, url, payload, headers):
+        self.posts.append(payload['geoJSON']['features'])
+        return FakeResponse(409, {'message': 'already exists'})
+
+    def _fetch_existing(self, base_url, headers, uid, missing_ok=False):
+        self.fetched.append(uid)
+        if uid not in self.stored:
+            return None
+        return {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'properties': {'uid': uid, 'deforestation': {'alert_count': self.stored[uid]}}},
+        ]}
+
+    def analyze_line(self, line):
+        self.single.append(line.id)
+        return {'metrics': {'alert_count': -1}, 'meta': {}}
+
+
+def test_conflicting_chunk_reads_stored_analyses_by_uid():
+    lines = [FakeLine(1, _square(10.0, 45.0)), FakeLine(2, _square(11.0, 45.0))]
+    uid1 = BatchPlant4()._build_uid(lines[0])
+    provider = ConflictPlant4({uid1: 4})
+
+    results = provider.analyze_lines_batch(lines)
+
+    assert len(provider.posts) == 1
+    assert len(provider.fetched) == 2
+    assert results[1]['metrics']['alert_count'] == 4
+    # only the feature the service does not know yet is submitted again
+    assert provider.single == [2]
@@ -0,0 +1,131 @@
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+
+repo_root = Path(__file__).resolve().parents[1]
+
+
+def _ensure_odoo_stub():
+    odoo = sys.modules.get('odoo')
+    if odoo is None:
+        odoo = types.ModuleType('odoo')
+        sys.modules['odoo'] = odoo
+
+    models_ns = getattr(odoo, 'models', types.SimpleNamespace())
+    for attr in ('Model', 'AbstractModel', 'TransientModel'):
+        if not hasattr(models_ns, attr):
+            setattr(models_ns, attr, object)
+    odoo.models = models_ns
+
+    class _Field:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    fields_ns = getattr(odoo, 'fields', types.SimpleNamespace())
+    for attr in ('Char', 'Float'):
+        if not hasattr(fields_ns, attr):
+            setattr(fields_ns, attr, _Field)
+    odoo.fields = fields_ns
+    odoo._ = lambda value: value
+
+    exceptions_module = sys.modules.get('odoo.exceptions')
+    if exceptions_module is None:
+        exceptions_module = types.ModuleType('odoo.exceptions')
+        sys.modules['odoo.exceptions'] = exceptions_module
+    if not hasattr(exceptions_module, 'UserError'):
+        class UserError(Exception):
+            pass
+        exceptions_module.UserError = UserError
+    odoo.exceptions = exceptions_module
+
+
+_ensure_odoo_stub()
+
+module_path = repo_root / 'planetio' / 'services' / 'rate_limiter.py'
+spec = importlib.util.spec_from_file_location('planetio_rate_limiter', module_path)
+rate_limiter = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(rate_limiter)
+
+
+def test_reserve_slot_spaces_callers_once_burst_is_spent():
+    rate, burst = 2.0, 2.0
+    tokens, updated_at, now = burst, 100.0, 100.0
+    waits = []
+    for _i in range(4):
+        tokens, wait = rate_limiter.reserve_slot(tokens, updated_at, 0.0, rate, burst, now)
+        updated_at = now
+        waits.append(wait)
+
+    assert waits == [0.0, 0.0, 0.5, 1.0]
+
+    # Two seconds later the bucket refilled enough for the next caller.
+    tokens, wait = rate_limiter.reserve_slot(tokens, updated_at, 0.0, rate, burst, now + 2.0)
+    assert wait == 0.0
+
+
+def test_reserve_slot_honours_blocked_until():
+    tokens, wait = rate_limiter.reserve_slot(5.0, 100.0, 130.0, 1.0, 5.0, 100.0)
+
+    assert wait == 31.0
+    assert tokens == -1.0
+
+
+def test_parse_retry_after_seconds_and_http_date():
+    assert rate_limiter.parse_retry_after('7') == 7.0
+    assert rate_limiter.parse_retry_after('') is None
+    assert rate_limiter.parse_retry_after('garbage') is None
+
+    now = 784111777.0  # Sun, 06 Nov 1994 08:49:37 GMT
+    delay = rate_limiter.parse_retry_after('Sun, 06 Nov 1994 08:50:07 GMT', now=now)
+    assert delay == 30.0
+
+
+def test_parse_limit_and_host():
+    assert rate_limiter.parse_limit('5/10') == (5.0, 10.0)
+    assert rate_limiter.parse_limit('0.5') == (0.5, 1.0)
+    assert rate_limiter.parse_limit('fast') is None
+    assert rate_limiter.host_of('https://Data-API.globalforestwatch.org/dataset/x') == 'data-api.globalforestwatch.org'
+
+
+class FakeICP:
+    def __init__(self, values):
+        self.values = values
+
+    def sudo(self):
+        return self
+
+    def get_param(self, key, default=None):
+        return self.values.get(key, default)
+
+
+class CountingPool:
+    def __init__(self):
+        self.cursors = 0
+
+    def cursor(self):
+        self.cursors += 1
+        raise AssertionError('unlimited hosts must not open a cursor')
+
+
+def _limiter(params):
+    limiter = rate_limiter.PlanetioRateLimiter()
+    limiter.env = {'ir.config_parameter': FakeICP(params)}
+    limiter.pool = CountingPool()
+    return limiter
+
+
+def test_hosts_without_a_configured_limit_are_unlimited_and_cursor_free():
+    limiter = _limiter({'planetio.rate_limit.api.example.org': '2/4'})
+
+    assert rate_limiter.DEFAULT_LIMIT == ''
+    assert limiter._get_limit('api.example.org') == (2.0, 4.0)
+    assert limiter._get_limit('other.example.org')[0] == 0.0
+    assert limiter.is_limited('https://api.example.org/x')
+    assert not limiter.is_limited('https://other.example.org/x')
+    assert limiter.acquire('https://other.example.org/x') == 0.0
+    limiter.penalize('https://other.example.org/x', 3)
+    response = types.SimpleNamespace(status_code=429, headers={'Retry-After': '3'})
+    assert limiter.observe('https://other.example.org/x', response) == 3.0
+    assert limiter.pool.cursors == 0
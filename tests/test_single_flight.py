@@ -0,0 +1,100 @@
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+
+repo_root = Path(__file__).resolve().parents[1]
+module_path = repo_root / 'planetio' / 'services' / 'single_flight.py'
+spec = importlib.util.spec_from_file_location('planetio_single_flight', module_path)
+mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mod)
+
+
+def _start(flight, key, func, results, wait=5.0):
+    def _target():
+        try:
+            results.append(flight.run(key, func, wait=wait))
+        except Exception as ex:
+            results.append(ex)
+
+    thread = threading.Thread(target=_target)
+    thread.start()
+    return thread
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_call_and_get_copies():
+    flight = mod.SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def analyze():
+        calls.append(1)
+        release.wait(5)
+        return {'metrics': {'alert_count': 3}}
+
+    results = []
+    leader = _start(flight, 'geom', analyze, results)
+    _wait_until(lambda: calls)
+    followers = [_start(flight, 'geom', analyze, results) for _i in range(3)]
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(shared for _result, shared in results) == [False, True, True, True]
+    payloads = [result for result, _shared in results]
+    assert all(p == {'metrics': {'alert_count': 3}} for p in payloads)
+    assert len({id(p) for p in payloads}) == 4
+    assert flight.in_flight() == 0
+
+
+def test_followers_receive_the_leader_error_and_later_calls_run_again():
+    flight = mod.SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError('provider down')
+
+    results = []
+    leader = _start(flight, 'geom', failing, results)
+    _wait_until(lambda: flight.in_flight())
+    follower = _start(flight, 'geom', lambda: 'unused', results)
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert flight.run('geom', lambda: 'fresh') == ('fresh', False)
+
+
+def test_follower_runs_alone_after_waiting_too_long():
+    flight = mod.SingleFlight()
+    release = threading.Event()
+    results = []
+    leader = _start(flight, 'geom', lambda: release.wait(5) and 'slow', results)
+    _wait_until(lambda: flight.in_flight())
+
+    assert flight.run('geom', lambda: 'own', wait=0.01) == ('own', False)
+    assert flight.run('other', lambda: 'independent') == ('independent', False)
+    release.set()
+    leader.join(5)
+    assert results == [('slow', False)]
+
+
+def test_keys_do_not_leak_when_the_call_raises():
+    flight = mod.SingleFlight()
+    with pytest.raises(RuntimeError):
+        flight.run('geom', lambda: (_ for _ in ()).throw(RuntimeError('boom')))
+    assert flight.in_flight() == 0